@@ -0,0 +1,24 @@
+/* Synthetic source file for the SLOC benchmark. */
+#include <stdio.h>
+
+#define GREETING "hello // world" /* macro */
+
+/*
+ * Block comment.
+ */
+static int count(const char *s)
+{
+    int n = 0; // counter
+    while (*s) {
+        if (*s++ == '"')
+            n++;
+    }
+    return n;
+}
+
+int main(void)
+{
+    // comment line
+    printf("%d\n", count(GREETING));
+    return 0;
+}
@@ -0,0 +1,21 @@
+// Synthetic source file for the SLOC benchmark.
+#include <iostream>
+#include <string>
+
+namespace sample {
+
+const std::string kRaw = R"(raw "string" with // and /* inside)";
+const std::string kDelimited = R"xy(
+  )" does not end it
+)xy";
+
+/* Block comment */
+int twice(int x) { return 2 * x; } // trailing
+
+}  // namespace sample
+
+int main() {
+    std::cout << sample::kRaw << sample::twice(2) << '\n';
+
+    return 0;
+}
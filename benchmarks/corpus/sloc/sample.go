@@ -0,0 +1,19 @@
+// Package sample is a synthetic file for the SLOC benchmark.
+package sample
+
+import "fmt"
+
+/*
+Block comment
+on several lines.
+*/
+
+// Raw is a raw string spanning lines.
+const Raw = `first
+// not a comment
+last`
+
+func Describe(name string) string {
+	quote := '"' // a rune
+	return fmt.Sprintf("%s: %c /* not a comment */", name, quote)
+}
@@ -0,0 +1,22 @@
+package example;
+
+/**
+ * Synthetic class for the SLOC benchmark.
+ */
+public class Sample {
+    // Line comment
+    private static final String URL = "http://example.com/*x*/";
+    private static final char SLASH = '/';
+
+    private static final String BLOCK = """
+        // inside a text block
+        /* also inside */
+        """;
+
+    public static void main(String[] args) { /* inline */
+        System.out.println(URL + SLASH + BLOCK);
+
+        /* multi
+           line */
+    }
+}
@@ -0,0 +1,21 @@
+/**
+ * Synthetic module for the SLOC benchmark.
+ */
+
+'use strict';
+
+const url = "http://example.com/*not a comment*/"; // trailing
+const path = '//also/not/a/comment';
+
+// A comment line
+function render(name) {
+  const html = `
+    <p>${name}</p>
+    // part of the template
+  `;
+  return html; /* trailing block */
+}
+
+/* one-line block */
+
+module.exports = { render, url, path };
@@ -0,0 +1,34 @@
+"""Synthetic module for the SLOC benchmark.
+
+Every construct the classifier has to tell apart appears at least once.
+"""
+
+import os  # a trailing comment makes this a code line
+
+# A comment line
+URL = "http://example.com/#anchor"  # '#' inside a string
+PATTERN = r'\d+#\d+'
+
+
+def render(name):
+    '''Single-quoted docstring.'''
+    template = """
+    <p>{name}</p>
+    # not a comment, part of the string
+    """
+    return template.format(name=name)
+
+
+class Config:
+    """Docstring
+    spanning lines.
+    """
+
+    def __init__(self):
+        self.path = os.path.join("a", "b")  # noqa
+
+        # Indented comment
+        self.items = [
+            1,  # one
+            2,
+        ]
@@ -0,0 +1,18 @@
+//! Synthetic crate for the SLOC benchmark.
+
+/// Doc comment on a function.
+fn longest<'a>(x: &'a str, y: &'a str) -> &'a str {
+    if x.len() > y.len() { x } else { y } // trailing
+}
+
+/*
+ * Block comment.
+ */
+fn main() {
+    let raw = r#"a "raw" string // with a slash"#;
+    let multi = "first line
+// second line, inside the string";
+    let c = '"';
+
+    println!("{} {} {} {}", longest(raw, multi), c, '\'', '\u{1F600}');
+}
@@ -0,0 +1,17 @@
+// Synthetic module for the SLOC benchmark.
+
+export interface Item {
+  id: number; // identifier
+  name: string;
+}
+
+/*
+ * Block comment
+ * with several lines.
+ */
+export function describe(item: Item): string {
+  const escaped = "quote \" then // no comment";
+  return `${item.id}: ${item.name} /* still a string */`;
+}
+
+export const items: Item[] = [];
@@ -0,0 +1,96 @@
+"""Micro-benchmark of the compiled gitignore matcher.
+
+Usage::
+
+    python benchmarks/gitignore.py [--patterns N] [--paths N]
+
+Compares ``GitIgnore.match`` against the per-pattern ``fnmatch`` loop that
+``scan()`` used before the matcher was compiled (kept below as
+``legacy_matches`` for reference).
+"""
+
+import argparse
+import random
+import time
+from fnmatch import fnmatch
+from typing import List
+
+from repolyze.core.filesystem.gitignore import GitIgnore
+
+
+def legacy_matches(rel_path: str, patterns: List[str], is_dir: bool = False) -> bool:
+    """The original fnmatch-based matcher."""
+    for pattern in patterns:
+        if pattern.startswith("!"):
+            continue
+        pattern = pattern.lstrip("/")
+        if pattern.endswith("/"):
+            pattern = pattern.rstrip("/")
+            if is_dir and (
+                fnmatch(rel_path, pattern) or fnmatch(rel_path, f"**/{pattern}")
+            ):
+                return True
+        else:
+            if fnmatch(rel_path, pattern) or fnmatch(rel_path, f"**/{pattern}"):
+                return True
+            parts = rel_path.split("/")
+            for i in range(len(parts)):
+                if fnmatch(parts[i], pattern):
+                    return True
+    return False
+
+
+def make_patterns(n: int, rng: random.Random) -> List[str]:
+    shapes = [
+        "*.{ext}", "{name}/", "/{name}", "{name}/*.{ext}", "**/{name}",
+        "{name}-*.{ext}", "{name}/**", "!{name}.{ext}",
+    ]
+    return [
+        rng.choice(shapes).format(name=f"gen{i}", ext=f"x{i}")
+        for i in range(n)
+    ]
+
+
+def make_paths(n: int, rng: random.Random) -> List[str]:
+    paths = []
+    for i in range(n):
+        depth = rng.randint(1, 6)
+        dirs = [f"d{rng.randint(0, 50)}" for _ in range(depth - 1)]
+        paths.append("/".join(dirs + [f"file{i}.{rng.choice(['py', 'txt', 'x7'])}"]))
+    return paths
+
+
+def _time(fn, paths) -> float:
+    start = time.perf_counter()
+    for p in paths:
+        fn(p)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patterns", type=int, default=300)
+    parser.add_argument("--paths", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    patterns = make_patterns(args.patterns, rng)
+    paths = make_paths(args.paths, rng)
+
+    start = time.perf_counter()
+    compiled = GitIgnore(patterns)
+    compile_time = time.perf_counter() - start
+
+    legacy = _time(lambda p: legacy_matches(p, patterns), paths)
+    new = _time(compiled.match, paths)
+
+    print(f"patterns:          {args.patterns}")
+    print(f"paths:             {args.paths}")
+    print(f"compile:           {compile_time * 1000:.1f} ms")
+    print(f"legacy fnmatch:    {legacy / len(paths) * 1e6:.1f} us/path")
+    print(f"compiled regex:    {new / len(paths) * 1e6:.1f} us/path")
+    print(f"speedup:           {legacy / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compare the time and peak memory of the JSON output, streamed or dumped.
+
+Usage::
+
+    python benchmarks/json_output.py [--files N] [--compact]
+
+A ``RepoStats`` with a tree of ``--files`` files (100 per directory) is
+built in memory and written to ``os.devnull``, once with
+``json.dumps(stats.to_dict(), indent=2)``, as ``--json`` used to, and once
+with ``write_json()``. Each runs in a fresh process, so that the growth of
+its peak RSS over the RSS after building the tree is its own.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from repolyze.core.formatting.json_writer import write_json
+from repolyze.models import (
+    FileTypeStats, HygieneStats, LanguageStats, MetadataStats, RepoStats, SizeStats,
+    StructureStats, TimeStats, TreeNode,
+)
+
+METHODS = ("dumps", "stream")
+
+
+def _make_stats(files: int) -> RepoStats:
+    root = TreeNode(Path("/repo"), files, files * 1000, [])
+    for d in range(-(-files // 100)):
+        if d % 100 == 0:
+            top = TreeNode(f"pkg{d // 100}", 0, 0, [])
+            root.add(top)
+        sub = TreeNode(f"mod{d}", 0, 0, [])
+        for f in range(min(100, files - d * 100)):
+            sub.add(TreeNode(f"file{f}.py", 1, 1000, is_dir=False))
+        top.add(sub)
+    return RepoStats(
+        path=root.path,
+        structure=StructureStats(total_files=files),
+        size=SizeStats(total_size=files * 1000),
+        file_types=FileTypeStats(),
+        language=LanguageStats(),
+        time=TimeStats(),
+        hygiene=HygieneStats(),
+        metadata=MetadataStats(),
+        tree=root,
+    )
+
+
+def _max_rss() -> int:
+    """Peak RSS of this process, in bytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _run(method: str, files: int, compact: bool) -> None:
+    """Write the stats once with ``method``; print seconds and peak growth."""
+    stats = _make_stats(files)
+    before = _max_rss()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as out:
+        if method == "dumps":
+            if compact:
+                out.write(json.dumps(stats.to_dict(), separators=(",", ":")))
+            else:
+                out.write(json.dumps(stats.to_dict(), indent=2))
+        else:
+            write_json(stats, out, compact=compact)
+    elapsed = time.perf_counter() - start
+    print(elapsed, _max_rss() - before)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--run", choices=METHODS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        _run(args.run, args.files, args.compact)
+        return
+
+    print(f"{'':>8} {'seconds':>9} {'peak MB':>9}")
+    for method in METHODS:
+        command = [sys.executable, __file__, "--run", method, "--files", str(args.files)]
+        if args.compact:
+            command.append("--compact")
+        output = subprocess.run(command, check=True, capture_output=True, text=True)
+        elapsed, peak = output.stdout.split()
+        print(f"{method:>8} {float(elapsed):>9.3f} {int(peak) / (1024 * 1024):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare the throughput of line counting with plain reads of the same files.
+
+Usage::
+
+    python benchmarks/lines.py [--mb N] [--file-kb N] [--processes N ...]
+
+A tree of source files totalling ``--mb`` megabytes is generated and read
+once to warm the page cache; then every file is read without looking at the
+data (the upper bound, what the disk or cache delivers) and analyzed with
+``lines=True`` for each number of processes. Drop the page cache between
+runs (``echo 3 > /proc/sys/vm/drop_caches``) to measure against the disk.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from repolyze.core.analyze import analyze
+from repolyze.core.content.lines import BLOCK_SIZE
+
+_LINE = b"    result = compute(value, other_value)  # a typical line of code\n"
+
+
+def _make_tree(root: Path, total_mb: int, file_kb: int) -> None:
+    data = _LINE * (file_kb * 1024 // len(_LINE))
+    count = total_mb * 1024 // file_kb
+    for i in range(count):
+        sub = root / f"pkg{i % 16}" / f"mod{i // 16 % 64}"
+        sub.mkdir(parents=True, exist_ok=True)
+        (sub / f"file{i}.py").write_bytes(data)
+
+
+def _read_all(root: Path) -> int:
+    """Read every file into one buffer, without counting; return bytes read."""
+    buffer = bytearray(BLOCK_SIZE)
+    total = 0
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            with open(os.path.join(dirpath, name), "rb", buffering=0) as f:
+                while True:
+                    n = f.readinto(buffer)
+                    if not n:
+                        break
+                    total += n
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=int, default=256)
+    parser.add_argument("--file-kb", type=int, default=16)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _make_tree(root, args.mb, args.file_kb)
+        _read_all(root)
+
+        start = time.perf_counter()
+        total = _read_all(root)
+        elapsed = time.perf_counter() - start
+        mb = total / (1024 * 1024)
+        print(f"{'':>14} {'seconds':>9} {'MB/s':>9}")
+        print(f"{'read only':>14} {elapsed:>9.3f} {mb / elapsed:>9.0f}")
+
+        for processes in args.processes:
+            start = time.perf_counter()
+            stats = analyze(root, processes=processes, tree=False, lines=True)
+            elapsed = time.perf_counter() - start
+            label = f"lines, {processes}p"
+            print(f"{label:>14} {elapsed:>9.3f} {mb / elapsed:>9.0f}")
+
+    print(f"files: {stats.structure.total_files}, lines: {stats.language.total_lines_of_code}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark the parallel directory walk on a simulated high-latency filesystem.
+
+Usage::
+
+    python benchmarks/parallel_walk.py [--dirs N] [--latency-ms MS] [--workers N ...]
+
+Network filesystems and cold caches make every ``getdents``/``stat`` wait on
+the device. To reproduce that without FUSE, ``os.scandir`` is wrapped so that
+opening a directory and every ``DirEntry.stat()`` call sleep for the given
+latency (sleeping releases the GIL, as blocking I/O does).
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from repolyze.core.analyze import analyze
+
+
+class _SlowEntry:
+    def __init__(self, entry, latency: float):
+        self._entry = entry
+        self._latency = latency
+
+    def stat(self, *args, **kwargs):
+        time.sleep(self._latency)
+        return self._entry.stat(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+
+class _SlowScandir:
+    def __init__(self, path, latency: float):
+        time.sleep(latency)
+        self._it = _original_scandir(path)
+        self._latency = latency
+
+    def __iter__(self):
+        return (_SlowEntry(e, self._latency) for e in self._it)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+
+_original_scandir = os.scandir
+
+
+def _make_tree(root: Path, dirs: int, files_per_dir: int) -> None:
+    for d in range(dirs):
+        sub = root / f"group{d % 10}" / f"dir{d:04d}"
+        sub.mkdir(parents=True)
+        for f in range(files_per_dir):
+            (sub / f"file{f:03d}.txt").write_text("x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=200)
+    parser.add_argument("--files-per-dir", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _make_tree(root, args.dirs, args.files_per_dir)
+
+        os.scandir = lambda path=".": _SlowScandir(path, latency)
+        try:
+            baseline = None
+            print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+            for workers in args.workers:
+                start = time.perf_counter()
+                stats = analyze(root, workers=workers)
+                elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                print(f"{workers:>8} {elapsed:>9.3f} {baseline / elapsed:>7.1f}x")
+        finally:
+            os.scandir = _original_scandir
+
+    print(f"files: {stats.structure.total_files}, dirs: {stats.structure.total_dirs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark the SLOC classifier on the checked-in synthetic corpus.
+
+Usage::
+
+    python benchmarks/sloc.py [--mb N]
+
+The files in ``benchmarks/corpus/sloc`` contain one example of every
+construct the classifier has to tell apart (line and block comments,
+comment markers inside strings, multi-line and raw strings, docstrings).
+Their counts are first checked against ``expected.json``, counted by hand;
+then each file is repeated to ``--mb`` megabytes and classified, next to a
+plain newline count of the same buffer for reference.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from repolyze.core.content.sloc import LANGUAGES, classify
+
+CORPUS = Path(__file__).parent / "corpus" / "sloc"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=int, default=16)
+    args = parser.parse_args()
+
+    expected = json.loads((CORPUS / "expected.json").read_text())
+    for name, counts in sorted(expected.items()):
+        got = classify((CORPUS / name).read_bytes(), LANGUAGES[Path(name).suffix])
+        want = (counts["code"], counts["comment"], counts["blank"])
+        if got != want:
+            raise SystemExit(f"{name}: expected {want}, got {got}")
+
+    print(f"{'language':>12} {'MB/s':>8} {'newlines MB/s':>14}")
+    for name in sorted(expected):
+        sample = (CORPUS / name).read_bytes()
+        data = sample * (args.mb * 1024 * 1024 // len(sample))
+        mb = len(data) / (1024 * 1024)
+
+        start = time.perf_counter()
+        classify(data, LANGUAGES[Path(name).suffix])
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data.count(b"\n")
+        baseline = time.perf_counter() - start
+
+        language = LANGUAGES[Path(name).suffix]
+        print(f"{language:>12} {mb / elapsed:>8.0f} {mb / baseline:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
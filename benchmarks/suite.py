@@ -0,0 +1,159 @@
+"""Time the phases of an analysis on synthetic repositories.
+
+Usage::
+
+    python benchmarks/suite.py [--profiles P ...] [--scale N] [--repeat N]
+                               [--dir DIR] [--output FILE] [--compare FILE]
+
+For each profile of ``synthetic.py`` a tree is generated (in ``--dir`` if
+given, reusing it on later runs, else in a temporary directory) and these
+phases are timed separately, the best and median of ``--repeat`` runs:
+
+* ``scan``: ``scan_entries()``, listing and stat'ing the tree;
+* ``analyze``: ``analyze(tree=False)``, the scan plus the aggregation;
+* ``build_tree``: ``build_tree()``;
+* ``render_tree``: ``iter_tree()`` over the tree of the analysis;
+* ``to_dict``: ``RepoStats.to_dict()`` of the analysis, with its tree.
+
+``--output`` writes the results as JSON, with the commit and the Python
+version they were taken with. ``--compare`` reads such a file, taken for
+example on the parent commit, and prints the ratio of each best time to
+the one there; the exit status is 1 if any phase got slower by more than
+``--threshold``. Run ``nox -s benchmarks -- ARGS`` to run the suite in a
+fresh virtualenv.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+from synthetic import PROFILES, generate
+
+from repolyze.core.analyze import analyze
+from repolyze.core.filesystem.scan import scan_entries
+from repolyze.core.formatting.tree import iter_tree
+from repolyze.core.tree.build import build_tree
+
+PHASES = ("scan", "analyze", "build_tree", "render_tree", "to_dict")
+
+# Version of the layout of the results file
+RESULTS_VERSION = 1
+
+
+def _time(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"best": min(times), "median": statistics.median(times)}
+
+
+def run_profile(root: Path, repeat: int) -> Dict:
+    """Time each of ``PHASES`` on the tree at ``root``."""
+    stats = analyze(root)
+    phases = {
+        "scan": lambda: sum(1 for _ in scan_entries(root)),
+        "analyze": lambda: analyze(root, tree=False),
+        "build_tree": lambda: build_tree(root),
+        "render_tree": lambda: sum(1 for _ in iter_tree(stats.tree)),
+        "to_dict": stats.to_dict,
+    }
+    return {
+        "files": stats.structure.total_files,
+        "dirs": stats.structure.total_dirs,
+        "phases": {name: _time(phases[name], repeat) for name in PHASES},
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _print_results(results: Dict) -> None:
+    print(f"{'profile':<10} {'files':>8} " + " ".join(f"{p:>12}" for p in PHASES))
+    for profile, result in results.items():
+        times = " ".join(
+            f"{result['phases'][p]['best'] * 1000:10.1f}ms" for p in PHASES
+        )
+        print(f"{profile:<10} {result['files']:>8} {times}")
+
+
+def compare(old: Dict, new: Dict, threshold: float) -> bool:
+    """Print the ratio of each best time in ``new`` to the one in ``old``.
+
+    Returns whether any phase got slower by more than ``threshold``.
+    """
+    print(f"\nCompared with {old['commit'][:12]} (new / old best time):")
+    print(f"{'profile':<10} " + " ".join(f"{p:>12}" for p in PHASES))
+    regressed = False
+    for profile, result in new["results"].items():
+        before = old["results"].get(profile)
+        if before is None:
+            continue
+        cells = []
+        for phase in PHASES:
+            if phase not in before["phases"]:
+                cells.append(f"{'-':>12}")
+                continue
+            ratio = result["phases"][phase]["best"] / before["phases"][phase]["best"]
+            slower = ratio > 1 + threshold
+            regressed |= slower
+            cells.append(f"{ratio:11.2f}{'!' if slower else ' '}")
+        print(f"{profile:<10} " + " ".join(cells))
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES))
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dir", type=Path)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = args.dir if args.dir is not None else Path(tmp)
+        results = {}
+        for profile in args.profiles:
+            root = base / f"{profile}-x{args.scale}"
+            if not root.exists():
+                generate(profile, root, args.scale)
+            results[profile] = run_profile(root, args.repeat)
+
+    report = {
+        "version": RESULTS_VERSION,
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    _print_results(results)
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.compare is not None:
+        old = json.loads(args.compare.read_text())
+        if compare(old, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
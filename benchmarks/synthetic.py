@@ -0,0 +1,143 @@
+"""Generate deterministic synthetic repositories for the benchmark suite.
+
+Usage::
+
+    python benchmarks/synthetic.py PROFILE DIR [--scale N]
+
+Each profile stresses one dimension of a repository; see ``PROFILES``. The
+same profile and scale always give the same tree: names, sizes and ignore
+patterns come from a ``random.Random`` seeded with the profile name. Huge
+files are sparse, so they cost neither disk space nor time to create.
+"""
+
+import argparse
+import os
+import random
+from pathlib import Path
+from typing import Callable, Dict
+
+_EXTS = (".py", ".js", ".ts", ".c", ".go", ".md", ".json", ".txt", ".png", "")
+
+
+def _name(rng: random.Random, i: int) -> str:
+    return f"file{i:05d}{rng.choice(_EXTS)}"
+
+
+def _fill(path: Path, rng: random.Random, max_size: int) -> None:
+    path.write_bytes(b"x" * rng.randint(0, max_size))
+
+
+def wide(root: Path, scale: int) -> None:
+    """Few levels, many entries per directory: 50 directories of 400 files."""
+    rng = random.Random("wide")
+    for d in range(50):
+        sub = root / f"pkg{d:02d}"
+        sub.mkdir()
+        for i in range(400 * scale):
+            _fill(sub / _name(rng, i), rng, 4096)
+
+
+def deep(root: Path, scale: int) -> None:
+    """Long chains of directories: 5 chains 200 levels deep, 4 files a level."""
+    rng = random.Random("deep")
+    for chain in range(5 * scale):
+        sub = root / f"chain{chain}"
+        for level in range(200):
+            sub = sub / f"level{level}"
+            sub.mkdir(parents=True)
+            for i in range(4):
+                _fill(sub / _name(rng, i), rng, 1024)
+
+
+def tiny(root: Path, scale: int) -> None:
+    """Many tiny files, a quarter of them empty: 100 directories of 200."""
+    rng = random.Random("tiny")
+    for d in range(100):
+        sub = root / f"d{d // 10}" / f"d{d}"
+        sub.mkdir(parents=True)
+        for i in range(200 * scale):
+            _fill(sub / _name(rng, i), rng, 64 if rng.random() > 0.25 else 0)
+
+
+def huge(root: Path, scale: int) -> None:
+    """A few sparse files of 1 to 4 GiB among 100 small ones."""
+    rng = random.Random("huge")
+    (root / "data").mkdir()
+    for i in range(4 * scale):
+        with open(root / "data" / f"blob{i}.bin", "wb") as f:
+            f.truncate(rng.randint(1, 4) * 1024 ** 3)
+    (root / "src").mkdir()
+    for i in range(100):
+        _fill(root / "src" / _name(rng, i), rng, 4096)
+
+
+def gitignore(root: Path, scale: int) -> None:
+    """A .gitignore of 60 patterns in each of 40 directories of 100 files.
+
+    About half of the files and some whole directories are ignored.
+    """
+    rng = random.Random("gitignore")
+    (root / ".git" / "info").mkdir(parents=True)
+    (root / ".git" / "info" / "exclude").write_text("*.tmp\n")
+    for d in range(40):
+        sub = root / f"mod{d:02d}"
+        (sub / "generated").mkdir(parents=True)
+        patterns = [f"file{rng.randrange(100 * scale):05d}*" for _ in range(40)]
+        patterns += [f"*.{ext}" for ext in ("log", "o", "pyc", "class", "tmp")]
+        patterns += [f"**/cache{i}/" for i in range(10)]
+        patterns += ["generated/", "!generated/keep.txt", "/build-*", "*~", "#*#"]
+        (sub / ".gitignore").write_text("\n".join(patterns) + "\n")
+        for i in range(100 * scale):
+            ext = rng.choice(_EXTS + (".log", ".o", ".pyc"))
+            _fill(sub / f"file{i:05d}{ext}", rng, 2048)
+        for i in range(20):
+            _fill(sub / "generated" / f"out{i}.c", rng, 2048)
+
+
+def hardlinks(root: Path, scale: int) -> None:
+    """1000 files with two more hard links each, in other directories."""
+    rng = random.Random("hardlinks")
+    for d in ("a", "b", "c"):
+        (root / d).mkdir()
+    for i in range(1000 * scale):
+        name = _name(rng, i)
+        _fill(root / "a" / name, rng, 4096)
+        try:
+            os.link(root / "a" / name, root / "b" / name)
+            os.link(root / "a" / name, root / "c" / name)
+        except OSError:
+            # No hard links on this filesystem: plain copies instead
+            _fill(root / "b" / name, rng, 4096)
+            _fill(root / "c" / name, rng, 4096)
+
+
+PROFILES: Dict[str, Callable[[Path, int], None]] = {
+    "wide": wide,
+    "deep": deep,
+    "tiny": tiny,
+    "huge": huge,
+    "gitignore": gitignore,
+    "hardlinks": hardlinks,
+}
+
+
+def generate(profile: str, root: Path, scale: int = 1) -> Path:
+    """Create the tree of ``profile`` in ``root`` (created; must not exist)."""
+    root = Path(root)
+    root.mkdir(parents=True)
+    PROFILES[profile](root, scale)
+    return root
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("profile", choices=PROFILES)
+    parser.add_argument("dir", type=Path)
+    parser.add_argument("--scale", type=int, default=1)
+    args = parser.parse_args()
+
+    generate(args.profile, args.dir, args.scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Count stat-family calls made per file by ``repolyze.analyze``.
+
+Usage::
+
+    python benchmarks/syscalls.py [--dirs N] [--files-per-dir N] [--source git-index]
+
+The counts are taken by wrapping ``os.stat``/``os.lstat``/``os.scandir`` for
+the duration of one ``analyze()`` call, so they include the calls made through
+``pathlib`` (Python 3.11+; older versions bind ``os.stat`` inside ``pathlib``
+at import time and will under-report). Entries returned by ``os.scandir`` are
+proxied so that ``DirEntry.stat()`` calls are counted too.
+
+With ``--source git-index`` the tree is committed to a fresh git repository
+(``git`` must be on PATH) and read back from its index.
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from repolyze.core.analyze import analyze
+
+
+def _make_tree(root: Path, dirs: int, files_per_dir: int) -> int:
+    for d in range(dirs):
+        sub = root / f"dir{d:04d}"
+        sub.mkdir()
+        for f in range(files_per_dir):
+            (sub / f"file{f:04d}.py").write_text("x" * f)
+    return dirs * files_per_dir
+
+
+class _CountingEntry:
+    """Proxy for ``os.DirEntry`` that counts ``stat()`` calls."""
+
+    def __init__(self, entry, counts: Counter):
+        self._entry = entry
+        self._counts = counts
+
+    def stat(self, *args, **kwargs):
+        self._counts["DirEntry.stat"] += 1
+        return self._entry.stat(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.path
+
+
+class _CountingScandir:
+    def __init__(self, it, counts: Counter):
+        self._it = it
+        self._counts = counts
+
+    def __iter__(self):
+        return (_CountingEntry(e, self._counts) for e in self._it)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+
+def _git_add(root: Path) -> None:
+    for args in (["init", "-q"], ["add", "-A"]):
+        subprocess.run(["git", *args], cwd=root, check=True)
+    # Let the index age past the files' mtimes so that no entry is racy
+    subprocess.run(["git", "update-index", "--really-refresh"], cwd=root, check=True)
+
+
+def count_calls(path: Path, **kwargs) -> Counter:
+    """Run ``analyze(path, **kwargs)`` and return the number of calls per stat function."""
+    counts = Counter()
+    originals = {name: getattr(os, name) for name in ("stat", "lstat", "scandir")}
+
+    def wrap(name):
+        original = originals[name]
+
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            result = original(*args, **kwargs)
+            if name == "scandir":
+                result = _CountingScandir(result, counts)
+            return result
+
+        return wrapper
+
+    for name in originals:
+        setattr(os, name, wrap(name))
+    try:
+        analyze(path, **kwargs)
+    finally:
+        for name, original in originals.items():
+            setattr(os, name, original)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=50)
+    parser.add_argument("--files-per-dir", type=int, default=100)
+    parser.add_argument("--source", choices=["walk", "git-index"], default="walk")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        total = _make_tree(root, args.dirs, args.files_per_dir)
+        if args.source == "git-index":
+            _git_add(root)
+        counts = count_calls(root, source=args.source)
+
+    stats = counts["stat"] + counts["lstat"] + counts["DirEntry.stat"]
+    print(f"files:                {total}")
+    print(f"directories:          {args.dirs}")
+    for name in sorted(counts):
+        print(f"{name + ' calls:':<22}{counts[name]}")
+    print(f"stat calls / file:    {stats / total:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -49,3 +49,14 @@ def docs(session):
 def test_with_py_versions(session):
     """Run tests on multiple Python versions."""
     base_test(session)
+
+
+@nox.session()
+def benchmarks(session):
+    """Run the benchmark suite, see benchmarks/suite.py for its arguments.
+
+    For example ``nox -s benchmarks -- --output results.json`` to keep the
+    timings, and ``--compare results.json`` on a later commit to compare.
+    """
+    install_repolyze(session)
+    session.run("python", "benchmarks/suite.py", *session.posargs)
@@ -1,3 +1,5 @@
 from repolyze.core.analyze import analyze
+from repolyze.core.batch import analyze_many
+from repolyze.core.records import FileRecord, file_records
 
-__all__ = ["analyze"]
+__all__ = ["analyze", "analyze_many", "file_records", "FileRecord"]
@@ -1,14 +1,69 @@
 import argparse
+import os
+import sys
 from pathlib import Path
+from typing import List, Optional
 import json
 
-from repolyze.core.analyze import analyze
+from repolyze.core.analyze import SOURCES, analyze
+from repolyze.core.batch import analyze_many
+from repolyze.core.diff import diff_snapshots
+from repolyze.core.content.sniff import DEFAULT_BUDGET
+from repolyze.core.filesystem.gitindex import GitIndexError
+from repolyze.core.formatting.json_writer import write_json
+from repolyze.core.formatting.profile import render_profile
+from repolyze.core.formatting.records import FORMATS, write_records
+from repolyze.core.formatting.tree import iter_tree
+from repolyze.core.profile import recording
+from repolyze.core.records import file_records
+from repolyze.core.watch import StatsWatcher
+from repolyze.models import BatchRollup
+from repolyze.models.snapshot import COMPRESSIONS, SnapshotError
 
+# Subcommands; without one, the arguments are those of "analyze"
+COMMANDS = ("analyze", "diff", "batch")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse ``argv`` (default: ``sys.argv[1:]``) into ``args.command``
+    and its options.
+
+    A command line not starting with one of ``COMMANDS`` is that of
+    "analyze", as before there were subcommands; a directory named like a
+    command is analyzed with ``repolyze analyze diff`` or ``repolyze ./diff``.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv = ["analyze", *argv]
 
-def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         prog="repolyze",
         description="Show quick statistics about a code repository",
+        epilog=(
+            "Without a command, 'analyze' is run: 'repolyze [PATH] [OPTIONS]'. "
+            "To analyze a directory named like a command, write "
+            "'repolyze ./diff' or 'repolyze analyze diff'."
+        ),
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    analyze_parser = _add_analyze_parser(subparsers)
+    _add_diff_parser(subparsers)
+    batch_parser = _add_batch_parser(subparsers)
+
+    args = parser.parse_args(argv)
+    if args.command == "analyze":
+        _check_analyze_args(analyze_parser, args)
+    elif args.command == "batch":
+        _check_batch_args(batch_parser, args)
+    return args
+
+
+def _add_analyze_parser(subparsers) -> argparse.ArgumentParser:
+    parser = subparsers.add_parser(
+        "analyze",
+        help="Show statistics about a repository (the default command)",
+        description="Show quick statistics about a code repository",
     )
 
     parser.add_argument(
@@ -24,20 +79,221 @@ def parse_args() -> argparse.Namespace:
         help="Output statistics as JSON",
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="With --json, write compact JSON without indentation",
+    )
 
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of threads listing directories in parallel (default: 1)",
+    )
 
-def main() -> None:
-    args = parse_args()
-    path = Path(args.path)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Number of processes aggregating top-level directories (default: 1)",
+    )
 
-    stats = analyze(path)
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=(
+            "Directory for a persistent scan cache; directories unchanged "
+            "since the last run are not rescanned"
+        ),
+    )
 
-    if args.json:
-        # Assumes stats can be converted to dict
-        print(json.dumps(stats.to_dict(), indent=2))
-        return
+    parser.add_argument(
+        "--source",
+        choices=SOURCES,
+        default="walk",
+        help=(
+            "Where to get the file list from: walk the directory tree "
+            "(default) or read the tracked files from .git/index"
+        ),
+    )
+
+    parser.add_argument(
+        "--verify-index",
+        action="store_true",
+        help="With --source=git-index, lstat every entry instead of trusting the index",
+    )
+
+    parser.add_argument(
+        "--no-tree",
+        action="store_true",
+        help=(
+            "Leave the directory tree out of the JSON output; memory use "
+            "then no longer grows with the number of files"
+        ),
+    )
+
+    parser.add_argument(
+        "--tree",
+        action="store_true",
+        help="Print the directory tree after the summary",
+    )
+
+    parser.add_argument(
+        "--tree-depth",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Expand the printed tree at most N levels deep (implies --tree)",
+    )
+
+    parser.add_argument(
+        "--tree-top",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "List only the N largest entries of each directory in the printed "
+            "tree (implies --tree)"
+        ),
+    )
+
+    parser.add_argument(
+        "--exact-quantiles",
+        action="store_true",
+        help=(
+            "Compute file size percentiles exactly instead of with a "
+            "constant-memory sketch"
+        ),
+    )
+
+    parser.add_argument(
+        "--lines",
+        action="store_true",
+        help="Count the lines of code files (reads every code file)",
+    )
+
+    parser.add_argument(
+        "--sloc",
+        action="store_true",
+        help="Count code, comment and blank lines per language (implies --lines)",
+    )
+
+    parser.add_argument(
+        "--detect",
+        action="store_true",
+        help=(
+            "Detect the language of files and binary files from their first "
+            "bytes (shebangs, modelines, magic numbers)"
+        ),
+    )
+
+    parser.add_argument(
+        "--detect-budget",
+        type=int,
+        default=DEFAULT_BUDGET // (1024 * 1024),
+        metavar="MB",
+        help=(
+            "With --detect, read at most this many MB in total; further "
+            "files are detected by extension (default: %(default)s)"
+        ),
+    )
+
+    parser.add_argument(
+        "--duplicates",
+        action="store_true",
+        help="Find files with identical contents and the bytes they waste",
+    )
+
+    parser.add_argument(
+        "--save",
+        default=None,
+        metavar="FILE",
+        help=(
+            "Also save the analysis to FILE as a binary snapshot, to load "
+            "with RepoStats.load() or compare with 'repolyze diff'"
+        ),
+    )
+
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSIONS,
+        default="zlib",
+        help="Compression of the --save snapshot (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--emit-files",
+        choices=FORMATS,
+        default=None,
+        help=(
+            "Instead of the summary, stream one record per file (path, size, "
+            "mtime, ext, inode and with --lines its lines) as NDJSON or CSV"
+        ),
+    )
 
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Time each phase of the analysis (wall and CPU) and count the "
+            "directories visited, entries pruned and stat calls; shown as a "
+            "table, or in the JSON output with --json"
+        ),
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "Keep running and print updated statistics whenever the "
+            "repository changes (one JSON document per line with --json)"
+        ),
+    )
+
+    return parser
+
+
+def _check_analyze_args(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> None:
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+    if args.watch and args.source != "walk":
+        parser.error("--watch only supports --source=walk")
+    if args.watch and (args.lines or args.sloc):
+        parser.error("--lines and --sloc are not supported with --watch")
+    if args.watch and args.detect:
+        parser.error("--detect is not supported with --watch")
+    if args.watch and args.duplicates:
+        parser.error("--duplicates is not supported with --watch")
+    if args.detect_budget < 0:
+        parser.error("--detect-budget must not be negative")
+    if args.tree_depth is not None or args.tree_top is not None:
+        args.tree = True
+    if args.tree and args.no_tree:
+        parser.error("--tree cannot be combined with --no-tree")
+    if args.tree_depth is not None and args.tree_depth < 0:
+        parser.error("--tree-depth must not be negative")
+    if args.tree_top is not None and args.tree_top < 1:
+        parser.error("--tree-top must be at least 1")
+    if args.watch and args.save:
+        parser.error("--save is not supported with --watch")
+    if args.watch and args.profile:
+        parser.error("--profile is not supported with --watch")
+    if args.emit_files and (
+        args.json or args.watch or args.tree or args.sloc or args.detect
+        or args.duplicates or args.save or args.profile
+    ):
+        parser.error(
+            "--emit-files only combines with --source, --verify-index, "
+            "--workers and --lines"
+        )
+
+
+def print_summary(stats) -> None:
     # Human-readable output (keep this simple)
     print(f"Repository: {stats.path}")
     print("-" * 40)
@@ -46,6 +302,22 @@ def main() -> None:
     print(f"Directories:  {stats.structure.total_dirs}")
     print(f"Total size (bytes):   {stats.size.total_size} bytes")
     print(f"Total size (MB):   {stats.size.total_size / (1024 * 1024):.2f} MB")
+    if stats.language.total_lines_of_code is not None:
+        print(f"Lines of code:     {stats.language.total_lines_of_code}")
+    if stats.language.primary_language is not None:
+        print(f"Primary language:  {stats.language.primary_language}")
+    if stats.language.binary_files is not None:
+        print(f"Binary files:      {stats.language.binary_files}")
+
+    if stats.language.files_by_language is not None:
+        print("\nFiles by detected language:")
+        for language, count in stats.language.files_by_language.items():
+            print(f"{language}: {count}")
+
+    if stats.language.lines_by_language is not None:
+        print("\nLines by language (code / comment / blank):")
+        for language, counts in stats.language.lines_by_language.items():
+            print(f"{language}: {counts.code} / {counts.comment} / {counts.blank}")
 
     print("\nFile types by count:")
     for ext, count in stats.file_types.count_by_extension.items():
@@ -56,7 +328,294 @@ def main() -> None:
         rel_path = f.path.relative_to(stats.path)
         size_mb = f.size / (1024 * 1024)
         print(f"{rel_path} ({size_mb:.2f} MB)")
+    unlisted = stats.size.large_file_count - len(stats.size.large_files)
+    if unlisted > 0:
+        print(f"... and {unlisted} more")
+
+    hygiene = stats.hygiene
+    if hygiene.duplicate_groups is not None:
+        wasted_mb = hygiene.wasted_bytes / (1024 * 1024)
+        print(
+            f"\nDuplicate files: {hygiene.duplicate_group_count} groups, "
+            f"{wasted_mb:.2f} MB wasted"
+        )
+        for group in hygiene.duplicate_groups:
+            paths = ", ".join(str(p.relative_to(stats.path)) for p in group.paths)
+            print(f"{group.size} bytes x {len(group.paths)}: {paths}")
+        unlisted = hygiene.duplicate_group_count - len(hygiene.duplicate_groups)
+        if unlisted > 0:
+            print(f"... and {unlisted} more")
+
+
+def print_tree(stats, args: argparse.Namespace) -> None:
+    """Print the tree of ``stats`` line by line, as it is rendered."""
+    print("\nTree:")
+    for line in iter_tree(stats.tree, args.tree_depth, args.tree_top):
+        print(line)
+
+
+def print_profile(stats) -> None:
+    """Print the timings and counters of a profiled analysis."""
+    print("\nProfile:")
+    for line in render_profile(stats.profile):
+        print(line)
+
+
+def watch(path: Path, as_json: bool, args: Optional[argparse.Namespace] = None) -> None:
+    """Print the stats of ``path`` and again after every change, until ^C."""
+    try:
+        with StatsWatcher(path) as watcher:
+            for stats in watcher:
+                if as_json:
+                    print(json.dumps(stats.to_dict()), flush=True)
+                else:
+                    print_summary(stats)
+                    if args is not None and args.tree:
+                        print_tree(stats, args)
+                    print(flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+def _add_diff_parser(subparsers) -> argparse.ArgumentParser:
+    parser = subparsers.add_parser(
+        "diff",
+        help="Compare two analyses saved with --save",
+        description="Compare two analyses saved with --save",
+    )
+    parser.add_argument("old", help="The earlier snapshot")
+    parser.add_argument("new", help="The later snapshot")
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output the differences as JSON",
+    )
+    return parser
+
+
+def _print_changes(title: str, changes) -> None:
+    if not changes:
+        return
+    print(f"\n{title}:")
+    for change in changes:
+        if change.old_size is None:
+            print(f"{change.path} ({change.new_size} bytes)")
+        elif change.new_size is None:
+            print(f"{change.path} ({change.old_size} bytes)")
+        else:
+            print(
+                f"{change.path}: {change.old_size} -> {change.new_size} bytes "
+                f"({change.delta:+d})"
+            )
+
+
+def print_diff(diff) -> None:
+    print(f"Comparing: {diff.old_path} -> {diff.new_path}")
+    print("-" * 40)
+
+    if diff.compared_files:
+        print(f"Files added:    {diff.added_files} (+{diff.added_bytes} bytes)")
+        print(f"Files removed:  {diff.removed_files} (-{diff.removed_bytes} bytes)")
+        print(f"Files grown:    {diff.grown_files} (+{diff.grown_bytes} bytes)")
+        print(f"Files shrunk:   {diff.shrunk_files} (-{diff.shrunk_bytes} bytes)")
+        _print_changes("Largest added files", diff.largest_added)
+        _print_changes("Largest removed files", diff.largest_removed)
+        _print_changes("Most grown files", diff.most_grown)
+        if diff.dir_deltas:
+            print("\nDirectory size changes:")
+            for change in diff.dir_deltas:
+                print(f"{change.path}/: {change.delta:+d} bytes")
+    else:
+        print("Files not compared: a snapshot was saved without its tree")
+
+    if diff.extension_deltas:
+        print("\nFile types (files / bytes):")
+        for ext, delta in diff.extension_deltas.items():
+            print(f"{ext}: {delta.files:+d} / {delta.size:+d}")
+
+    if diff.hygiene_changes:
+        print("\nHygiene:")
+        for name, counts in diff.hygiene_changes.items():
+            print(f"{name}: {counts.old} -> {counts.new}")
+
+
+def diff_main(args: argparse.Namespace) -> None:
+    try:
+        diff = diff_snapshots(args.old, args.new)
+    except (OSError, SnapshotError) as e:
+        sys.exit(f"repolyze: {e}")
+
+    if args.json:
+        print(json.dumps(diff.to_dict(), indent=2))
+        return
+
+    print_diff(diff)
+
+
+def _add_batch_parser(subparsers) -> argparse.ArgumentParser:
+    parser = subparsers.add_parser(
+        "batch",
+        help="Analyze many repositories, printing JSON lines and a roll-up",
+        description=(
+            "Analyze many repositories with one pool of worker processes; "
+            "print one JSON document per repository, then a roll-up"
+        ),
+    )
+    parser.add_argument("paths", nargs="*", help="Paths to the repositories")
+    parser.add_argument(
+        "--from-file",
+        default=None,
+        metavar="FILE",
+        help="Read more paths from FILE, one per line ('-' for stdin)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of repositories analyzed at once (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of threads listing directories, per repository (default: 1)",
+    )
+    parser.add_argument("--cache-dir", default=None, help="As for a single repository")
+    parser.add_argument("--source", choices=SOURCES, default="walk")
+    parser.add_argument("--exact-quantiles", action="store_true")
+    parser.add_argument("--lines", action="store_true")
+    parser.add_argument("--sloc", action="store_true")
+    parser.add_argument("--detect", action="store_true")
+    parser.add_argument("--duplicates", action="store_true")
+    return parser
+
+
+def _check_batch_args(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> None:
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.from_file is not None:
+        try:
+            if args.from_file == "-":
+                lines = sys.stdin.read().splitlines()
+            else:
+                with open(args.from_file, encoding="utf-8") as f:
+                    lines = f.read().splitlines()
+        except OSError as e:
+            parser.error(f"cannot read --from-file: {e}")
+        args.paths += [
+            line.strip() for line in lines
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+    if not args.paths:
+        parser.error("no repositories given")
+
+
+def batch_main(args: argparse.Namespace) -> None:
+    results = analyze_many(
+        args.paths,
+        processes=args.processes,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        source=args.source,
+        exact_quantiles=args.exact_quantiles,
+        lines=args.lines,
+        sloc=args.sloc,
+        detect=args.detect,
+        duplicates=args.duplicates,
+    )
+    rollup = BatchRollup()
+    for path, result in results:
+        if isinstance(result, Exception):
+            rollup.failed += 1
+            error = {"path": str(path), "error": str(result)}
+            print(json.dumps(error, separators=(",", ":")), flush=True)
+        else:
+            rollup.add(result)
+            write_json(result, sys.stdout, compact=True)
+            print(flush=True)
+    print(json.dumps({"rollup": rollup.to_dict()}, separators=(",", ":")))
+    if rollup.failed:
+        sys.exit(f"repolyze: {rollup.failed} repositories could not be analyzed")
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "diff":
+        diff_main(args)
+        return
+    if args.command == "batch":
+        batch_main(args)
+        return
+
+    path = Path(args.path)
+
+    if args.watch:
+        watch(path, args.json, args)
+        return
+
+    if args.emit_files:
+        records = file_records(
+            path,
+            workers=args.workers,
+            source=args.source,
+            verify_index=args.verify_index,
+            lines=args.lines,
+        )
+        if args.emit_files == "csv":
+            # csv.writer() ends rows with \r\n itself, which a stdout that
+            # translates newlines (on Windows) would turn into \r\r\n
+            sys.stdout.reconfigure(newline="")
+        try:
+            write_records(records, sys.stdout, args.emit_files)
+        except GitIndexError as e:
+            sys.exit(f"repolyze: {e}")
+        return
+
+    try:
+        stats = analyze(
+            path,
+            workers=args.workers,
+            processes=args.processes,
+            cache_dir=args.cache_dir,
+            source=args.source,
+            verify_index=args.verify_index,
+            # The JSON output and snapshots include the tree unless --no-tree
+            tree=args.tree or (
+                (args.json or args.save is not None) and not args.no_tree
+            ),
+            exact_quantiles=args.exact_quantiles,
+            lines=args.lines,
+            sloc=args.sloc,
+            detect=args.detect,
+            detect_budget=args.detect_budget * 1024 * 1024,
+            duplicates=args.duplicates,
+            profile=args.profile,
+        )
+    except GitIndexError as e:
+        sys.exit(f"repolyze: {e}")
+    profile = stats.profile if args.profile else None
+
+    if args.save:
+        with recording(profile, "serialize"):
+            stats.save(args.save, args.compression)
+
+    if args.json:
+        # Written as it is encoded, rather than built as one string; the
+        # profile, if any, comes last and times the rest
+        write_json(stats, sys.stdout, compact=args.compact)
+        print()
+        return
 
+    with recording(profile, "serialize"):
+        print_summary(stats)
+        if args.tree:
+            print_tree(stats, args)
+    if profile is not None:
+        print_profile(stats)
 
 if __name__ == "__main__":
     main()
@@ -1,159 +1,82 @@
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from collections import defaultdict
-from datetime import datetime, timedelta
-from statistics import median
-from typing import Union
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
-from repolyze.core.filesystem.scan import scan
-from repolyze.core.filesystem.paths import depth
-from repolyze.core.tree.build import build_tree
-from repolyze.models import (
-    RepoStats, FileStat, DirStat,
-    StructureStats, SizeStats, FileTypeStats,
-    LanguageStats, TimeStats, HygieneStats,
-    MetadataStats
-)
+from repolyze.core.content.duplicates import DuplicateFinder, fill_duplicates
+from repolyze.core.content.lines import LineCounter, fill_file_lines
+from repolyze.core.content.sniff import DEFAULT_BUDGET, EXTENSIONS, ContentSniffer
+from repolyze.core.filesystem.cache import ScanCache
+from repolyze.core.filesystem.gitindex import index_entries
+from repolyze.core.filesystem.gitignore import IgnoreRules, root_rules
+from repolyze.core.filesystem.paths import suffix
+from repolyze.core.filesystem.scan import ScanEntry, scan_dir, scan_subtree
+from repolyze.core.profile import Profiler, timed
+from repolyze.core.stats.aggregate import PartialStats
+from repolyze.core.tree.build import TreeBuilder
+from repolyze.models import RepoStats, MetadataStats, ProfileStats, TreeNode
 
 
-CODE_EXTS = {".py", ".js", ".ts", ".java", ".c", ".cpp", ".rs", ".go"}
-TEMP_EXTS = {".tmp", ".bak", "~"}
+# Where the file set comes from: a directory walk, or the git index
+SOURCES = ("walk", "git-index")
 
+# Entries handled at a time when profiling, so that the clocks are read per
+# batch rather than per entry
+PROFILE_BATCH = 1024
 
-def analyze(path: Union[str, Path]) -> RepoStats:
-    # Convert string to Path if needed
-    if isinstance(path, str):
-        path = Path(path)
-    path = path.resolve()
+# Bytes left of the detection budget, shared by the shard workers
+_remaining = None
 
-    files = []
-    dirs = []
-    now = datetime.now()
-    ages = []
 
-    count_by_ext = defaultdict(int)
-    size_by_ext = defaultdict(int)
+def _init_worker(remaining) -> None:
+    global _remaining
+    _remaining = remaining
 
-    modified_24h = modified_7d = modified_30d = 0
-    empty_files = hidden_files = temp_files = 0
-    large_files = []
-    
-    # Track inodes to avoid double-counting hard links
-    seen_inodes = set()
 
-    for p in scan(path):
-        if p.is_dir():
-            dirs.append(p)
-            continue
+def _detect(stats: PartialStats, sniffer: ContentSniffer, entry: ScanEntry) -> None:
+    """Add the language of file ``entry``, by name once the budget is used up."""
+    try:
+        sniff = sniffer.sniff(entry)
+    except OSError:
+        stats.add_unreadable()
+        return
+    if sniff is None:
+        language = EXTENSIONS.get(suffix(entry.name).lower())
+        stats.add_language(language, sniffed=False)
+    else:
+        stats.add_language(sniff.language, sniff.binary)
 
-        # Use os.stat to get inode info, don't follow symlinks
-        try:
-            stat = os.stat(p, follow_symlinks=False)
-        except (OSError, PermissionError):
-            # Skip files we can't access
-            continue
-        
-        # Skip symlinks entirely
-        if os.path.islink(p):
-            continue
-        
-        # Check if we've already counted this inode (hard link detection)
-        inode = (stat.st_dev, stat.st_ino)
-        if inode in seen_inodes:
-            continue
-        seen_inodes.add(inode)
-        
-        size = stat.st_size
-        mtime = stat.st_mtime
-
-        files.append(FileStat(p, size, mtime))
-        ages.append((now - datetime.fromtimestamp(mtime)).days)
-
-        ext = p.suffix.lower() or "<no-ext>"
-        count_by_ext[ext] += 1
-        size_by_ext[ext] += size
-
-        if size == 0:
-            empty_files += 1
-
-        if p.name.startswith("."):
-            hidden_files += 1
-
-        if ext in TEMP_EXTS:
-            temp_files += 1
-
-        if size > 5 * 1024 * 1024:
-            large_files.append(FileStat(p, size, mtime))
-
-        delta = now - datetime.fromtimestamp(mtime)
-        if delta <= timedelta(days=1):
-            modified_24h += 1
-        if delta <= timedelta(days=7):
-            modified_7d += 1
-        if delta <= timedelta(days=30):
-            modified_30d += 1
-
-    # ---------- Structure ----------
-    max_depth = max((depth(path, d) for d in dirs), default=0)
-    deepest = [
-        DirStat(d, depth(path, d))
-        for d in dirs if depth(path, d) == max_depth
-    ]
-
-    structure = StructureStats(
-        total_files=len(files),
-        total_dirs=len(dirs),
-        max_depth=max_depth,
-        deepest_paths=deepest,
-    )
 
-    # ---------- Size ----------
-    total_size = sum(f.size for f in files)
-    avg_size = total_size / len(files) if files else 0
+def _batches(
+    entries: Iterable[ScanEntry], profiler: Optional[Profiler], phase: Optional[str] = None
+) -> Iterator[Iterable[ScanEntry]]:
+    """Split ``entries`` into lists of ``PROFILE_BATCH`` when profiling.
 
-    size_stats = SizeStats(
-        total_size=total_size,
-        average_file_size=avg_size,
-        large_files=large_files,
-        small_files=sorted(files, key=lambda f: f.size)[:5],
-    )
+    Each batch can then be gone through once per phase. Without a profiler
+    ``entries`` is yielded whole, for a single pass. ``phase`` is the phase
+    taking the entries from ``entries`` is timed as, if any.
+    """
+    if profiler is None:
+        yield entries
+        return
+    entries = iter(entries)
+    while True:
+        if phase is None:
+            batch = list(islice(entries, PROFILE_BATCH))
+        else:
+            with profiler.phase(phase):
+                batch = list(islice(entries, PROFILE_BATCH))
+        if not batch:
+            return
+        yield batch
 
-    # ---------- File types ----------
-    file_types = FileTypeStats(
-        count_by_extension=dict(count_by_ext),
-        size_by_extension=dict(size_by_ext),
-    )
-
-    # ---------- Language ----------
-    code_files = sum(count_by_ext[e] for e in CODE_EXTS if e in count_by_ext)
-    language = LanguageStats(
-        primary_language=max(count_by_ext, key=count_by_ext.get, default=None),
-        code_vs_non_code_ratio=(
-            code_files / len(files) if files else None
-        ),
-    )
 
-    # ---------- Time ----------
-    time_stats = TimeStats(
-        oldest_file=min(files, key=lambda f: f.mtime, default=None),
-        newest_file=max(files, key=lambda f: f.mtime, default=None),
-        modified_last_24h=modified_24h,
-        modified_last_7d=modified_7d,
-        modified_last_30d=modified_30d,
-        median_file_age_days=median(ages) if ages else None,
-    )
-
-    # ---------- Hygiene ----------
-    hygiene = HygieneStats(
-        empty_files=empty_files,
-        empty_dirs=0,
-        large_files=large_files,
-        temp_files=temp_files,
-        hidden_files=hidden_files,
-    )
-
-    # ---------- Metadata ----------
-    metadata = MetadataStats(
+def collect_metadata(path: Path) -> MetadataStats:
+    """Check the repository root for the usual project files."""
+    return MetadataStats(
         readme_present=(path / "README.md").exists(),
         license_present=(path / "LICENSE").exists(),
         gitignore_present=(path / ".gitignore").exists(),
@@ -164,17 +87,340 @@ def analyze(path: Union[str, Path]) -> RepoStats:
         ],
     )
 
-    # ---------- Tree ----------
-    tree = build_tree(path)
-
-    return RepoStats(
-        path=path,
-        structure=structure,
-        size=size_stats,
-        file_types=file_types,
-        language=language,
-        time=time_stats,
-        hygiene=hygiene,
-        metadata=metadata,
-        tree=tree,
+
+def _analyze_subtree(
+    root: str,
+    top: str,
+    rel_root: str,
+    rules: IgnoreRules,
+    now: float,
+    workers: int,
+    cache: Optional[ScanCache],
+    with_tree: bool = True,
+    exact_quantiles: bool = False,
+    lines: bool = False,
+    sloc: bool = False,
+    sniffer: Optional[ContentSniffer] = None,
+    duplicates: bool = False,
+    profile: bool = False,
+) -> Tuple[
+    PartialStats, List[ScanEntry], Optional[TreeNode], Optional[ScanCache],
+    Optional[ContentSniffer], Optional[DuplicateFinder], Optional[ProfileStats],
+]:
+    """Aggregate one top-level subtree; runs in a worker process.
+
+    Files with several hard links may also appear in another shard, so they
+    are returned as entries for the parent to deduplicate instead of being
+    counted here. Only aggregates, those few entries, the subtree's TreeNode
+    and the shard's part of the scan cache and of the detection memo travel
+    back to the parent, along with the candidate duplicates; these are only
+    hashed once all shards are merged. With ``profile`` so does the profile
+    of the shard.
+    """
+    partial = PartialStats(
+        Path(root), now, exact_quantiles, lines, sloc, sniffer is not None
+    )
+    partial.add_shard_top(top)
+    tree = TreeBuilder(Path(top)) if with_tree else None
+    counter = LineCounter(partial) if lines else None
+    if sniffer is not None:
+        sniffer.remaining = _remaining
+    finder = DuplicateFinder() if duplicates else None
+    profiler = Profiler() if profile else None
+    add_to_tree = tree.add if tree is not None and profiler is None else None
+    linked = []
+
+    entries = scan_subtree(
+        top, rel_root, rules, workers=workers, cache=cache, profiler=profiler
     )
+    for batch in _batches(entries, profiler):
+        if tree is not None and profiler is not None:
+            with profiler.phase("tree"):
+                for entry in batch:
+                    tree.add(entry)
+        with timed(profiler, "aggregate"):
+            for entry in batch:
+                if add_to_tree is not None:
+                    add_to_tree(entry)
+                if entry.is_dir:
+                    partial.add_dir(entry)
+                elif entry.nlink != 1:
+                    linked.append(entry)
+                else:
+                    partial.add_file(entry)
+                    if counter is not None:
+                        counter.add(entry)
+                    if sniffer is not None:
+                        _detect(partial, sniffer, entry)
+                    if finder is not None:
+                        finder.add(entry)
+
+    with timed(profiler, "aggregate"):
+        if counter is not None:
+            counter.close()
+        if sniffer is not None:
+            sniffer.trim()
+
+    with timed(profiler, "tree"):
+        subtree = tree.build() if tree is not None else None
+    shard_profile = profiler.stats if profiler is not None else None
+    return partial, linked, subtree, cache, sniffer, finder, shard_profile
+
+
+def _analyze_sharded(
+    path: Path,
+    now: float,
+    workers: int,
+    processes: int,
+    cache: Optional[ScanCache],
+    with_tree: bool = True,
+    exact_quantiles: bool = False,
+    lines: bool = False,
+    sloc: bool = False,
+    sniffer: Optional[ContentSniffer] = None,
+    finder: Optional[DuplicateFinder] = None,
+    profiler: Optional[Profiler] = None,
+) -> Tuple[PartialStats, Optional[TreeNode]]:
+    """Aggregate each top-level directory in its own process and merge."""
+    stats = PartialStats(path, now, exact_quantiles, lines, sloc, sniffer is not None)
+    tree = TreeBuilder(path) if with_tree else None
+    counter = LineCounter(stats) if lines else None
+    remaining = None
+    if sniffer is not None:
+        # One budget for all processes
+        remaining = multiprocessing.Value("q", sniffer.budget)
+        sniffer.remaining = remaining
+
+    def add_file(entry: ScanEntry) -> None:
+        if not stats.add_file(entry):
+            return
+        if counter is not None:
+            counter.add(entry)
+        if sniffer is not None:
+            _detect(stats, sniffer, entry)
+        if finder is not None:
+            finder.add(entry)
+
+    # The root itself is listed here; its subdirectories become the shards
+    list_dir = cache.scan_dir if cache is not None else scan_dir
+    top_dirs, top_files, rules = list_dir(os.fspath(path), "", root_rules(path), profiler)
+    for entry in top_dirs:
+        stats.add_dir(entry)
+    for entry in top_files:
+        if tree is not None:
+            tree.add(entry)
+        add_file(entry)
+
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(remaining,)
+    ) as pool:
+        futures = [
+            pool.submit(
+                _analyze_subtree,
+                os.fspath(path), entry.path, entry.name, rules, now, workers,
+                cache.subset(entry.name) if cache is not None else None,
+                with_tree, exact_quantiles, lines, sloc, sniffer,
+                finder is not None, profiler is not None,
+            )
+            for entry in top_dirs
+        ]
+        # Merge in submission order so that the result is deterministic
+        shards = [future.result() for future in futures]
+
+    for partial, _, subtree, shard_cache, shard_sniffer, shard_finder, shard_profile in shards:
+        with timed(profiler, "aggregate"):
+            stats.merge(partial)
+        if tree is not None:
+            with timed(profiler, "tree"):
+                tree.graft(subtree)
+        if cache is not None:
+            cache.update(shard_cache)
+        if sniffer is not None:
+            sniffer.update(shard_sniffer)
+        if finder is not None:
+            finder.merge(shard_finder)
+        if profiler is not None:
+            profiler.merge(shard_profile)
+    with timed(profiler, "aggregate"):
+        for _, linked, *_ in shards:
+            for entry in linked:
+                add_file(entry)
+        if counter is not None:
+            counter.close()
+
+    with timed(profiler, "tree"):
+        node = tree.build() if tree is not None else None
+    return stats, node
+
+
+def analyze(
+    path: Union[str, Path],
+    workers: int = 1,
+    processes: int = 1,
+    cache_dir: Optional[Union[str, Path]] = None,
+    source: str = "walk",
+    verify_index: bool = False,
+    tree: bool = True,
+    exact_quantiles: bool = False,
+    lines: bool = False,
+    sloc: bool = False,
+    detect: bool = False,
+    detect_budget: int = DEFAULT_BUDGET,
+    duplicates: bool = False,
+    profile: bool = False,
+) -> RepoStats:
+    """Analyze the repository at ``path``.
+
+    ``workers`` sets how many threads list directories concurrently; values
+    above 1 speed up scans of network or cold-cache filesystems and give the
+    same results as a serial scan.
+
+    With ``processes`` above 1 each top-level directory is aggregated in a
+    separate process, for trees large enough that the per-file work rather
+    than the I/O is the bottleneck. The results are the same.
+
+    ``cache_dir`` enables a persistent scan cache (see ``ScanCache``):
+    directories whose mtime has not changed since the previous run are not
+    listed or stat'ed again.
+
+    With ``source="git-index"`` the tracked files are read from the git
+    index of ``path`` instead of walking the tree (see ``index_entries()``;
+    ``verify_index`` lstat's every entry). ``workers``, ``processes`` and
+    ``cache_dir`` only apply to the walk. Raises GitIndexError if ``path``
+    has no readable index. The index has no link counts, so unlike the walk,
+    which counts each inode once, it counts a file with several hard links
+    once per tracked path, unless ``verify_index`` is set.
+
+    Aggregation runs in memory independent of the number of files, except
+    for the TreeNode tree, which has a node per file and directory; pass
+    ``tree=False`` to leave it out (``RepoStats.tree`` is then None).
+
+    File size percentiles are estimated with a streaming sketch (rank error
+    under 2%); ``exact_quantiles`` computes them exactly instead, at the
+    cost of memory proportional to the number of distinct file sizes.
+
+    ``lines`` counts the lines of code files (see ``CODE_EXTS``), for
+    ``LanguageStats.total_lines_of_code``, ``FileTypeStats.lines_by_extension``
+    and the ``lines`` of the code files listed in the results. Unlike the
+    rest of the analysis this reads every code file. With ``processes``
+    above 1 the files are read in parallel, by the worker of each top-level
+    directory, or for the git index source by a pool reading batches of
+    files while the index is parsed.
+
+    ``sloc`` also counts code, comment and blank lines per language, for
+    ``LanguageStats.lines_by_language`` (see ``classify()``); it implies
+    ``lines``.
+
+    ``detect`` tells the language of each file from its first few KB (see
+    ``ContentSniffer``), for ``LanguageStats.files_by_language`` and
+    ``binary_files``, and bases ``primary_language`` on it. At most
+    ``detect_budget`` bytes are read for this per run, by all processes
+    together; the remaining files are told apart by extension. With
+    ``cache_dir`` the results are kept for the next run.
+
+    ``duplicates`` looks for files with identical contents (see
+    ``DuplicateFinder``), for the duplicate fields of ``HygieneStats``;
+    hard links are not duplicates. Only files sharing their size with
+    another file are read, most of them only in part.
+
+    ``profile`` records the wall and CPU time of each phase of the analysis
+    (see ``repolyze.core.profile.PHASES``) and counts the directories
+    listed, the entries pruned and the stat calls, in ``RepoStats.profile``.
+    The phases overlap in a streaming analysis, so entries are then handled
+    in batches, a phase at a time, and the clocks read once per batch and
+    per directory. With ``processes`` above 1 the phases of the worker
+    processes are added up, and can exceed the total. "serialize" is left
+    to ``write_json()``.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"unknown source: {source!r}")
+    profiler = Profiler() if profile else None
+
+    # Convert string to Path if needed
+    if isinstance(path, str):
+        path = Path(path)
+    path = path.resolve()
+
+    lines = lines or sloc
+    now = time.time()
+    cache = None
+    if cache_dir is not None and source == "walk":
+        cache = ScanCache.open(Path(cache_dir), path)
+    sniffer = None
+    if detect:
+        if cache_dir is not None:
+            sniffer = ContentSniffer.open(Path(cache_dir), path, detect_budget)
+        else:
+            sniffer = ContentSniffer(detect_budget)
+    finder = DuplicateFinder() if duplicates else None
+
+    if processes > 1 and source == "walk":
+        stats, node = _analyze_sharded(
+            path, now, workers, processes, cache, tree, exact_quantiles,
+            lines, sloc, sniffer, finder, profiler,
+        )
+    else:
+        if source == "git-index":
+            entries = index_entries(path, verify=verify_index, profiler=profiler)
+            # The index is read as the entries are taken, in place of a walk
+            pull_phase = "walk"
+        else:
+            entries = scan_subtree(
+                os.fspath(path), "", root_rules(path), workers=workers,
+                cache=cache, profiler=profiler,
+            )
+            # scan_dir() times its own phases
+            pull_phase = None
+        stats = PartialStats(path, now, exact_quantiles, lines, sloc, detect)
+        pool = None
+        if lines and processes > 1:
+            pool = ProcessPoolExecutor(max_workers=processes)
+        counter = LineCounter(stats, pool, processes) if lines else None
+        # The tree is built during the same traversal as the stats; when
+        # profiling, in a pass of its own over each batch
+        builder = TreeBuilder(path) if tree else None
+        add_to_tree = builder.add if builder is not None and profiler is None else None
+        try:
+            for batch in _batches(entries, profiler, pull_phase):
+                if builder is not None and profiler is not None:
+                    with profiler.phase("tree"):
+                        for entry in batch:
+                            builder.add(entry)
+                with timed(profiler, "aggregate"):
+                    for entry in batch:
+                        if add_to_tree is not None:
+                            add_to_tree(entry)
+                        if entry.is_dir:
+                            stats.add_dir(entry)
+                        elif stats.add_file(entry):
+                            if counter is not None:
+                                counter.add(entry)
+                            if sniffer is not None:
+                                _detect(stats, sniffer, entry)
+                            if finder is not None:
+                                finder.add(entry)
+            with timed(profiler, "aggregate"):
+                if counter is not None:
+                    counter.close()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        with timed(profiler, "tree"):
+            node = builder.build() if builder is not None else None
+
+    if cache is not None:
+        cache.save()
+    if sniffer is not None:
+        sniffer.save()
+
+    with timed(profiler, "metadata"):
+        metadata = collect_metadata(path)
+    with timed(profiler, "aggregate"):
+        result = stats.finalize(metadata, node)
+        if lines:
+            fill_file_lines(result)
+        if finder is not None:
+            fill_duplicates(result, finder.find())
+    if profiler is not None:
+        result.profile = profiler.finish()
+    return result
@@ -0,0 +1,88 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple, Union
+
+from repolyze.core.analyze import analyze
+from repolyze.core.filesystem.gitignore import git_dir
+from repolyze.models import RepoStats
+
+# Repositories queued per worker process, so that results stream out while
+# the rest wait their turn without all being submitted at once
+QUEUE_PER_WORKER = 2
+
+# The outcome for one repository: its stats, or why it could not be analyzed
+BatchResult = Tuple[Path, Union[RepoStats, Exception]]
+
+
+def estimate_size(path: Path) -> int:
+    """A cheap estimate of the work to analyze ``path``, for scheduling.
+
+    The size of the git index grows with the number of tracked files and
+    costs a single ``stat``; directories without one count as 0.
+    """
+    gd = git_dir(path)
+    if gd is None:
+        return 0
+    try:
+        return os.stat(gd / "index").st_size
+    except OSError:
+        return 0
+
+
+def _analyze_one(path: Path, options: dict) -> RepoStats:
+    """Analyze one repository in a batch worker."""
+    if not path.is_dir():
+        raise NotADirectoryError(f"{path} is not a directory")
+    return analyze(path, **options)
+
+
+def analyze_many(
+    paths: Iterable[Union[str, Path]], processes: int = 1, **options
+) -> Iterator[BatchResult]:
+    """Analyze many repositories; yield ``(path, stats)`` as each finishes.
+
+    The repositories are spread over one pool of ``processes`` worker
+    processes, largest first by ``estimate_size()``, so that the big ones
+    do not start last and hold up the end of the batch. Workers live for
+    the whole batch: the compiled ignore matchers (``compile_patterns()``)
+    of one repository are reused for the next, and with a ``cache_dir`` so
+    are the scan caches of earlier runs.
+
+    ``options`` are those of ``analyze()``, applied to every repository;
+    each is analyzed in a single process, and without its tree unless
+    ``tree=True`` is given. Repositories that cannot be analyzed, missing,
+    without a git index for ``source="git-index"`` or failing in any other
+    way, are yielded with the exception instead of stats. Results come in the order they finish.
+    """
+    options = {"tree": False, **options, "processes": 1}
+    queue: List[Path] = [Path(p).resolve() for p in paths]
+    # Largest first, those of the same estimate in their order; reversed for
+    # pop()
+    queue.sort(key=estimate_size, reverse=True)
+    queue.reverse()
+
+    if processes <= 1:
+        while queue:
+            path = queue.pop()
+            try:
+                yield path, _analyze_one(path, options)
+            # Whatever goes wrong with one repository is reported for it,
+            # and the batch goes on
+            except Exception as e:
+                yield path, e
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = {}
+        while queue or pending:
+            while queue and len(pending) < processes * QUEUE_PER_WORKER:
+                path = queue.pop()
+                pending[pool.submit(_analyze_one, path, options)] = path
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    yield path, future.result()
+                except Exception as e:
+                    yield path, e
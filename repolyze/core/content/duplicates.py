@@ -0,0 +1,156 @@
+import hashlib
+import threading
+from collections import defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from repolyze.core.content.lines import BLOCK_SIZE
+from repolyze.core.filesystem.scan import ScanEntry
+from repolyze.models import DuplicateGroup, RepoStats
+
+# Bytes hashed at each end of a file before it is hashed in full
+EDGE_SIZE = 64 * 1024  # bytes
+# Groups listed in HygieneStats.duplicate_groups, the most wasteful first
+DUPLICATE_GROUPS_COUNT = 10
+
+# One read buffer per hashing thread
+_local = threading.local()
+
+# Files of the same size: (size, [path, ...])
+_Group = Tuple[int, List[str]]
+
+
+def _buffer() -> memoryview:
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = memoryview(bytearray(BLOCK_SIZE))
+    return buffer
+
+
+def _update(h, f, view: memoryview) -> None:
+    """Hash ``f`` from its position until the end of ``view`` or of the file."""
+    while view:
+        n = f.readinto(view)
+        if not n:
+            return
+        h.update(view[:n])
+        view = view[n:]
+
+
+def full_digest(path: str, size: int = 0) -> Optional[bytes]:
+    """BLAKE2 hash of the file at ``path``; None if it cannot be read."""
+    buffer = _buffer()
+    h = hashlib.blake2b(digest_size=32)
+    try:
+        with open(path, "rb", buffering=0) as f:
+            n = f.readinto(buffer)
+            while n:
+                h.update(buffer[:n])
+                n = f.readinto(buffer)
+    except OSError:
+        return None
+    return h.digest()
+
+
+def edge_digest(path: str, size: int) -> Optional[bytes]:
+    """Hash of the first and last ``EDGE_SIZE`` bytes of a file of ``size``.
+
+    Files of at most twice that size are hashed whole, with the same result
+    as ``full_digest()``.
+    """
+    if size <= 2 * EDGE_SIZE:
+        return full_digest(path)
+    edge = _buffer()[:EDGE_SIZE]
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb", buffering=0) as f:
+            _update(h, f, edge)
+            f.seek(size - EDGE_SIZE)
+            _update(h, f, edge)
+    except OSError:
+        return None
+    return h.digest()
+
+
+def _split(
+    pool: Executor, groups: List[_Group], digest: Callable[[str, int], Optional[bytes]]
+) -> List[_Group]:
+    """Split each group by the ``digest`` of its files, keeping the matches."""
+    jobs = [(path, size) for size, paths in groups for path in paths]
+    digests = pool.map(lambda job: digest(*job), jobs)
+    by_digest: Dict[Tuple[int, bytes], List[str]] = defaultdict(list)
+    for (path, size), value in zip(jobs, digests):
+        if value is not None:
+            by_digest[size, value].append(path)
+    return [
+        (size, paths) for (size, _), paths in by_digest.items() if len(paths) > 1
+    ]
+
+
+class DuplicateFinder:
+    """Find files with identical contents among the files of a scan.
+
+    ``add()`` takes the files, once each: pass only those for which
+    ``PartialStats.add_file()`` returned True, so that hard links to one
+    file are not taken for copies of it. ``find()`` then narrows them down
+    in stages, each reading only files still matching another one:
+
+    1. files of the same size;
+    2. of those, files whose first and last ``EDGE_SIZE`` bytes hash alike;
+    3. of those, files whose contents hash alike.
+
+    Most files have a unique size and are never opened, and most of the
+    rest differ in their first or last bytes. Hashing runs in a thread pool,
+    each thread reading into one reused buffer. Empty files are left out;
+    they are counted as ``empty_files``.
+    """
+
+    def __init__(self):
+        self.by_size: Dict[int, List[str]] = defaultdict(list)
+        # Bytes hashed by find(), in stages 2 and 3
+        self.bytes_read = 0
+
+    def add(self, entry: ScanEntry) -> None:
+        if entry.size > 0:
+            self.by_size[entry.size].append(entry.path)
+
+    def merge(self, other: "DuplicateFinder") -> None:
+        for size, paths in other.by_size.items():
+            self.by_size[size].extend(paths)
+
+    def find(self, threads: Optional[int] = None) -> List[_Group]:
+        """Return the groups of identical files as ``(size, paths)``.
+
+        ``threads`` defaults to the size of a ``ThreadPoolExecutor``.
+        """
+        groups = [
+            (size, paths) for size, paths in self.by_size.items() if len(paths) > 1
+        ]
+        if not groups:
+            return []
+
+        with ThreadPoolExecutor(threads) as pool:
+            self.bytes_read += sum(
+                min(size, 2 * EDGE_SIZE) * len(paths) for size, paths in groups
+            )
+            groups = _split(pool, groups, edge_digest)
+            # Files hashed whole already
+            done = [(size, paths) for size, paths in groups if size <= 2 * EDGE_SIZE]
+            rest = [(size, paths) for size, paths in groups if size > 2 * EDGE_SIZE]
+            self.bytes_read += sum(size * len(paths) for size, paths in rest)
+            groups = done + _split(pool, rest, full_digest)
+
+        return [(size, sorted(paths)) for size, paths in groups]
+
+
+def fill_duplicates(stats: RepoStats, groups: List[_Group]) -> None:
+    """Set the duplicate fields of ``stats.hygiene`` from ``find()`` results."""
+    groups = [
+        DuplicateGroup(size, [Path(p) for p in paths], size * (len(paths) - 1))
+        for size, paths in groups
+    ]
+    groups.sort(key=lambda g: (-g.wasted_bytes, g.paths[0]))
+    stats.hygiene.duplicate_groups = groups[:DUPLICATE_GROUPS_COUNT]
+    stats.hygiene.duplicate_group_count = len(groups)
+    stats.hygiene.wasted_bytes = sum(g.wasted_bytes for g in groups)
@@ -0,0 +1,155 @@
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import replace
+from typing import Deque, Dict, List, Optional, Tuple, Union
+
+from repolyze.core.content.sloc import LANGUAGES, count_sloc
+from repolyze.core.filesystem.paths import suffix
+from repolyze.core.filesystem.scan import ScanEntry
+from repolyze.core.stats.aggregate import CODE_EXTS, PartialStats
+from repolyze.models import FileStat, RepoStats
+
+# Size of the reused read buffer: few enough syscalls per file that reading
+# runs at the speed of the copy, small enough to stay in the CPU cache
+BLOCK_SIZE = 1024 * 1024  # bytes
+# As in git, a file with a NUL byte in its first 8000 bytes is binary
+SNIFF_SIZE = 8000  # bytes
+# Files handed to a worker process at a time
+BATCH_SIZE = 256
+# Batches in flight per worker process; past that, the scan waits for the
+# oldest, so that batches do not pile up when the workers fall behind
+PENDING_PER_WORKER = 2
+
+_NEWLINE = ord("\n")
+
+
+def count_lines(path: str, buffer: Optional[bytearray] = None) -> Optional[int]:
+    """Return the number of lines of the file at ``path``.
+
+    Lines are newline characters, plus one for a last line without a
+    trailing newline. Returns None for binary files and for files that
+    cannot be read. The file is read in blocks into ``buffer``, which can be
+    passed in to reuse one buffer across many files.
+    """
+    if buffer is None:
+        buffer = bytearray(BLOCK_SIZE)
+    lines = 0
+    last = _NEWLINE
+    try:
+        with open(path, "rb", buffering=0) as f:
+            n = f.readinto(buffer)
+            if n and buffer.find(b"\0", 0, min(n, SNIFF_SIZE)) != -1:
+                return None
+            while n:
+                lines += buffer.count(b"\n", 0, n)
+                last = buffer[n - 1]
+                n = f.readinto(buffer)
+    except OSError:
+        return None
+    return lines + (last != _NEWLINE)
+
+
+def count_batch(
+    paths: List[str], languages: Optional[List[str]] = None
+) -> List[Optional[Union[int, Tuple[int, int, int]]]]:
+    """``count_lines()`` of each path, sharing one buffer; runs in a worker.
+
+    Given the ``languages`` of the files, their ``(code, comment, blank)``
+    lines are counted with ``count_sloc()`` instead.
+    """
+    if languages is not None:
+        return [count_sloc(p, language) for p, language in zip(paths, languages)]
+    buffer = bytearray(BLOCK_SIZE)
+    return [count_lines(path, buffer) for path in paths]
+
+
+class LineCounter:
+    """Count the lines of code files into a PartialStats as they are found.
+
+    ``add()`` takes the files of a scan; those with an extension in
+    ``CODE_EXTS`` are collected into batches, which are counted in this
+    process or, with a ``pool`` of ``workers`` processes, by its workers
+    while the scan goes on, at most ``PENDING_PER_WORKER`` batches per
+    worker at a time. ``close()`` waits for the outstanding batches. Binary files are left
+    out of the totals. If ``stats`` was created with ``sloc``, the files
+    are classified into code, comment and blank lines as well.
+    """
+
+    def __init__(
+        self, stats: PartialStats, pool: Optional[Executor] = None, workers: int = 1
+    ):
+        self.stats = stats
+        self.pool = pool
+        self.sloc = stats.sloc is not None
+        self._paths: List[str] = []
+        self._exts: List[str] = []
+        self._pending: Deque[Tuple[List[str], Future]] = deque()
+        self._max_pending = workers * PENDING_PER_WORKER
+        self._buffer = bytearray(BLOCK_SIZE) if pool is None else None
+
+    def add(self, entry: ScanEntry) -> None:
+        ext = suffix(entry.name).lower()
+        if ext not in CODE_EXTS:
+            return
+        self._paths.append(entry.path)
+        self._exts.append(ext)
+        if len(self._paths) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        paths, exts = self._paths, self._exts
+        self._paths, self._exts = [], []
+        languages = [LANGUAGES[ext] for ext in exts] if self.sloc else None
+        if self.pool is None:
+            if self.sloc:
+                self._record(exts, count_batch(paths, languages))
+            else:
+                self._record(exts, [count_lines(p, self._buffer) for p in paths])
+            return
+
+        self._pending.append((exts, self.pool.submit(count_batch, paths, languages)))
+        # Take in what is done already, and wait for the oldest batch when
+        # too many are in flight
+        pending = self._pending
+        while pending and (len(pending) > self._max_pending or pending[0][1].done()):
+            exts, future = pending.popleft()
+            self._record(exts, future.result())
+
+    def _record(self, exts: List[str], counts: list) -> None:
+        for ext, lines in zip(exts, counts):
+            if lines is None:
+                continue
+            if self.sloc:
+                self.stats.add_sloc(LANGUAGES[ext], *lines)
+                lines = sum(lines)
+            self.stats.add_lines(ext, lines)
+
+    def close(self) -> None:
+        if self._paths:
+            self._flush()
+        while self._pending:
+            exts, future = self._pending.popleft()
+            self._record(exts, future.result())
+
+
+def fill_file_lines(stats: RepoStats) -> None:
+    """Set ``FileStat.lines`` of the code files listed in ``stats``.
+
+    Only the handful of listed files are read (again), rather than keeping
+    the count of every file of the scan.
+    """
+    buffer = bytearray(BLOCK_SIZE)
+    counted: Dict[FileStat, FileStat] = {}
+
+    def fill(f: Optional[FileStat]) -> Optional[FileStat]:
+        if f is None or suffix(f.path.name).lower() not in CODE_EXTS:
+            return f
+        if f not in counted:
+            counted[f] = replace(f, lines=count_lines(str(f.path), buffer))
+        return counted[f]
+
+    stats.size.large_files = [fill(f) for f in stats.size.large_files]
+    stats.size.small_files = [fill(f) for f in stats.size.small_files]
+    stats.hygiene.large_files = [fill(f) for f in stats.hygiene.large_files]
+    stats.time.oldest_file = fill(stats.time.oldest_file)
+    stats.time.newest_file = fill(stats.time.newest_file)
@@ -0,0 +1,200 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+# Extension -> language, for every extension in CODE_EXTS
+LANGUAGES = {
+    ".py": "Python",
+    ".js": "JavaScript",
+    ".ts": "TypeScript",
+    ".java": "Java",
+    ".c": "C",
+    ".cpp": "C++",
+    ".rs": "Rust",
+    ".go": "Go",
+}
+
+
+class Syntax(NamedTuple):
+    """The tokens of a language that matter for counting comment lines.
+
+    Every pattern has to start with a literal character: the alternation of
+    all of them then starts with a set of characters, and the regex engine
+    skips ahead to the next of those instead of trying every alternative at
+    every position. Comments are told from strings by that first character.
+    Strings are matched so that comment markers inside them are not taken
+    for comments; alternatives are tried in order, so longer delimiters go
+    first.
+    """
+
+    comments: Tuple[bytes, ...]
+    strings: Tuple[bytes, ...]
+    # A string alone at the start of a line is a docstring, counted as a
+    # comment like cloc does
+    docstrings: bool = False
+
+
+_C_COMMENTS = (
+    rb"//[^\n]*",
+    # Unrolled so that it runs without backtracking
+    rb"/\*[^*]*\*+(?:[^/*][^*]*\*+)*/",
+    # Not closed until the end of the file
+    rb"/\*[\s\S]*",
+)
+
+# Single-line strings, with backslash escapes
+_DOUBLE = rb'"[^"\\\n]*(?:\\.[^"\\\n]*)*"'
+_SINGLE = rb"'[^'\\\n]*(?:\\.[^'\\\n]*)*'"
+# Strings that may span lines
+_DOUBLE_MULTILINE = rb'"[^"\\]*(?:\\[\s\S][^"\\]*)*"'
+_TEMPLATE = rb"`[^`\\]*(?:\\[\s\S][^`\\]*)*`"
+_RAW_BACKTICK = rb"`[^`]*`"
+# One character, so that Rust lifetimes ('a) are not taken for literals
+_CHAR = rb"'(?:[^'\\\n]|\\[^'\n]{1,10})'"
+
+_TRIPLE_QUOTED = (
+    rb'"""[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*"""',
+    rb"'''[^'\\]*(?:(?:\\[\s\S]|'(?!''))[^'\\]*)*'''",
+)
+
+SYNTAX: Dict[str, Syntax] = {
+    "Python": Syntax(
+        (rb"#[^\n]*",),
+        (
+            # With the prefixes a docstring can have, one alternative each
+            # so that all of them start with a literal
+            *(
+                prefix + rb"(?:" + b"|".join(_TRIPLE_QUOTED) + rb")"
+                for prefix in (b"r", b"R", b"u", b"U")
+            ),
+            *_TRIPLE_QUOTED,
+            _DOUBLE,
+            _SINGLE,
+        ),
+        docstrings=True,
+    ),
+    "JavaScript": Syntax(_C_COMMENTS, (_DOUBLE, _SINGLE, _TEMPLATE)),
+    "TypeScript": Syntax(_C_COMMENTS, (_DOUBLE, _SINGLE, _TEMPLATE)),
+    "Java": Syntax(_C_COMMENTS, (rb'"""[\s\S]*?"""', _DOUBLE, _CHAR)),
+    "C": Syntax(_C_COMMENTS, (_DOUBLE, _CHAR)),
+    "C++": Syntax(
+        _C_COMMENTS,
+        (rb'R"(?P<delim>[^()\\\s]{0,16})\([\s\S]*?\)(?P=delim)"', _DOUBLE, _CHAR),
+    ),
+    "Rust": Syntax(
+        _C_COMMENTS,
+        (rb'r(?P<hashes>#*)"[\s\S]*?"(?P=hashes)', _DOUBLE_MULTILINE, _CHAR),
+    ),
+    "Go": Syntax(_C_COMMENTS, (_DOUBLE, _CHAR, _RAW_BACKTICK)),
+}
+
+_TRIPLE_QUOTES = (b'"""', b"'''")
+
+# Whitespace-only lines after the first one, and the first one
+_BLANK = re.compile(rb"\n[ \t\r\f\v]*(?=\n)")
+_FIRST_BLANK = re.compile(rb"[ \t\r\f\v]*\n")
+# As in count_lines(): a NUL in the first 8000 bytes means binary
+_SNIFF_SIZE = 8000
+# Bytes of a file classified at a time, see count_sloc()
+CHUNK_SIZE = 16 * 1024 * 1024
+
+
+class _Lexer:
+    """Removes the comments of one language from a buffer."""
+
+    def __init__(self, syntax: Syntax):
+        self.pattern: Pattern = re.compile(
+            b"|".join(syntax.comments + syntax.strings)
+        )
+        self.comment_starts = {pattern[0] for pattern in syntax.comments}
+        self.docstrings = syntax.docstrings
+
+    def _replace(self, match) -> bytes:
+        text = match.group()
+        if text[0] not in self.comment_starts:
+            if not self.docstrings or text.lstrip(b"rRuU")[:3] not in _TRIPLE_QUOTES:
+                return text
+            data = match.string
+            start = match.start()
+            line = data.rfind(b"\n", 0, start) + 1
+            if data[line:start].strip():
+                return text
+        # Keep the line breaks, so that lines keep their numbers
+        return b"\n" * text.count(b"\n")
+
+    def strip(self, data: bytes) -> bytes:
+        return self.pattern.sub(self._replace, data)
+
+
+_LEXERS: Dict[str, _Lexer] = {
+    language: _Lexer(syntax) for language, syntax in SYNTAX.items()
+}
+
+
+def _blank_lines(data: bytes, unterminated: bool) -> int:
+    """Count the whitespace-only lines of ``data``.
+
+    ``unterminated`` says that the last line has no newline; it is counted
+    even if it is empty, which it can be once its comment is removed.
+    """
+    blank = len(_BLANK.findall(data))
+    if _FIRST_BLANK.match(data):
+        blank += 1
+    if unterminated and not data[data.rfind(b"\n") + 1:].strip():
+        blank += 1
+    return blank
+
+
+def classify(data: bytes, language: str) -> Tuple[int, int, int]:
+    """Count the ``(code, comment, blank)`` lines of source ``data``.
+
+    As in cloc, a line with any code on it is a code line, a line with only
+    comments (and whitespace) a comment line, and lines inside multi-line
+    strings are code. The whole buffer is handled by a few regex passes:
+    one removes the comments, and the whitespace-only lines are counted
+    before and after.
+
+    Nested block comments (Rust) end at the first ``*/``, and JavaScript
+    regex literals are not recognised.
+    """
+    unterminated = bool(data) and not data.endswith(b"\n")
+    total = data.count(b"\n") + unterminated
+    blank = _blank_lines(data, unterminated)
+    code = total - _blank_lines(_LEXERS[language].strip(data), unterminated)
+    return code, total - blank - code, blank
+
+
+def count_sloc(path: str, language: str) -> Optional[Tuple[int, int, int]]:
+    """``classify()`` the file at ``path``; None if binary or unreadable.
+
+    The file is read in chunks of ``CHUNK_SIZE`` cut at line breaks, so that
+    memory stays bounded. Files up to that size are classified in one go;
+    in larger ones a comment or multi-line string across a cut may be
+    counted as code. A line longer than a chunk marks the file as
+    generated, and it is left out like binary files.
+    """
+    counts = [0, 0, 0]
+    rest = b""
+    try:
+        with open(path, "rb") as f:
+            block = f.read(CHUNK_SIZE)
+            if b"\0" in block[:_SNIFF_SIZE]:
+                return None
+            while block:
+                data = rest + block
+                cut = data.rfind(b"\n") + 1
+                if not cut and len(data) > CHUNK_SIZE:
+                    return None
+                rest = data[cut:]
+                if cut:
+                    _add(counts, classify(data[:cut], language))
+                block = f.read(CHUNK_SIZE)
+    except OSError:
+        return None
+    if rest:
+        _add(counts, classify(rest, language))
+    return tuple(counts)
+
+
+def _add(counts: List[int], more: Tuple[int, int, int]) -> None:
+    for i, n in enumerate(more):
+        counts[i] += n
@@ -0,0 +1,312 @@
+import os
+import re
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from repolyze.core.content.sloc import LANGUAGES
+from repolyze.core.filesystem.cache import (
+    cache_file, read_cache_file, write_cache_file,
+)
+from repolyze.core.filesystem.paths import suffix
+from repolyze.core.filesystem.scan import ScanEntry
+
+# As in git, only the first 8000 bytes of a file are looked at
+SNIFF_SIZE = 8000  # bytes
+# Bytes read for detection in one run, at most
+DEFAULT_BUDGET = 256 * 1024 * 1024  # bytes
+
+_MAGIC = b"RPLZSNIF"
+# Bump whenever detection changes, so that old results are not reused
+MEMO_VERSION = 2
+
+# Extension -> language, beyond the languages of CODE_EXTS
+EXTENSIONS = {
+    **LANGUAGES,
+    ".h": "C",
+    ".cc": "C++",
+    ".cxx": "C++",
+    ".hpp": "C++",
+    ".jsx": "JavaScript",
+    ".mjs": "JavaScript",
+    ".cjs": "JavaScript",
+    ".tsx": "TypeScript",
+    ".sh": "Shell",
+    ".bash": "Shell",
+    ".zsh": "Shell",
+    ".rb": "Ruby",
+    ".pl": "Perl",
+    ".php": "PHP",
+    ".lua": "Lua",
+}
+
+# Names used by shebangs and editor modelines -> language
+_NAMES = {
+    "python": "Python",
+    "node": "JavaScript",
+    "nodejs": "JavaScript",
+    "javascript": "JavaScript",
+    "js": "JavaScript",
+    "deno": "JavaScript",
+    "bun": "JavaScript",
+    "typescript": "TypeScript",
+    "ts-node": "TypeScript",
+    "java": "Java",
+    "c": "C",
+    "cpp": "C++",
+    "c++": "C++",
+    "rust": "Rust",
+    "go": "Go",
+    "sh": "Shell",
+    "bash": "Shell",
+    "zsh": "Shell",
+    "dash": "Shell",
+    "ksh": "Shell",
+    "shell-script": "Shell",
+    "ruby": "Ruby",
+    "perl": "Perl",
+    "php": "PHP",
+    "lua": "Lua",
+}
+
+# Leading bytes of common binary formats
+_MAGIC_NUMBERS = (
+    b"\x7fELF",
+    b"MZ",  # PE executables
+    b"\xca\xfe\xba\xbe",  # Java classes, Mach-O fat binaries
+    b"\xcf\xfa\xed\xfe",  # Mach-O
+    b"\xce\xfa\xed\xfe",
+    b"\0asm",  # WebAssembly
+    b"\x89PNG",
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF8",
+    b"%PDF-",
+    b"PK\x03\x04",  # zip, jar, wheel
+    b"\x1f\x8b",  # gzip
+    b"BZh",
+    b"\xfd7zXZ\0",
+    b"(\xb5/\xfd",  # zstd
+    b"7z\xbc\xaf",
+    b"SQLite format 3\0",
+)
+
+# "#!/usr/bin/env -S python3 -u" -> "python3"; "#!/bin/sh" -> "sh"
+_SHEBANG = re.compile(
+    rb"#![ \t]*(?:\S*/)?(?:env[ \t]+(?:-\S+[ \t]+)*)?([^\s/]+)"
+)
+_VERSION = re.compile(r"[\d.]+$")
+# vim: set ft=python:  /  vi: filetype=sh
+_VIM = re.compile(rb"\b(?:vim?|ex):.*?\b(?:ft|filetype|syntax)=([\w+-]+)")
+# -*- mode: python; coding: utf-8 -*-  /  -*- python -*-
+_EMACS = re.compile(
+    rb"-\*-[ \t]*(?:(?:[^\n]*?\bmode:[ \t]*([\w+-]+)[^\n]*?)|([\w+-]+)[ \t]*)-\*-",
+    re.I,
+)
+
+# Bytes that occur in text: printable ASCII, common whitespace and escape
+# sequences, and anything >= 0x80 (text in a legacy 8-bit encoding)
+_TEXT_BYTES = bytes(
+    [7, 8, 9, 10, 12, 13, 27, *range(0x20, 0x7F), *range(0x80, 0x100)]
+)
+
+
+class Sniff(NamedTuple):
+    """What the first bytes of a file say about it."""
+
+    binary: bool
+    # None for binary files and text files in no known language
+    language: Optional[str] = None
+
+
+def is_binary(block: bytes) -> bool:
+    """Guess whether ``block``, the start of a file, is binary data.
+
+    Known magic numbers and NUL bytes (as in git) mean binary. Text that is
+    not valid UTF-8 may be in a legacy encoding, and is only taken for
+    binary if more than one byte in twenty is a control character.
+    """
+    if block.startswith(_MAGIC_NUMBERS) or b"\0" in block:
+        return True
+    try:
+        block.decode("utf-8")
+        return False
+    except UnicodeDecodeError as e:
+        # The block may end in the middle of a character
+        if e.reason == "unexpected end of data":
+            return False
+    # What is left once the text bytes are deleted
+    control = len(block.translate(None, _TEXT_BYTES))
+    return control * 20 > len(block)
+
+
+def _name_language(name: bytes) -> Optional[str]:
+    name = _VERSION.sub("", name.decode("ascii", "replace").lower())
+    return _NAMES.get(name)
+
+
+def detect_content(block: bytes) -> Sniff:
+    """Like ``detect()``, without the fallback on the extension."""
+    if is_binary(block):
+        return Sniff(True)
+
+    if block.startswith(b"#!"):
+        match = _SHEBANG.match(block)
+        if match:
+            language = _name_language(match.group(1))
+            if language is not None:
+                return Sniff(False, language)
+
+    if b"-*-" in block:
+        match = _EMACS.search(block)
+        if match:
+            language = _name_language(match.group(1) or match.group(2))
+            if language is not None:
+                return Sniff(False, language)
+    if b"vi" in block or b"ex:" in block:
+        match = _VIM.search(block)
+        if match:
+            language = _name_language(match.group(1))
+            if language is not None:
+                return Sniff(False, language)
+
+    return Sniff(False)
+
+
+def detect(block: bytes, name: str) -> Sniff:
+    """Tell the language of a file from ``block``, its first bytes.
+
+    A shebang line wins, then an editor modeline (vim or Emacs) in the
+    block, then the file name's extension.
+    """
+    return with_extension(detect_content(block), name)
+
+
+def with_extension(sniff: Sniff, name: str) -> Sniff:
+    """Fall back on the extension of ``name`` for text in no known language."""
+    if sniff.binary or sniff.language is not None:
+        return sniff
+    return Sniff(False, EXTENSIONS.get(suffix(name).lower()))
+
+
+# Identity of a file's contents: (dev, inode, size, mtime_ns)
+_Key = Tuple[int, int, int, int]
+
+
+class ContentSniffer:
+    """Detect the language of files and whether they are binary, on a budget.
+
+    Each file is opened once and at most its first ``SNIFF_SIZE`` bytes are
+    read. What the contents say is memoized on the file's ``(dev, inode,
+    size, mtime_ns)`` and can be kept across runs with ``open()``/``save()``,
+    so only new and modified files are read again; the fallback on the
+    extension is applied after the lookup, so that a renamed file or a link
+    under another name is detected by its own name. No more than ``budget`` bytes are read
+    per run; after that ``sniff()`` returns None, and callers fall back to
+    the file name. Files that cannot be read, e.g. deleted since the scan,
+    are counted in ``unreadable`` and give back the budget they reserved.
+
+    The budget may be shared with other processes through ``remaining``, a
+    ``multiprocessing.Value`` of bytes left, in which case ``budget`` is
+    ignored.
+    """
+
+    def __init__(
+        self,
+        budget: int = DEFAULT_BUDGET,
+        memo: Optional[Dict[_Key, Tuple[bool, Optional[str]]]] = None,
+        remaining=None,
+    ):
+        self.budget = budget
+        self.remaining = remaining
+        self.file: Optional[Path] = None
+        self.bytes_read = 0
+        self.hits = 0
+        self.skipped = 0
+        self.unreadable = 0
+        # Stored as plain tuples, which marshal can save
+        self._memo = memo if memo is not None else {}
+        # Results looked up or made in this run, the ones worth saving
+        self.used: Dict[_Key, Tuple[bool, Optional[str]]] = {}
+
+    @classmethod
+    def open(
+        cls, cache_dir: Path, root: Path, budget: int = DEFAULT_BUDGET
+    ) -> "ContentSniffer":
+        """Load the memo of ``root`` from ``cache_dir``, if there is one."""
+        file = cache_file(cache_dir, root, ".sniff")
+        memo = read_cache_file(file, _MAGIC, MEMO_VERSION)
+        sniffer = cls(budget, memo if isinstance(memo, dict) else None)
+        sniffer.file = file
+        return sniffer
+
+    def save(self) -> None:
+        """Write back the results of this run; entries of gone files are dropped."""
+        if self.file is not None:
+            write_cache_file(self.file, _MAGIC, MEMO_VERSION, self.used)
+
+    def __getstate__(self) -> dict:
+        # A shared budget can only be inherited by worker processes
+        state = self.__dict__.copy()
+        state["file"] = state["remaining"] = None
+        return state
+
+    def update(self, other: "ContentSniffer") -> None:
+        """Take over the results and counters of a copy used by a worker."""
+        self.used.update(other.used)
+        self.bytes_read += other.bytes_read
+        self.hits += other.hits
+        self.skipped += other.skipped
+        self.unreadable += other.unreadable
+
+    def trim(self) -> None:
+        """Forget the memoized results that were not used in this run."""
+        self._memo = dict(self.used)
+
+    def _reserve(self, n: int) -> bool:
+        if self.remaining is not None:
+            with self.remaining.get_lock():
+                if self.remaining.value < n:
+                    return False
+                self.remaining.value -= n
+        elif self.bytes_read + n > self.budget:
+            return False
+        self.bytes_read += n
+        return True
+
+    def _refund(self, n: int) -> None:
+        if self.remaining is not None:
+            with self.remaining.get_lock():
+                self.remaining.value += n
+        self.bytes_read -= n
+
+    def sniff(self, entry: ScanEntry) -> Optional[Sniff]:
+        """Detect file ``entry``; None once the budget is used up.
+
+        Raises OSError if the file cannot be read.
+        """
+        key = (entry.dev, entry.inode, entry.size, entry.mtime_ns)
+        result = self._memo.get(key)
+        if result is not None:
+            self.hits += 1
+            self.used[key] = result
+            return with_extension(Sniff(*result), entry.name)
+
+        n = min(entry.size, SNIFF_SIZE)
+        if not self._reserve(n):
+            self.skipped += 1
+            return None
+        block = b""
+        if n:
+            try:
+                fd = os.open(entry.path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+                try:
+                    block = os.read(fd, n)
+                finally:
+                    os.close(fd)
+            except OSError:
+                self._refund(n)
+                self.unreadable += 1
+                raise
+
+        sniff = detect_content(block)
+        self._memo[key] = self.used[key] = tuple(sniff)
+        return with_extension(sniff, entry.name)
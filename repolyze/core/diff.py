@@ -0,0 +1,169 @@
+import dataclasses
+import heapq
+import itertools
+from pathlib import Path
+from typing import Iterator, Union
+
+from repolyze.models import HygieneStats, RepoStats, Snapshot
+from repolyze.models.diff import CountDelta, ExtensionDelta, PathChange, RepoDiff
+
+# Entries listed in each of the lists of RepoDiff
+DIFF_LIST_COUNT = 10
+
+
+def iter_changes(old: Snapshot, new: Snapshot) -> Iterator[PathChange]:
+    """Yield the files and directories that differ between two snapshots.
+
+    Files are yielded if they were added, removed or changed size;
+    directories if they were added or removed or their total size changed.
+    A path that changed from a file to a directory or back is removed and
+    added again.
+
+    Snapshots store the tree in preorder with the children of each
+    directory sorted by name, so the two trees are merged like two sorted
+    lists, walking their columns in lockstep: at equal depths both nodes
+    are children of the same directory and only their names are compared;
+    a deeper node is inside a directory the other tree has no more nodes
+    in. This takes time linear in the size of the trees, and builds no
+    objects but the changes.
+    """
+    a, b = old.columns(), new.columns()
+    if a is None or b is None:
+        raise ValueError("both snapshots must have been saved with their tree")
+    a_names, a_depths, a_ids, a_dirs, _, a_sizes = a
+    b_names, b_depths, b_ids, b_dirs, _, b_sizes = b
+    a_end, b_end = len(a_depths), len(b_depths)
+    # Names of the directories above the current node of each tree, by
+    # depth; deeper entries are stale
+    a_path, b_path = [""], [""]
+
+    def change(path, depth, name, is_dir, old_size, new_size):
+        return PathChange(
+            Path(*path[1:depth], name), bool(is_dir), old_size, new_size
+        )
+
+    # Depth 0 is the root, which is not compared
+    i = j = 1
+    while i < a_end or j < b_end:
+        a_depth = a_depths[i] if i < a_end else 0
+        b_depth = b_depths[j] if j < b_end else 0
+        if a_depth > b_depth:
+            name = a_names[a_ids[i]]
+            if a_dirs[i]:
+                a_path[a_depth:] = (name,)
+            yield change(a_path, a_depth, name, a_dirs[i], a_sizes[i], None)
+            i += 1
+        elif b_depth > a_depth:
+            name = b_names[b_ids[j]]
+            if b_dirs[j]:
+                b_path[b_depth:] = (name,)
+            yield change(b_path, b_depth, name, b_dirs[j], None, b_sizes[j])
+            j += 1
+        else:
+            a_name, b_name = a_names[a_ids[i]], b_names[b_ids[j]]
+            if a_name == b_name:
+                a_dir, b_dir = a_dirs[i], b_dirs[j]
+                if a_dir:
+                    a_path[a_depth:] = (a_name,)
+                if b_dir:
+                    b_path[b_depth:] = (b_name,)
+                if a_dir != b_dir:
+                    # Whatever was below the directory is removed or added
+                    # by the depth rules above
+                    yield change(a_path, a_depth, a_name, a_dir, a_sizes[i], None)
+                    yield change(b_path, b_depth, b_name, b_dir, None, b_sizes[j])
+                elif a_sizes[i] != b_sizes[j]:
+                    yield change(a_path, a_depth, a_name, a_dir, a_sizes[i], b_sizes[j])
+                i += 1
+                j += 1
+            elif a_name < b_name:
+                if a_dirs[i]:
+                    a_path[a_depth:] = (a_name,)
+                yield change(a_path, a_depth, a_name, a_dirs[i], a_sizes[i], None)
+                i += 1
+            else:
+                if b_dirs[j]:
+                    b_path[b_depth:] = (b_name,)
+                yield change(b_path, b_depth, b_name, b_dirs[j], None, b_sizes[j])
+                j += 1
+
+
+def _fill_aggregates(result: RepoDiff, old: RepoStats, new: RepoStats) -> None:
+    old_counts, new_counts = old.file_types.count_by_extension, new.file_types.count_by_extension
+    old_sizes, new_sizes = old.file_types.size_by_extension, new.file_types.size_by_extension
+    for ext in sorted(old_counts.keys() | new_counts.keys()):
+        delta = ExtensionDelta(
+            new_counts.get(ext, 0) - old_counts.get(ext, 0),
+            new_sizes.get(ext, 0) - old_sizes.get(ext, 0),
+        )
+        if delta.files or delta.size:
+            result.extension_deltas[ext] = delta
+
+    for f in dataclasses.fields(HygieneStats):
+        before = getattr(old.hygiene, f.name)
+        after = getattr(new.hygiene, f.name)
+        # Counters that only one of the analyses has, such as the duplicate
+        # counts of a run without --duplicates, are not compared
+        if isinstance(before, int) and isinstance(after, int) and before != after:
+            result.hygiene_changes[f.name] = CountDelta(before, after)
+
+
+def diff_snapshots(old: Union[str, Path], new: Union[str, Path]) -> RepoDiff:
+    """Compare two saved analyses of a repository (see ``RepoStats.save()``).
+
+    Files and directories are compared with ``iter_changes()``, keeping
+    only the totals and the ``DIFF_LIST_COUNT`` largest changes of each
+    kind; extensions and hygiene counters come from the aggregates. Paths
+    are relative to the analyzed directories, which may differ, for example
+    two checkouts of one repository.
+    """
+    with Snapshot(old) as old_snapshot, Snapshot(new) as new_snapshot:
+        old_stats = old_snapshot.stats(tree=False)
+        new_stats = new_snapshot.stats(tree=False)
+        result = RepoDiff(old_stats.path, new_stats.path)
+        _fill_aggregates(result, old_stats, new_stats)
+        if not (old_snapshot.has_tree and new_snapshot.has_tree):
+            result.compared_files = False
+            return result
+
+        # Min-heaps of (key, -order, change) keeping the largest keys, and
+        # on ties the first paths
+        added, removed, grown, dirs = [], [], [], []
+        order = itertools.count()
+
+        def keep(heap, key, change):
+            item = (key, -next(order), change)
+            if len(heap) < DIFF_LIST_COUNT:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+
+        for change in iter_changes(old_snapshot, new_snapshot):
+            delta = change.delta
+            if change.is_dir:
+                keep(dirs, abs(delta), change)
+            elif change.old_size is None:
+                result.added_files += 1
+                result.added_bytes += delta
+                keep(added, delta, change)
+            elif change.new_size is None:
+                result.removed_files += 1
+                result.removed_bytes -= delta
+                keep(removed, -delta, change)
+            elif delta > 0:
+                result.grown_files += 1
+                result.grown_bytes += delta
+                keep(grown, delta, change)
+            else:
+                result.shrunk_files += 1
+                result.shrunk_bytes -= delta
+
+    def ranked(heap):
+        heap.sort(key=lambda item: item[:2], reverse=True)
+        return [change for *_, change in heap]
+
+    result.largest_added = ranked(added)
+    result.largest_removed = ranked(removed)
+    result.most_grown = ranked(grown)
+    result.dir_deltas = ranked(dirs)
+    return result
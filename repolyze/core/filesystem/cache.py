@@ -0,0 +1,252 @@
+import hashlib
+import marshal
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from repolyze.core.filesystem.gitignore import IgnoreRules
+from repolyze.core.filesystem.scan import ScanEntry, scan_dir
+from repolyze.core.profile import Profiler, timed
+
+# Bump whenever the layout of a record or of ScanEntry changes
+CACHE_VERSION = 2
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Directories modified this recently are not cached: another change within
+# the filesystem's timestamp granularity would leave their mtime unchanged
+RACY_SECONDS = 2.0
+
+_MAGIC = b"RPLZSCAN"
+# magic, format version, marshal version, payload length, payload crc32
+_HEADER = struct.Struct("<8sHHQI")
+
+# Record layout: a plain list so that the payload is marshal-friendly
+_DEV, _INO, _MTIME_NS, _RULES, _PATTERNS, _GITIGNORE, _DIRS, _FILES, _USED = range(9)
+
+
+class ScanCache:
+    """Persistent cache of filtered directory listings for one scan root.
+
+    Each directory's listing, with the stat results of its files, is stored
+    under its path relative to the root together with the directory's
+    ``(dev, ino, mtime_ns)``, the digest of the ignore rules it was filtered
+    with and the state of its own ``.gitignore``. On a later run a directory
+    whose identity and mtime are unchanged is served from the cache with a
+    single ``stat`` instead of a ``readdir`` plus one ``lstat`` per file.
+
+    Adding, removing or renaming entries changes a directory's mtime, but
+    rewriting a file in place does not, so sizes and mtimes of files in
+    unchanged directories are those recorded when the directory was last
+    scanned.
+
+    The file is versioned and checksummed; an unreadable, corrupt or
+    outdated file is treated as empty and replaced on ``save()``. When the
+    encoded records exceed ``max_bytes`` the least recently used ones are
+    evicted.
+    """
+
+    def __init__(self, file: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.file = file
+        self.max_bytes = max_bytes
+        self.run = 0
+        self.hits = 0
+        self.misses = 0
+        self._records: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(
+        cls, cache_dir: Path, root: Path, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> "ScanCache":
+        """Load the cache of ``root`` from ``cache_dir``, creating it if needed."""
+        cache = cls(cache_file(cache_dir, root, ".scan"), max_bytes)
+        cache._load()
+        cache.run += 1
+        return cache
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getstate__(self) -> dict:
+        # Locks cannot be pickled; subsets are sent to worker processes
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        data = read_cache_file(self.file, _MAGIC, CACHE_VERSION)
+        try:
+            self.run, self._records = data
+        except (ValueError, TypeError):
+            # Missing or corrupt file; start over
+            self.run, self._records = 0, {}
+
+    def save(self) -> None:
+        """Write the cache back, evicting least recently used records."""
+        if self.file is None:
+            return
+
+        self._evict()
+        write_cache_file(self.file, _MAGIC, CACHE_VERSION, (self.run, self._records))
+
+    def _evict(self) -> None:
+        sizes = {key: len(marshal.dumps(rec)) for key, rec in self._records.items()}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self._records, key=lambda k: self._records[k][_USED]):
+            del self._records[key]
+            total -= sizes[key]
+            if total <= self.max_bytes:
+                break
+
+    def subset(self, rel_root: str) -> "ScanCache":
+        """Return a detached cache holding only the records under ``rel_root``.
+
+        Used to hand a shard of the scan to another process; bring the
+        results back with ``update()``.
+        """
+        prefix = f"{rel_root}/"
+        part = ScanCache(None, self.max_bytes)
+        part.run = self.run
+        part._records = {
+            key: rec for key, rec in self._records.items()
+            if key == rel_root or key.startswith(prefix)
+        }
+        return part
+
+    def update(self, other: "ScanCache") -> None:
+        """Take over the records and counters of a cache from ``subset()``."""
+        with self._lock:
+            self._records.update(other._records)
+            self.hits += other.hits
+            self.misses += other.misses
+
+    def scan_dir(
+        self,
+        top: str,
+        rel_root: str,
+        rules: IgnoreRules,
+        profiler: Optional[Profiler] = None,
+    ) -> Tuple[List[ScanEntry], List[ScanEntry], IgnoreRules]:
+        """Drop-in replacement for ``scan.scan_dir()`` backed by the cache."""
+        if profiler is not None:
+            profiler.count(stat_calls=1)
+        try:
+            with timed(profiler, "stat"):
+                st = os.stat(top)
+        except OSError:
+            return scan_dir(top, rel_root, rules, profiler)
+
+        rec = self._records.get(rel_root)
+        if (
+            rec is not None
+            and rec[_MTIME_NS] == st.st_mtime_ns
+            and rec[_INO] == st.st_ino
+            and rec[_DEV] == st.st_dev
+            and rec[_RULES] == rules.digest
+            and (rec[_GITIGNORE] is None or rec[_GITIGNORE] == _gitignore_state(top))
+        ):
+            with self._lock:
+                rec[_USED] = self.run
+                self.hits += 1
+            dirs = [ScanEntry._make(e) for e in rec[_DIRS]]
+            files = [ScanEntry._make(e) for e in rec[_FILES]]
+            return dirs, files, rules.child(rel_root, rec[_PATTERNS])
+
+        dirs, files, child_rules = scan_dir(top, rel_root, rules, profiler)
+        with self._lock:
+            self.misses += 1
+
+        if time.time() - st.st_mtime >= RACY_SECONDS:
+            patterns = list(child_rules.patterns) if child_rules is not rules else []
+            has_gitignore = patterns or any(e.name == ".gitignore" for e in files)
+            self._records[rel_root] = [
+                st.st_dev, st.st_ino, st.st_mtime_ns, rules.digest, patterns,
+                _gitignore_state(top) if has_gitignore else None,
+                [tuple(e) for e in dirs], [tuple(e) for e in files], self.run,
+            ]
+        return dirs, files, child_rules
+
+
+def cache_file(cache_dir: Path, root: Path, suffix: str) -> Path:
+    """Return the file in ``cache_dir`` that holds the ``suffix`` cache of ``root``."""
+    key = hashlib.blake2b(os.fsencode(root), digest_size=16).hexdigest()
+    return Path(cache_dir) / f"{key}{suffix}"
+
+
+def read_cache_file(file: Path, magic: bytes, version: int) -> Any:
+    """Load what ``write_cache_file()`` stored, or None.
+
+    None is also returned for a file that is missing, corrupt, or written
+    with another ``magic``, ``version`` or marshal format.
+    """
+    try:
+        with open(file, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    try:
+        (
+            file_magic, file_version, marshal_version, length, crc,
+        ) = _HEADER.unpack_from(data)
+        payload = data[_HEADER.size:]
+        if (
+            file_magic != magic
+            or file_version != version
+            or marshal_version != marshal.version
+            or length != len(payload)
+            or crc != zlib.crc32(payload)
+        ):
+            return None
+        return marshal.loads(zlib.decompress(payload))
+    except (struct.error, zlib.error, ValueError, EOFError, TypeError):
+        return None
+
+
+def write_cache_file(file: Path, magic: bytes, version: int, value: Any) -> None:
+    """Store marshal-able ``value`` in ``file``, versioned and checksummed.
+
+    The file is replaced atomically, so a crash never leaves a half-written
+    cache behind; errors are ignored, as a cache is only an optimisation.
+    """
+    payload = zlib.compress(marshal.dumps(value), 1)
+    header = _HEADER.pack(
+        magic, version, marshal.version, len(payload), zlib.crc32(payload)
+    )
+
+    tmp = file.with_name(f"{file.name}.{os.getpid()}.tmp")
+    try:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp, file)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _gitignore_state(top: str) -> Optional[Tuple[int, int]]:
+    """Return ``(mtime_ns, size)`` of a directory's own .gitignore.
+
+    Editing the file in place does not touch the directory's mtime, so its
+    own state is part of the record.
+    """
+    try:
+        st = os.stat(os.path.join(top, ".gitignore"))
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
@@ -0,0 +1,354 @@
+import hashlib
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def read_patterns(path: Path) -> List[str]:
+    """Read the patterns of an ignore file, skipping blank lines and comments."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return []
+
+    return [
+        line for line in lines
+        if line.strip() and not line.startswith("#")
+    ]
+
+
+def _translate_segment(segment: str) -> str:
+    """Translate one path segment of a glob into a regex."""
+    out = []
+    i, n = 0, len(segment)
+    while i < n:
+        c = segment[i]
+        i += 1
+        if c == "*":
+            # Runs of '*' inside a segment behave like a single '*'
+            while i < n and segment[i] == "*":
+                i += 1
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i < n:
+            out.append(re.escape(segment[i]))
+            i += 1
+        elif c == "[":
+            j = i
+            if j < n and segment[j] in "!^":
+                j += 1
+            # A ']' right after the opening bracket is a literal
+            if j < n and segment[j] == "]":
+                j += 1
+            while j < n and segment[j] != "]":
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+                continue
+            body = segment[i:j].replace("\\", "\\\\").replace("[", "\\[")
+            i = j + 1
+            if body[0] in "!^":
+                out.append(f"(?!/)[^{body[1:]}]")
+            else:
+                out.append(f"(?!/)[{body}]")
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+_GLOB_CHARS = frozenset("*?[\\")
+
+
+def _parse(pattern: str) -> Tuple[bool, str, bool, bool]:
+    """Split a raw pattern into ``(negate, body, dir_only, anchored)``."""
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+
+    # Trailing spaces are ignored unless escaped with a backslash
+    while pattern.endswith(" ") and not pattern.endswith("\\ "):
+        pattern = pattern[:-1]
+
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+
+    # A separator at the beginning or in the middle anchors the pattern
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    # "**/name" matches "name" at any level, exactly like a bare "name"
+    if pattern.startswith("**/") and "/" not in pattern[3:]:
+        pattern = pattern[3:]
+        anchored = False
+
+    return negate, pattern, dir_only, anchored
+
+
+def _translate(pattern: str) -> Optional[Tuple[str, bool, bool]]:
+    """Translate a gitignore pattern into ``(regex, negate, basename_only)``.
+
+    The regex is matched against the path relative to the ignore file's
+    directory, with a trailing ``/`` appended for directories. Patterns
+    without a separator match at any level; for those ``basename_only`` is
+    True and the regex is meant to be matched against the final path
+    component only. Returns None for patterns that can never match.
+    """
+    negate, pattern, dir_only, anchored = _parse(pattern)
+    if not pattern:
+        return None
+
+    tail = "/" if dir_only else "/?"
+    if not anchored and pattern != "**":
+        return _translate_segment(pattern) + tail, negate, True
+
+    segments = pattern.split("/")
+    parts = []
+    last = len(segments) - 1
+    for i, segment in enumerate(segments):
+        if segment == "**":
+            if i == last:
+                # Everything inside, but not the directory itself
+                parts.append(".+")
+            else:
+                parts.append("(?:.*/)?")
+            continue
+        parts.append(_translate_segment(segment))
+        if i != last:
+            parts.append("/")
+
+    parts.append(tail)
+    return "".join(parts), negate, False
+
+
+class _Alternation:
+    """Regexes combined into one alternation, highest pattern index first.
+
+    The first alternative that matches is the one with the highest index, so
+    a single ``fullmatch`` call finds the last matching pattern.
+    """
+
+    def __init__(self, regexes: List[Tuple[int, str]]):
+        regexes = sorted(regexes, reverse=True)
+        self.indexes = [index for index, _ in regexes]
+        self.regex = (
+            re.compile("|".join(f"({r})" for _, r in regexes), re.DOTALL)
+            if regexes else None
+        )
+
+    def last_match(self, subject: str) -> int:
+        """Return the index of the last pattern matching ``subject``, or -1."""
+        if self.regex is None:
+            return -1
+        m = self.regex.fullmatch(subject)
+        return -1 if m is None else self.indexes[m.lastindex - 1]
+
+
+class GitIgnore:
+    """A set of gitignore patterns compiled for fast lookup.
+
+    Only the last matching pattern decides, as in git, so every structure
+    below answers "what is the highest-numbered pattern matching this path".
+    The two most common shapes are served from hash tables: plain names
+    (``build/``, ``.env``) by exact lookup and ``*suffix`` globs (``*.log``) by
+    one lookup per distinct suffix length. Every other pattern is compiled
+    into one of two combined regexes, for final-component and for whole-path
+    patterns, so a lookup costs a few dict probes and at most two
+    ``fullmatch`` calls however long the ignore file is.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._exact: Dict[str, int] = {}
+        self._suffixes: Dict[str, int] = {}
+        names = []
+        paths = []
+        self._negate: List[bool] = []
+        for pattern in patterns:
+            translated = _translate(pattern)
+            if translated is None:
+                continue
+            regex, negate, basename_only = translated
+            index = len(self._negate)
+            self._negate.append(negate)
+            if basename_only and self._add_literal(pattern, index):
+                continue
+            (names if basename_only else paths).append((index, regex))
+
+        self._suffix_lengths = sorted({len(k) for k in self._suffixes})
+        self._names = _Alternation(names)
+        self._paths = _Alternation(paths)
+
+    def _add_literal(self, pattern: str, index: int) -> bool:
+        """Register a plain name or ``*suffix`` pattern in the hash tables."""
+        _, body, dir_only, _ = _parse(pattern)
+        table = self._exact
+        if body.startswith("*"):
+            table = self._suffixes
+            body = body[1:]
+        if not body or _GLOB_CHARS.intersection(body):
+            return False
+        # Keys carry the trailing "/" that directory subjects have
+        keys = [f"{body}/"] if dir_only else [body, f"{body}/"]
+        for key in keys:
+            table[key] = index
+        return True
+
+    def __bool__(self) -> bool:
+        return bool(self._negate)
+
+    def __len__(self) -> int:
+        return len(self._negate)
+
+    def match(self, rel_path: str, is_dir: bool = False) -> Optional[bool]:
+        """Return the verdict of the last pattern matching ``rel_path``.
+
+        True means ignored, False means re-included by a ``!`` pattern and
+        None means no pattern matched. Parent directories are not checked;
+        callers walking top-down prune ignored directories instead.
+        """
+        subject = f"{rel_path}/" if is_dir else rel_path
+        name = subject[subject.rfind("/", 0, -1) + 1:]
+        index = max(
+            self._exact.get(name, -1),
+            self._names.last_match(name),
+            self._paths.last_match(subject),
+        )
+        for length in self._suffix_lengths:
+            if length > len(name):
+                break
+            found = self._suffixes.get(name[-length:], -1)
+            if found > index:
+                index = found
+        if index < 0:
+            return None
+        return not self._negate[index]
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Check whether ``rel_path`` is ignored, including through a parent.
+
+        As in git, a file cannot be re-included if one of its parent
+        directories is excluded.
+        """
+        rel_path = rel_path.replace("\\", "/").strip("/")
+        parts = rel_path.split("/")
+        for i in range(1, len(parts)):
+            if self.match("/".join(parts[:i]), is_dir=True):
+                return True
+        return bool(self.match(rel_path, is_dir))
+
+
+@lru_cache(maxsize=256)
+def compile_patterns(patterns: Tuple[str, ...]) -> GitIgnore:
+    """Compile patterns, reusing the matcher for identical pattern sets.
+
+    Monorepos often repeat the same nested ignore file many times; those all
+    share one compiled matcher.
+    """
+    return GitIgnore(patterns)
+
+
+class IgnoreRules:
+    """The ignore rules in effect inside one directory.
+
+    Each level holds the compiled patterns of one ignore file together with
+    the directory they are relative to, and links to the rules of the parent
+    directory. A directory without an ignore file of its own simply shares
+    its parent's rules, so the chain only grows where there is something new
+    to match and no level is ever parsed or compiled twice.
+
+    ``digest`` identifies the whole chain by content, stably across runs, so
+    results filtered with these rules can be cached and later recognised as
+    still valid.
+    """
+
+    __slots__ = ("patterns", "gitignore", "base", "parent", "digest")
+
+    def __init__(
+        self,
+        patterns: Tuple[str, ...] = (),
+        base: str = "",
+        parent: Optional["IgnoreRules"] = None,
+    ):
+        self.patterns = patterns
+        self.gitignore = compile_patterns(patterns) if patterns else None
+        self.base = base
+        self.parent = parent
+
+        h = hashlib.blake2b(digest_size=8)
+        h.update(parent.digest.encode() if parent is not None else b"")
+        h.update(base.encode("utf-8", "surrogateescape"))
+        for pattern in patterns:
+            h.update(b"\0" + pattern.encode("utf-8", "surrogateescape"))
+        self.digest = h.hexdigest()
+
+    def __bool__(self) -> bool:
+        return self.gitignore is not None or self.parent is not None
+
+    def child(self, base: str, patterns: List[str]) -> "IgnoreRules":
+        """Return the rules for directory ``base`` given its own patterns."""
+        if not patterns:
+            return self
+        parent = self if self else None
+        return IgnoreRules(tuple(patterns), base, parent)
+
+    def match(self, rel_path: str, is_dir: bool = False) -> Optional[bool]:
+        """Return the verdict for a path relative to the scan root.
+
+        Deeper ignore files override shallower ones, as in git, so levels
+        are consulted from the innermost outwards and the first one with a
+        matching pattern decides.
+        """
+        rules = self
+        while rules is not None:
+            if rules.gitignore is not None:
+                base = rules.base
+                verdict = rules.gitignore.match(
+                    rel_path[len(base) + 1:] if base else rel_path, is_dir
+                )
+                if verdict is not None:
+                    return verdict
+            rules = rules.parent
+        return None
+
+
+def git_dir(root: Path) -> Optional[Path]:
+    """Return the git directory of a work tree root, if it has one.
+
+    Handles both a regular ``.git`` directory and the ``gitdir:`` file that
+    worktrees and submodules use.
+    """
+    dot_git = root / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    try:
+        with open(dot_git, "r", encoding="utf-8") as f:
+            line = f.readline().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not line.startswith("gitdir:"):
+        return None
+    target = Path(line[len("gitdir:"):].strip())
+    return target if target.is_absolute() else root / target
+
+
+def root_rules(root: Path) -> IgnoreRules:
+    """Return the base rules for a scan root, from ``.git/info/exclude``.
+
+    The exclude file has lower precedence than every ``.gitignore``, so it
+    sits at the bottom of the chain. The root's own ``.gitignore`` is picked
+    up by the walk like any other directory's.
+    """
+    gd = git_dir(root)
+    if gd is None:
+        return IgnoreRules()
+    return IgnoreRules().child("", read_patterns(gd / "info" / "exclude"))
+
+
+def load_gitignore(base_path: Path) -> Optional[GitIgnore]:
+    """Load and compile the .gitignore in ``base_path``, if any."""
+    patterns = read_patterns(base_path / ".gitignore")
+    if not patterns:
+        return None
+    return GitIgnore(patterns)
@@ -0,0 +1,231 @@
+import os
+import re
+import stat
+import struct
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from repolyze.core.filesystem.gitignore import git_dir
+from repolyze.core.filesystem.scan import SKIP_DIRS, ScanEntry
+from repolyze.core.profile import Profiler
+
+_SIGNATURE = b"DIRC"
+_HEADER = struct.Struct(">4sII")
+# ctime s/ns, mtime s/ns, dev, ino, mode, uid, gid, size
+_STAT = struct.Struct(">10I")
+_FLAGS = struct.Struct(">H")
+
+_FLAG_EXTENDED = 0x4000
+_FLAG_STAGE = 0x3000
+_EXT_SKIP_WORKTREE = 0x4000
+
+_OBJECT_FORMAT = re.compile(r"^\s*objectformat\s*=\s*sha256\s*$", re.I | re.M)
+
+
+class GitIndexError(ValueError):
+    """The repository has no index this module can read."""
+
+
+class IndexEntry(NamedTuple):
+    """The cached stat data of one tracked path, as stored in the index."""
+
+    path: str  # relative to the work tree, "/"-separated
+    mode: int
+    size: int  # st_size truncated to 32 bits
+    mtime_s: int
+    mtime_ns: int
+    dev: int
+    inode: int
+
+
+def _varint(data: bytes, pos: int):
+    """Decode git's offset varint at ``pos``; return ``(value, next_pos)``."""
+    c = data[pos]
+    pos += 1
+    value = c & 0x7F
+    while c & 0x80:
+        c = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (c & 0x7F)
+    return value, pos
+
+
+def _hash_size(gd: Path) -> int:
+    """Return the object id size of a repository: 20 (SHA-1) or 32 (SHA-256)."""
+    candidates = [gd / "config"]
+    try:
+        common = (gd / "commondir").read_text(encoding="utf-8").strip()
+        candidates.append((gd / common / "config") if common else gd / "config")
+    except OSError:
+        pass
+    for config in candidates:
+        try:
+            if _OBJECT_FORMAT.search(config.read_text(encoding="utf-8", errors="replace")):
+                return 32
+        except OSError:
+            continue
+    return 20
+
+
+def read_index(index: Path, hash_size: int = 20) -> Iterator[IndexEntry]:
+    """Parse a git index file (versions 2 to 4) and yield its entries.
+
+    Entries are yielded in index order, which is sorted by path. Only stage
+    0 entries are yielded: during a merge conflict a path has entries for
+    stages 1-3 instead, and the first of those stands in for it. Entries
+    marked skip-worktree (sparse checkouts, including the directory entries
+    of a sparse index) are not on disk and are left out.
+
+    Raises GitIndexError if the file is missing, truncated, has an
+    unsupported version or uses a split index.
+    """
+    try:
+        with open(index, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise GitIndexError(f"cannot read {index}: {e}") from e
+
+    try:
+        signature, version, count = _HEADER.unpack_from(data)
+    except struct.error:
+        raise GitIndexError(f"{index} is truncated") from None
+    if signature != _SIGNATURE:
+        raise GitIndexError(f"{index} is not a git index")
+    if version not in (2, 3, 4):
+        raise GitIndexError(f"unsupported index version {version} in {index}")
+
+    flags_at = _STAT.size + hash_size
+    pos = _HEADER.size
+    previous = b""
+    last_conflict = None
+    try:
+        for _ in range(count):
+            start = pos
+            (_, _, mtime_s, mtime_ns, dev, ino, mode, _, _, size) = _STAT.unpack_from(data, pos)
+            (flags,) = _FLAGS.unpack_from(data, pos + flags_at)
+            pos += flags_at + 2
+            skip = False
+            if flags & _FLAG_EXTENDED:
+                (extended,) = _FLAGS.unpack_from(data, pos)
+                pos += 2
+                skip = bool(extended & _EXT_SKIP_WORKTREE)
+
+            if version == 4:
+                # Prefix compression: drop N bytes of the previous path and
+                # append the NUL-terminated suffix; no padding
+                strip, pos = _varint(data, pos)
+                end = data.index(b"\0", pos)
+                name = previous[:len(previous) - strip] + data[pos:end]
+                pos = end + 1
+                previous = name
+            else:
+                end = data.index(b"\0", pos)
+                name = data[pos:end]
+                # 1 to 8 NULs pad the entry to a multiple of 8 bytes
+                pos = start + ((end - start + 8) & ~7)
+
+            if skip:
+                continue
+            if flags & _FLAG_STAGE:
+                if name == last_conflict:
+                    continue
+                last_conflict = name
+            yield IndexEntry(
+                os.fsdecode(name), mode, size, mtime_s, mtime_ns, dev, ino
+            )
+    except (struct.error, ValueError, IndexError):
+        raise GitIndexError(f"{index} is truncated or corrupt") from None
+
+    # Extensions follow the entries: a 4-byte signature and a 4-byte size
+    end = len(data) - hash_size
+    while pos + 8 <= end:
+        signature = data[pos:pos + 4]
+        (length,) = struct.unpack_from(">I", data, pos + 4)
+        if signature == b"link":
+            raise GitIndexError(f"{index} is a split index, which is not supported")
+        pos += 8 + length
+
+
+def index_entries(
+    root: Path, verify: bool = False, profiler: Optional[Profiler] = None
+) -> Iterator[ScanEntry]:
+    """Yield ScanEntries for the files tracked in the index of ``root``.
+
+    A replacement for ``scan_entries()`` in git work trees: the file set
+    comes from the index instead of a directory walk with ignore matching,
+    and sizes and mtimes from the stat data git caches there, so a fresh
+    index costs no per-file syscalls at all. Directories are derived from
+    the file paths and yielded before their contents. Symlinks and
+    submodules are skipped, as are paths inside ``SKIP_DIRS``, like the walk
+    does. Tracked files are counted even if they match an ignore pattern,
+    and untracked files are not seen.
+
+    Entries the index cannot vouch for are checked with ``lstat``: the
+    "racily clean" ones, modified no earlier than the index itself (git
+    zeroes their cached size), and with ``verify`` every entry, which also
+    drops files deleted since the index was written. The index only holds
+    the low 32 bits of each size, so files of 4 GiB or more are only right
+    with ``verify``. Entries not checked have an ``nlink`` of 1, since the
+    index has no link counts: hard links are then separate files. A
+    ``profiler`` counts these ``lstat`` calls and the files skipped for
+    ``SKIP_DIRS``.
+    """
+    root = Path(root)
+    gd = git_dir(root)
+    if gd is None:
+        raise GitIndexError(f"{root} is not the root of a git work tree")
+    index = gd / "index"
+    try:
+        st = os.stat(index)
+    except OSError as e:
+        raise GitIndexError(f"cannot read {index}: {e}") from e
+    index_mtime = divmod(st.st_mtime_ns, 1_000_000_000)
+
+    top = os.fspath(root)
+    sep = os.sep
+    seen_dirs = {""}
+
+    for entry in read_index(index, _hash_size(gd)):
+        if not stat.S_ISREG(entry.mode):
+            # Symlinks (0o120000) and submodules (0o160000)
+            continue
+
+        rel_dir, _, name = entry.path.rpartition("/")
+        if rel_dir not in seen_dirs:
+            parts = rel_dir.split("/")
+            if SKIP_DIRS.intersection(parts):
+                if profiler is not None:
+                    profiler.count(pruned_skip_dirs=1)
+                continue
+            # Yield any parent directories not seen yet, outermost first
+            for i in range(1, len(parts) + 1):
+                d = "/".join(parts[:i])
+                if d not in seen_dirs:
+                    seen_dirs.add(d)
+                    yield ScanEntry(
+                        top + sep + d.replace("/", sep), parts[i - 1], True,
+                        0, 0.0, 0, 0,
+                    )
+
+        path = top + sep + entry.path.replace("/", sep)
+        if verify or (entry.mtime_s, entry.mtime_ns) >= index_mtime:
+            if profiler is not None:
+                profiler.count(stat_calls=1)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            yield ScanEntry(
+                path, name, False, st.st_size, st.st_mtime,
+                st.st_ino, st.st_dev, st.st_nlink, st.st_mtime_ns,
+            )
+            continue
+
+        yield ScanEntry(
+            path, name, False, entry.size,
+            entry.mtime_s + entry.mtime_ns * 1e-9,
+            entry.inode, entry.dev,
+            mtime_ns=entry.mtime_s * 1_000_000_000 + entry.mtime_ns,
+        )
@@ -3,3 +3,11 @@ from pathlib import Path
 
 def depth(base: Path, target: Path) -> int:
     return len(target.relative_to(base).parts)
+
+
+def suffix(name: str) -> str:
+    """Return the extension of a file name, following the rules of Path.suffix."""
+    i = name.rfind(".")
+    if 0 < i < len(name) - 1:
+        return name[i:]
+    return ""
@@ -1,7 +1,15 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterator, List, Optional
-from fnmatch import fnmatch
+from typing import TYPE_CHECKING, Iterator, List, NamedTuple, Optional, Tuple
+
+from repolyze.core.filesystem.gitignore import (
+    IgnoreRules, read_patterns, root_rules
+)
+from repolyze.core.profile import Profiler, timed
+
+if TYPE_CHECKING:
+    from repolyze.core.filesystem.cache import ScanCache
 
 # Directories to skip during scanning
 SKIP_DIRS = {
@@ -21,58 +29,218 @@ SKIP_DIRS = {
 }
 
 
-def _load_gitignore(base_path: Path) -> Optional[List[str]]:
-    """Load .gitignore patterns if file exists."""
-    gitignore_path = base_path / ".gitignore"
-    if not gitignore_path.exists():
-        return None
-    
+class ScanEntry(NamedTuple):
+    """A single scanned directory entry.
+
+    Built from ``os.DirEntry`` so that directories cost no ``stat`` call at
+    all (their type comes from ``d_type``) and files cost at most one cached
+    ``lstat``. ``size``, ``mtime``, ``mtime_ns`` and ``dev`` are 0 for
+    directories. ``nlink`` is 0 where the platform does not report it
+    (Windows). ``mtime_ns`` is the exact modification time, which the float
+    ``mtime`` may round.
+    """
+
+    path: str
+    name: str
+    is_dir: bool
+    size: int
+    mtime: float
+    inode: int
+    dev: int
+    nlink: int = 1
+    mtime_ns: int = 0
+
+
+def scan_dir(
+    top: str, rel_root: str, rules: IgnoreRules, profiler: Optional[Profiler] = None
+) -> Tuple[List[ScanEntry], List[ScanEntry], IgnoreRules]:
+    """List one directory and return its filtered ``(dirs, files, rules)``.
+
+    ``rules`` are the ignore rules inherited from the parent; the returned
+    rules additionally include this directory's own ``.gitignore``, if any,
+    and are the ones to pass down to its subdirectories.
+
+    With a ``profiler`` the listing, the filtering and the stat calls are
+    timed as the "walk", "filter" and "stat" phases, and counted.
+    """
     try:
-        with open(gitignore_path, 'r', encoding='utf-8') as f:
-            patterns = []
-            for line in f:
-                line = line.strip()
-                # Skip empty lines and comments
-                if line and not line.startswith('#'):
-                    patterns.append(line)
-            return patterns if patterns else None
-    except (OSError, UnicodeDecodeError):
-        return None
-
-
-def _matches_gitignore(rel_path: str, patterns: List[str], is_dir: bool = False) -> bool:
-    """Check if a path matches any gitignore pattern."""
-    if not patterns:
-        return False
-    
-    # Normalize path separators to forward slashes
-    rel_path = rel_path.replace('\\', '/')
-    
-    for pattern in patterns:
-        # Handle negation patterns (starting with !)
-        if pattern.startswith('!'):
-            continue
-        
-        # Remove leading slash for proper matching
-        pattern = pattern.lstrip('/')
-        
-        # Handle directory-only patterns (ending with /)
-        if pattern.endswith('/'):
-            pattern = pattern.rstrip('/')
-            if is_dir and (fnmatch(rel_path, pattern) or fnmatch(rel_path, f"**/{pattern}")):
-                return True
-        else:
-            # Match both files and directories
-            # Check exact match and wildcard match
-            if fnmatch(rel_path, pattern) or fnmatch(rel_path, f"**/{pattern}"):
-                return True
-            # Check if any parent directory matches
-            parts = rel_path.split('/')
-            for i in range(len(parts)):
-                if fnmatch(parts[i], pattern):
-                    return True
-    
-    return False
+        with timed(profiler, "walk"), os.scandir(top) as it:
+            entries = list(it)
+    except OSError:
+        # Skip directories we can't list
+        return [], [], rules
+
+    with timed(profiler, "filter"):
+        # The directory's own ignore file applies to its entries, so it has
+        # to be read before they are filtered
+        for entry in entries:
+            if entry.name == ".gitignore" and entry.is_file(follow_symlinks=False):
+                rules = rules.child(rel_root, read_patterns(Path(entry.path)))
+                break
+
+        dirs = []
+        # Files that pass the filters, to stat
+        kept = []
+        skipped = ignored = 0
+        for entry in entries:
+            name = entry.name
+            rel_path = f"{rel_root}/{name}" if rel_root else name
+            try:
+                # Both answered from d_type, no syscall on most platforms
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and entry.is_symlink():
+                    continue
+            except OSError:
+                continue
+
+            if is_dir:
+                if name in SKIP_DIRS:
+                    skipped += 1
+                    continue
+                # Pruned here, so nothing below an ignored directory is listed
+                if rules and rules.match(rel_path, is_dir=True):
+                    ignored += 1
+                    continue
+                dirs.append(ScanEntry(entry.path, name, True, 0, 0.0, entry.inode(), 0))
+                continue
+
+            if rules and rules.match(rel_path):
+                ignored += 1
+                continue
+            kept.append(entry)
+
+    with timed(profiler, "stat"):
+        files = []
+        for entry in kept:
+            try:
+                # Cached lstat; free on Windows, one syscall elsewhere
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                # Skip files we can't access
+                continue
+            # st_ino is not filled in from the directory listing on Windows
+            files.append(
+                ScanEntry(
+                    entry.path, entry.name, False, st.st_size, st.st_mtime,
+                    st.st_ino or entry.inode(), st.st_dev, st.st_nlink,
+                    st.st_mtime_ns,
+                )
+            )
+
+    if profiler is not None:
+        profiler.count(
+            dirs_visited=1, pruned_skip_dirs=skipped, pruned_gitignore=ignored,
+            stat_calls=len(kept),
+        )
+    return dirs, files, rules
+
+
+def scan_entries(path: Path, workers: int = 1) -> Iterator[ScanEntry]:
+    """Scan directory tree and yield a ScanEntry per directory and file.
+
+    Applies the same filtering as ``scan()`` and yields entries top-down: the
+    subdirectories of a directory, then its files, then the contents of each
+    subdirectory in turn. Symlinks are skipped.
+
+    Ignore rules come from ``.git/info/exclude`` and from the ``.gitignore``
+    of every directory visited, with deeper files taking precedence.
+
+    With ``workers > 1`` directories are listed concurrently by a thread
+    pool, which helps on high-latency filesystems; the order of the yielded
+    entries is the same as with a single worker.
+    """
+    return scan_subtree(os.fspath(path), "", root_rules(path), workers)
+
+
+def scan_subtree(
+    top: str,
+    rel_root: str,
+    rules: IgnoreRules,
+    workers: int = 1,
+    cache: Optional["ScanCache"] = None,
+    profiler: Optional[Profiler] = None,
+) -> Iterator[ScanEntry]:
+    """Yield the entries below directory ``top``, as ``scan_entries()`` does.
+
+    ``rel_root`` is the path of ``top`` relative to the scan root and
+    ``rules`` the ignore rules inherited from its parent, which lets a
+    subtree of a larger scan be walked on its own (e.g. in another process)
+    with the same filtering.
+
+    With a ``cache``, unchanged directories are served from it instead of
+    being listed again. ``profiler`` is passed on to ``scan_dir()``.
+    """
+    list_dir = cache.scan_dir if cache is not None else scan_dir
+
+    if workers > 1:
+        yield from _scan_parallel(top, rel_root, rules, workers, list_dir, profiler)
+        return
+
+    # Stack of (absolute directory path, path relative to the scan root,
+    # ignore rules inherited from the parent)
+    stack = [(top, rel_root, rules)]
+
+    while stack:
+        top, rel_root, rules = stack.pop()
+        dirs, files, rules = list_dir(top, rel_root, rules, profiler)
+
+        yield from dirs
+        yield from files
+
+        for d in reversed(dirs):
+            rel_dir = f"{rel_root}/{d.name}" if rel_root else d.name
+            stack.append((d.path, rel_dir, rules))
+
+
+# Directory listings kept in flight per worker by the parallel scan
+PREFETCH_PER_WORKER = 4
+
+
+def _scan_parallel(
+    top: str,
+    rel_root: str,
+    rules: IgnoreRules,
+    workers: int,
+    list_dir=scan_dir,
+    profiler: Optional[Profiler] = None,
+) -> Iterator[ScanEntry]:
+    """Parallel variant of ``scan_subtree()`` with the same output order.
+
+    The walk keeps the serial depth-first stack, but the directories closest
+    to the top of the stack, i.e. the next ones to be yielded, are handed to
+    the pool ahead of time. At most ``workers * PREFETCH_PER_WORKER``
+    listings are pending or buffered at once, so memory stays bounded even
+    when the pool runs far ahead of the consumer.
+    """
+    limit = workers * PREFETCH_PER_WORKER
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="repolyze-scan")
+
+    # Each stack item is [args for scan_dir, future or None]
+    stack = [[(top, rel_root, rules), None]]
+    in_flight = 0
+
+    try:
+        while stack:
+            # Top up the pool from the top of the stack downwards
+            i = len(stack) - 1
+            while in_flight < limit and i >= 0:
+                if stack[i][1] is None:
+                    stack[i][1] = pool.submit(list_dir, *stack[i][0], profiler)
+                    in_flight += 1
+                i -= 1
+
+            (_, rel_root, _), future = stack.pop()
+            in_flight -= 1
+            dirs, files, rules = future.result()
+
+            yield from dirs
+            yield from files
+
+            for d in reversed(dirs):
+                rel_dir = f"{rel_root}/{d.name}" if rel_root else d.name
+                stack.append([(d.path, rel_dir, rules), None])
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
 
 def scan(path: Path) -> Iterator[Path]:
@@ -80,56 +248,8 @@ def scan(path: Path) -> Iterator[Path]:
     
     Walks the directory tree and yields paths while:
     - Skipping directories listed in SKIP_DIRS
-    - Respecting .gitignore patterns if .gitignore exists
+    - Respecting .gitignore files (nested ones included) and .git/info/exclude
     - Not following symlinks to avoid counting external files
     """
-    # Load gitignore patterns if available
-    gitignore_patterns = _load_gitignore(path)
-    
-    for root, dirs, files in os.walk(path, followlinks=False):
-        root_path = Path(root)
-        
-        # Get relative path for gitignore matching
-        try:
-            rel_root = root_path.relative_to(path)
-        except ValueError:
-            rel_root = Path('.')
-        
-        # Filter out directories to skip
-        filtered_dirs = []
-        for d in dirs:
-            # Skip if in SKIP_DIRS
-            if d in SKIP_DIRS:
-                continue
-            
-            # Skip if matches .gitignore pattern
-            if gitignore_patterns:
-                if rel_root == Path('.'):
-                    rel_path = d
-                else:
-                    rel_path = str(rel_root / d)
-                
-                if _matches_gitignore(rel_path, gitignore_patterns, is_dir=True):
-                    continue
-            
-            filtered_dirs.append(d)
-        
-        # Update dirs in-place to affect os.walk
-        dirs[:] = filtered_dirs
-        
-        # Yield directories
-        for d in filtered_dirs:
-            yield root_path / d
-        
-        # Yield files (also check against gitignore)
-        for f in files:
-            if gitignore_patterns:
-                if rel_root == Path('.'):
-                    rel_path = f
-                else:
-                    rel_path = str(rel_root / f)
-                
-                if _matches_gitignore(rel_path, gitignore_patterns, is_dir=False):
-                    continue
-            
-            yield root_path / f
+    for entry in scan_entries(path):
+        yield Path(entry.path)
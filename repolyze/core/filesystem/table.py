@@ -0,0 +1,129 @@
+import os
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+from repolyze.core.filesystem.scan import ScanEntry
+
+
+class FileTable:
+    """A compact, columnar store of the file entries of a scan.
+
+    A ``ScanEntry`` costs some 300 bytes once its path string and the int
+    and float objects of its fields are counted. Here each field is a column
+    of machine values (``array``), the path is split into the id of its
+    parent directory, whose path is stored once, and its name, which is
+    interned so that names common across directories (``__init__.py``) are
+    shared. That is about 60 bytes per file plus the name.
+
+    Rows are numbered from 0; ``add()`` returns the row of an entry and
+    ``entry()`` builds the ``ScanEntry`` again when it is needed. Rows of
+    removed entries are reused.
+    """
+
+    def __init__(self):
+        self._dir_paths: List[Optional[str]] = []
+        self._dir_ids: Dict[str, int] = {}
+        # Rows in each directory, so that unused directories can be dropped
+        self._dir_rows = array("I")
+        self._free_dirs: List[int] = []
+
+        self.parent = array("I")
+        self.name: List[Optional[str]] = []
+        self.size = array("q")
+        self.mtime = array("d")
+        self.inode = array("Q")
+        self.dev = array("Q")
+        self.nlink = array("I")
+        self.mtime_ns = array("q")
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.name) - len(self._free)
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate over the rows in use."""
+        for row, name in enumerate(self.name):
+            if name is not None:
+                yield row
+
+    def _dir_id(self, path: str) -> int:
+        dir_id = self._dir_ids.get(path)
+        if dir_id is None:
+            if self._free_dirs:
+                dir_id = self._free_dirs.pop()
+                self._dir_paths[dir_id] = path
+            else:
+                dir_id = len(self._dir_paths)
+                self._dir_paths.append(path)
+                self._dir_rows.append(0)
+            self._dir_ids[path] = dir_id
+        self._dir_rows[dir_id] += 1
+        return dir_id
+
+    def add(self, entry: ScanEntry) -> int:
+        """Store file ``entry`` and return its row."""
+        parent = self._dir_id(os.path.dirname(entry.path))
+        name = sys.intern(entry.name)
+        values = (
+            entry.size, entry.mtime, entry.inode, entry.dev, entry.nlink,
+            entry.mtime_ns,
+        )
+        if self._free:
+            row = self._free.pop()
+            self.parent[row] = parent
+            self.name[row] = name
+            (
+                self.size[row], self.mtime[row], self.inode[row], self.dev[row],
+                self.nlink[row], self.mtime_ns[row],
+            ) = values
+            return row
+
+        self.parent.append(parent)
+        self.name.append(name)
+        for column, value in zip(
+            (
+                self.size, self.mtime, self.inode, self.dev, self.nlink,
+                self.mtime_ns,
+            ),
+            values,
+        ):
+            column.append(value)
+        return len(self.name) - 1
+
+    def remove(self, row: int) -> None:
+        """Free ``row``, to be reused by a later ``add()``."""
+        parent = self.parent[row]
+        self._dir_rows[parent] -= 1
+        if not self._dir_rows[parent]:
+            del self._dir_ids[self._dir_paths[parent]]
+            self._dir_paths[parent] = None
+            self._free_dirs.append(parent)
+        self.name[row] = None
+        self._free.append(row)
+
+    def path(self, row: int) -> str:
+        return os.path.join(self._dir_paths[self.parent[row]], self.name[row])
+
+    def entry(self, row: int) -> ScanEntry:
+        """The ``ScanEntry`` stored in ``row``."""
+        return ScanEntry(
+            self.path(row), self.name[row], False, self.size[row], self.mtime[row],
+            self.inode[row], self.dev[row], self.nlink[row], self.mtime_ns[row],
+        )
+
+    def matches(self, row: int, entry: ScanEntry) -> bool:
+        """Whether ``row`` holds file ``entry`` as it is now.
+
+        Only the fields are compared, not the directory, which is the same
+        for the entries of one listing.
+        """
+        return (
+            self.size[row] == entry.size
+            and self.mtime[row] == entry.mtime
+            and self.inode[row] == entry.inode
+            and self.dev[row] == entry.dev
+            and self.nlink[row] == entry.nlink
+            and self.mtime_ns[row] == entry.mtime_ns
+            and self.name[row] == entry.name
+        )
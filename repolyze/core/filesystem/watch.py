@@ -0,0 +1,225 @@
+import abc
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Optional, Set
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+# Everything that can change a directory's listing or one of its files.
+# IN_DELETE_SELF/IN_MOVE_SELF are not needed: the parent directory gets an
+# IN_DELETE/IN_MOVED_FROM for the same change.
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+
+# struct inotify_event: wd, mask, cookie, len, then len bytes of name
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+class DirectoryWatcher(abc.ABC):
+    """Reports which watched directories changed.
+
+    ``poll()`` returns the set of directories whose listing or files changed
+    since the last call, an empty set on timeout, or None when changes may
+    have been lost and everything has to be rescanned.
+    """
+
+    @abc.abstractmethod
+    def add(self, path: str) -> None:
+        """Start watching directory ``path``."""
+
+    @abc.abstractmethod
+    def remove(self, path: str) -> None:
+        """Stop watching directory ``path``."""
+
+    @abc.abstractmethod
+    def poll(self, timeout: Optional[float] = None) -> Optional[Set[str]]:
+        """Wait up to ``timeout`` seconds for changes; see the class."""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "DirectoryWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class InotifyWatcher(DirectoryWatcher):
+    """Linux inotify through ctypes, one watch per directory.
+
+    inotify is not recursive, so every directory of the tree has to be
+    added; the number of watches is limited by
+    ``/proc/sys/fs/inotify/max_user_watches``, and ``add()`` raises OSError
+    with ``ENOSPC`` once it is reached.
+    """
+
+    def __init__(self):
+        libc = _libc()
+        if libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._libc = libc
+        self._fd = fd
+        self._paths: Dict[int, str] = {}
+        self._wds: Dict[str, int] = {}
+
+    def add(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            # Vanished or replaced by a file already; its parent will report it
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(err, os.strerror(err), path)
+        # A directory moved within the tree keeps its watch descriptor
+        old = self._paths.get(wd)
+        if old is not None and self._wds.get(old) == wd:
+            del self._wds[old]
+        self._paths[wd] = path
+        self._wds[path] = wd
+
+    def remove(self, path: str) -> None:
+        wd = self._wds.pop(path, None)
+        if wd is None or self._paths.get(wd) != path:
+            return
+        del self._paths[wd]
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def poll(self, timeout: Optional[float] = None) -> Optional[Set[str]]:
+        changed: Set[str] = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed
+
+        while True:
+            try:
+                data = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Drain what is left; a full rescan follows anyway
+                    changed = None
+                    continue
+                if mask & IN_IGNORED:
+                    path = self._paths.pop(wd, None)
+                    if path is not None and self._wds.get(path) == wd:
+                        del self._wds[path]
+                    continue
+                path = self._paths.get(wd)
+                if path is not None and changed is not None:
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher(DirectoryWatcher):
+    """Portable fallback that compares directory mtimes every ``interval``.
+
+    Only changes to a directory's listing are seen: a file rewritten in
+    place does not touch its directory's mtime, so its new size or mtime is
+    picked up the next time something else in the directory changes.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._mtimes: Dict[str, Optional[int]] = {}
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def add(self, path: str) -> None:
+        self._mtimes[path] = self._mtime(path)
+
+    def remove(self, path: str) -> None:
+        self._mtimes.pop(path, None)
+
+    def poll(self, timeout: Optional[float] = None) -> Optional[Set[str]]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path, old in self._mtimes.items():
+                new = self._mtime(path)
+                if new != old:
+                    self._mtimes[path] = new
+                    changed.add(path)
+            if changed:
+                return changed
+
+            delay = self.interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return changed
+                delay = min(delay, remaining)
+            time.sleep(delay)
+
+
+def open_watcher(backend: str = "auto", interval: float = 1.0) -> DirectoryWatcher:
+    """Return a watcher for ``backend``: "inotify", "poll" or "auto".
+
+    "auto" uses inotify where it is available and polling elsewhere.
+    """
+    if backend == "poll":
+        return PollingWatcher(interval)
+    if backend not in ("auto", "inotify"):
+        raise ValueError(f"unknown watch backend: {backend!r}")
+    try:
+        return InotifyWatcher()
+    except OSError:
+        if backend == "inotify":
+            raise
+        return PollingWatcher(interval)
@@ -0,0 +1,112 @@
+import json
+import os
+import time
+from json.encoder import encode_basestring_ascii as _encode
+from typing import IO, List, Union
+
+from repolyze.models import PhaseTime, RepoStats, TreeNode
+
+# Parts joined into one write() call
+CHUNK_PARTS = 4096
+
+
+class _Writer:
+    """Buffers the parts of a document and writes them in chunks."""
+
+    def __init__(self, fp: IO[str], compact: bool):
+        self.fp = fp
+        self.compact = compact
+        self.key_sep = ":" if compact else ": "
+        self.parts: List[str] = []
+        self._breaks: List[str] = []
+
+    def write(self, part: str) -> None:
+        self.parts.append(part)
+        if len(self.parts) >= CHUNK_PARTS:
+            self.flush()
+
+    def flush(self) -> None:
+        self.fp.write("".join(self.parts))
+        self.parts.clear()
+
+    def newline(self, level: int) -> str:
+        """A line break indented to ``level``, as ``json.dumps(indent=2)``."""
+        if self.compact:
+            return ""
+        while len(self._breaks) <= level:
+            self._breaks.append("\n" + "  " * len(self._breaks))
+        return self._breaks[level]
+
+    def value(self, value, level: int) -> None:
+        """Write a value small enough to be encoded in one go."""
+        if self.compact:
+            self.write(json.dumps(value, separators=(",", ":")))
+        else:
+            self.write(json.dumps(value, indent=2).replace("\n", self.newline(level)))
+
+    def tree(self, root: TreeNode, level: int) -> None:
+        """Write the tree as ``RepoStats._tree_to_dict()`` would convert it."""
+        key_sep = self.key_sep
+        # Parts to write, or (node, path, level, prefix) to expand
+        stack: List[Union[str, tuple]] = [(root, str(root.path), level, "")]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                self.write(item)
+                continue
+
+            node, path, level, prefix = item
+            inner = self.newline(level + 1)
+            self.write(
+                f'{prefix}{{{inner}"path"{key_sep}{_encode(path)},'
+                f'{inner}"file_count"{key_sep}{node.file_count},'
+                f'{inner}"total_size"{key_sep}{node.total_size},'
+                f'{inner}"children"{key_sep}'
+            )
+            children = node.children
+            if not children:
+                self.write(f"[]{self.newline(level)}}}")
+                continue
+
+            self.write("[")
+            stack.append(f"{inner}]{self.newline(level)}}}")
+            first = self.newline(level + 2)
+            rest = "," + first
+            for i in range(len(children) - 1, -1, -1):
+                child = children[i]
+                stack.append(
+                    (child, os.path.join(path, child.name), level + 2, rest if i else first)
+                )
+
+
+def write_json(stats: RepoStats, fp: IO[str], compact: bool = False) -> None:
+    """Write ``stats.to_dict()`` to ``fp`` as JSON, without building it whole.
+
+    The output is that of ``json.dumps(stats.to_dict(), indent=2)``, or with
+    ``compact`` that of ``json.dumps(..., separators=(",", ":"))``. Only the
+    aggregates are converted to a dict; the tree, which grows with the
+    number of files, is walked with an explicit stack and written as it
+    goes, in chunks of ``CHUNK_PARTS`` parts.
+
+    For a profiled analysis the time taken to write everything before the
+    "profile" entry, which comes last, is added to its "serialize" phase
+    before that entry is written.
+    """
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    writer = _Writer(fp, compact)
+    data = stats.to_dict(tree=False)
+    writer.write("{")
+    for i, (key, value) in enumerate(data.items()):
+        writer.write(f'{"," if i else ""}{writer.newline(1)}{_encode(key)}{writer.key_sep}')
+        if key == "tree" and stats.tree is not None:
+            writer.tree(stats.tree, 1)
+        elif key == "profile":
+            writer.flush()
+            serialize = stats.profile.phases.setdefault("serialize", PhaseTime())
+            serialize.wall += time.perf_counter() - start_wall
+            serialize.cpu += time.thread_time() - start_cpu
+            writer.value(RepoStats._dataclass_to_dict(stats.profile), 1)
+        else:
+            writer.value(value, 1)
+    writer.write(f'{writer.newline(0) if data else ""}}}')
+    writer.flush()
@@ -0,0 +1,44 @@
+from typing import List
+
+from repolyze.models import ProfileStats
+
+# Counters of ProfileStats and their labels
+COUNTERS = (
+    ("dirs_visited", "Directories visited"),
+    ("pruned_skip_dirs", "Pruned by SKIP_DIRS"),
+    ("pruned_gitignore", "Pruned by ignore rules"),
+    ("stat_calls", "stat calls"),
+)
+
+
+def render_profile(profile: ProfileStats) -> List[str]:
+    """Render the timings of ``profile`` as a table, then its counters.
+
+    Times are in milliseconds. "other" is the part of the total outside the
+    phases; it is negative when the phases of worker processes add up to
+    more than the total. "serialize" comes after the analysis and is not
+    part of the total.
+    """
+    lines = [f"{'Phase':<12} {'Wall (ms)':>12} {'CPU (ms)':>12}"]
+
+    def row(name: str, wall: float, cpu: float) -> None:
+        lines.append(f"{name:<12} {wall * 1000:12.1f} {cpu * 1000:12.1f}")
+
+    wall = cpu = 0.0
+    for name, phase in profile.phases.items():
+        if name != "serialize":
+            row(name, phase.wall, phase.cpu)
+            wall += phase.wall
+            cpu += phase.cpu
+    total = profile.total
+    row("other", total.wall - wall, total.cpu - cpu)
+    row("total", total.wall, total.cpu)
+    serialize = profile.phases.get("serialize")
+    if serialize is not None:
+        row("serialize", serialize.wall, serialize.cpu)
+
+    lines.append("")
+    width = max(len(label) for _, label in COUNTERS)
+    for name, label in COUNTERS:
+        lines.append(f"{label + ':':<{width + 1}} {getattr(profile, name):>10}")
+    return lines
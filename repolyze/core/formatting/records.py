@@ -0,0 +1,43 @@
+import csv
+from json.encoder import encode_basestring_ascii as _encode
+from typing import IO, Iterable
+
+from repolyze.core.records import FIELDS, FileRecord
+
+FORMATS = ("ndjson", "csv")
+
+
+def _ndjson_line(record: FileRecord) -> str:
+    lines = "null" if record.lines is None else record.lines
+    # Formatted directly: several times faster than json.dumps() of a dict
+    return (
+        f'{{"path":{_encode(record.path)},"size":{record.size},'
+        f'"mtime":{record.mtime!r},"ext":{_encode(record.ext)},'
+        f'"inode":{record.inode},"lines":{lines}}}\n'
+    )
+
+
+def write_ndjson(records: Iterable[FileRecord], fp: IO[str]) -> None:
+    """Write one JSON object per record and line, with the keys of ``FIELDS``."""
+    fp.writelines(map(_ndjson_line, records))
+
+
+def write_csv(records: Iterable[FileRecord], fp: IO[str]) -> None:
+    """Write the records as CSV, after a header row of ``FIELDS``.
+
+    ``lines`` is empty for records without a line count. ``fp`` should be
+    opened with ``newline=""``, as for ``csv.writer()``.
+    """
+    writer = csv.writer(fp)
+    writer.writerow(FIELDS)
+    writer.writerows(records)
+
+
+def write_records(records: Iterable[FileRecord], fp: IO[str], fmt: str) -> None:
+    """Write the records in format ``fmt``, one of ``FORMATS``."""
+    if fmt == "ndjson":
+        write_ndjson(records, fp)
+    elif fmt == "csv":
+        write_csv(records, fp)
+    else:
+        raise ValueError(f"unknown format: {fmt!r}")
@@ -1,22 +1,68 @@
-from typing import List
+import heapq
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
 from repolyze.models import TreeNode
 
+# A line to render: a node, or the number of entries left out, with the
+# prefix of its line, whether it is the last of its siblings and its depth
+_Item = Tuple[Union[TreeNode, int], str, bool, int]
 
-def render_tree(node: TreeNode, prefix: str = "") -> List[str]:
-    lines = [f"{prefix}{node.path.name}/"]
+
+def _items(
+    node: TreeNode, prefix: str, depth: int, max_depth: Optional[int], top: Optional[int]
+) -> List[_Item]:
+    """The lines to render below directory ``node``, at ``depth``."""
     children = node.children
+    if max_depth is not None and depth >= max_depth:
+        shown, hidden = [], len(children)
+    elif top is not None and len(children) > top:
+        # The largest subtrees, in their original order
+        keep = {
+            id(child)
+            for child in heapq.nlargest(top, children, key=lambda c: c.total_size)
+        }
+        shown = [child for child in children if id(child) in keep]
+        hidden = len(children) - len(shown)
+    else:
+        shown, hidden = children, 0
+
+    items: List[Union[TreeNode, int]] = list(shown)
+    if hidden:
+        items.append(hidden)
+    last = len(items) - 1
+    return [(item, prefix, i == last, depth + 1) for i, item in enumerate(items)]
 
-    for i, child in enumerate(children):
-        is_last = i == len(children) - 1
-        connector = "└─ " if is_last else "├─ "
-        extension = "   " if is_last else "│  "
 
-        if child.children:
-            lines.append(f"{prefix}{connector}{child.path.name}/")
-            lines.extend(
-                render_tree(child, prefix + extension)[1:]
-            )
+def iter_tree(
+    node: TreeNode, max_depth: Optional[int] = None, top: Optional[int] = None
+) -> Iterator[str]:
+    """Yield the lines of a text rendering of the tree below ``node``.
+
+    Directories below ``max_depth`` levels are not expanded, and only the
+    ``top`` largest entries of each directory are listed; what is left out
+    is summarised in a "… N more" line. The tree is walked with an explicit
+    stack, so its depth is not limited by the recursion limit, and lines
+    are produced one at a time.
+    """
+    yield f"{Path(node.name).name}/"
+    stack = _items(node, "", 0, max_depth, top)
+    stack.reverse()
+    while stack:
+        item, prefix, is_last, depth = stack.pop()
+        connector = "└─ " if is_last else "├─ "
+        if isinstance(item, int):
+            yield f"{prefix}{connector}… {item} more"
+        elif item.children:
+            yield f"{prefix}{connector}{item.name}/"
+            extension = "   " if is_last else "│  "
+            items = _items(item, prefix + extension, depth, max_depth, top)
+            stack.extend(reversed(items))
         else:
-            lines.append(f"{prefix}{connector}{child.path.name}")
+            yield f"{prefix}{connector}{item.name}"
+
 
-    return lines
+def render_tree(
+    node: TreeNode, max_depth: Optional[int] = None, top: Optional[int] = None
+) -> List[str]:
+    """The lines of ``iter_tree()``, as a list."""
+    return list(iter_tree(node, max_depth, top))
@@ -0,0 +1,108 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Iterator, Optional
+
+from repolyze.models import PhaseTime, ProfileStats
+
+# Phases of an analysis, in the order they are reported; "serialize" is
+# the writing of the results, after the analysis
+PHASES = ("walk", "filter", "stat", "aggregate", "tree", "metadata", "serialize")
+
+_NO_PROFILER = nullcontext()
+
+
+class _Phase:
+    """Adds the wall and CPU time of a ``with`` block to a phase."""
+
+    __slots__ = ("profiler", "name", "wall", "cpu")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+
+    def __exit__(self, *exc) -> None:
+        self.profiler.add(
+            self.name, time.perf_counter() - self.wall, time.thread_time() - self.cpu
+        )
+
+
+class Profiler:
+    """Records the time of each of ``PHASES`` and the counters of a scan.
+
+    Phases are timed with ``phase()`` around blocks of work, never single
+    entries, so that reading the clocks costs little next to the work. CPU
+    time is that of the thread running the block; the profiler can be
+    shared by the threads of a parallel walk. Worker processes record into
+    profilers of their own, which are merged with ``merge()``.
+    """
+
+    def __init__(self):
+        self.stats = ProfileStats({name: PhaseTime() for name in PHASES})
+        self._lock = threading.Lock()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def add(self, name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            phase = self.stats.phases[name]
+            phase.wall += wall
+            phase.cpu += cpu
+
+    def count(self, **counters: int) -> None:
+        """Add to the counters of ``ProfileStats`` of the same names."""
+        stats = self.stats
+        with self._lock:
+            for name, value in counters.items():
+                setattr(stats, name, getattr(stats, name) + value)
+
+    def merge(self, other: ProfileStats) -> None:
+        """Add the phases and counters recorded by another process."""
+        for name, phase in other.phases.items():
+            self.add(name, phase.wall, phase.cpu)
+        self.count(
+            dirs_visited=other.dirs_visited,
+            pruned_skip_dirs=other.pruned_skip_dirs,
+            pruned_gitignore=other.pruned_gitignore,
+            stat_calls=other.stat_calls,
+        )
+
+    def finish(self) -> ProfileStats:
+        """Record the total time since the profiler was created."""
+        self.stats.total = PhaseTime(
+            time.perf_counter() - self._wall, time.process_time() - self._cpu
+        )
+        return self.stats
+
+
+def timed(profiler: Optional[Profiler], name: str) -> ContextManager:
+    """``profiler.phase(name)``, or a context that does nothing without one."""
+    if profiler is None:
+        return _NO_PROFILER
+    return profiler.phase(name)
+
+
+@contextmanager
+def recording(profile: Optional[ProfileStats], name: str) -> Iterator[None]:
+    """Add the time of a ``with`` block to phase ``name`` of ``profile``.
+
+    For work done with the results of a profiled analysis, after it
+    finished, such as writing them out; does nothing if ``profile`` is None.
+    """
+    if profile is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        phase = profile.phases.setdefault(name, PhaseTime())
+        phase.wall += time.perf_counter() - wall
+        phase.cpu += time.thread_time() - cpu
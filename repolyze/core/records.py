@@ -0,0 +1,69 @@
+import os
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Union
+
+from repolyze.core.analyze import SOURCES
+from repolyze.core.content.lines import BLOCK_SIZE, count_lines
+from repolyze.core.filesystem.gitignore import root_rules
+from repolyze.core.filesystem.gitindex import index_entries
+from repolyze.core.filesystem.paths import suffix
+from repolyze.core.filesystem.scan import scan_subtree
+from repolyze.core.stats.aggregate import CODE_EXTS
+
+# Columns of the exported records, in order
+FIELDS = ("path", "size", "mtime", "ext", "inode", "lines")
+
+
+class FileRecord(NamedTuple):
+    """The stats of one file, for export.
+
+    ``path`` is relative to the analyzed directory, ``ext`` the lowercased
+    extension ("" if none) and ``lines`` None unless lines were counted and
+    the file is a readable, non-binary code file.
+    """
+
+    path: str
+    size: int
+    mtime: float
+    ext: str
+    inode: int
+    lines: Optional[int] = None
+
+
+def file_records(
+    path: Union[str, Path],
+    workers: int = 1,
+    source: str = "walk",
+    verify_index: bool = False,
+    lines: bool = False,
+) -> Iterator[FileRecord]:
+    """Yield a FileRecord per file of the repository at ``path``.
+
+    Records are produced straight from the scan as it goes, in its order,
+    with nothing kept per file, so memory use does not grow with the size
+    of the repository. ``workers``, ``source`` and ``verify_index`` are
+    those of ``analyze()``; hard links are listed once per path. ``lines``
+    counts the lines of code files (see ``CODE_EXTS``), reading them in
+    the same pass.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"unknown source: {source!r}")
+    path = Path(path).resolve()
+    if source == "git-index":
+        entries = index_entries(path, verify=verify_index)
+    else:
+        entries = scan_subtree(os.fspath(path), "", root_rules(path), workers=workers)
+
+    # Entry paths all start with the root and a separator
+    start = len(os.path.join(os.fspath(path), ""))
+    buffer = bytearray(BLOCK_SIZE) if lines else None
+    for entry in entries:
+        if entry.is_dir:
+            continue
+        ext = suffix(entry.name).lower()
+        count = None
+        if buffer is not None and ext in CODE_EXTS:
+            count = count_lines(entry.path, buffer)
+        yield FileRecord(
+            entry.path[start:], entry.size, entry.mtime, ext, entry.inode, count
+        )
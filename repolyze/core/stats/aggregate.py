@@ -0,0 +1,549 @@
+import heapq
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from repolyze.core.filesystem.paths import suffix
+from repolyze.core.filesystem.scan import ScanEntry
+from repolyze.core.stats.sketch import KLLSketch, histogram_quantile
+from repolyze.models import (
+    FileStat, DirStat,
+    StructureStats, SizeStats, FileTypeStats,
+    LanguageStats, LineCounts, TimeStats, HygieneStats,
+    MetadataStats, RepoStats, TreeNode,
+)
+
+
+CODE_EXTS = {".py", ".js", ".ts", ".java", ".c", ".cpp", ".rs", ".go"}
+TEMP_EXTS = {".tmp", ".bak", "~"}
+
+LARGE_FILE_SIZE = 5 * 1024 * 1024  # bytes
+SMALL_FILES_COUNT = 5
+# Only the largest of the large files and the first deepest directories
+# are listed, so that memory does not grow with the size of the tree
+LARGE_FILES_COUNT = 100
+DEEPEST_PATHS_COUNT = 100
+
+DAY = 24 * 60 * 60  # seconds
+
+# (size, path, mtime), the minimum needed to build a FileStat later on
+_FileKey = Tuple[int, str, float]
+
+
+def _by_size_desc(key: _FileKey) -> Tuple[int, str]:
+    return -key[0], key[1]
+
+
+def _keep(
+    buffer: list, item, count: int, key: Optional[Callable] = None
+) -> None:
+    """Add ``item`` to a selection of the ``count`` lowest items by ``key``.
+
+    The buffer is trimmed lazily to the best ``count`` once it holds four
+    times as many, so the selection costs amortised O(log count) per item
+    and its size never exceeds ``4 * count``.
+    """
+    buffer.append(item)
+    if len(buffer) >= 4 * count:
+        buffer[:] = heapq.nsmallest(count, buffer, key=key)
+
+
+def _discard(
+    buffer: list, item, count: int, key: Optional[Callable] = None
+) -> bool:
+    """Remove ``item`` from a ``_keep()`` selection.
+
+    Returns True if it was among the selected ``count`` items, in which case
+    the selection can only be completed again from the full data set.
+    """
+    if item not in buffer:
+        return False
+    buffer.sort(key=key)
+    if buffer.index(item) < count:
+        return True
+    buffer.remove(item)
+    return False
+
+
+class PartialStats:
+    """Mergeable aggregation state for part of a repository.
+
+    Every field is either a counter or a bounded selection (smallest and
+    largest files, oldest/newest file, deepest directories) that can be
+    combined with the same fields of another partial, so a repository can
+    be aggregated in shards and the results merged with ``merge()``. Memory
+    use does not depend on the number of files: ages are kept as a per-day
+    histogram and every selection holds at most a few times the number of
+    items it reports. Files are kept as plain ``(size, path, mtime)``
+    tuples and only the handful that end up in the results become
+    ``FileStat`` objects in ``finalize()``.
+
+    Age percentiles are exact. Size percentiles come from a KLL sketch
+    (see ``KLLSketch`` for the error bound) unless ``exact_quantiles`` is
+    set, in which case every distinct size is counted.
+
+    With ``lines`` set, the line counts of code files can be added with
+    ``add_lines()``; they are read separately (see ``LineCounter``), since
+    the scan itself never opens files. With ``sloc`` they can also be
+    broken down into code, comment and blank lines per language with
+    ``add_sloc()``. With ``detect`` the language of each file, as detected
+    from its contents (see ``ContentSniffer``), is added with
+    ``add_language()``.
+
+    Ties in the selections are broken by path, so the merged result does not
+    depend on the order in which shards finish.
+
+    Files and directories can also be taken out again with ``remove_file()``
+    and ``remove_dir()``, which keeps long-lived stats current without a
+    rescan. Counters are updated in place; if a removed item was part of a
+    selection, ``stale`` is set and the selections must be rebuilt with
+    ``reselect()``. Only ``empty_dirs`` is not kept current by removals.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        now: float,
+        exact_quantiles: bool = False,
+        lines: bool = False,
+        sloc: bool = False,
+        detect: bool = False,
+    ):
+        self.root = os.fspath(root)
+        self.now = now
+        self.exact_quantiles = exact_quantiles
+
+        self.total_files = 0
+        self.total_dirs = 0
+        self.total_size = 0
+
+        self.count_by_ext: Dict[str, int] = defaultdict(int)
+        self.size_by_ext: Dict[str, int] = defaultdict(int)
+        # Lines of the code files by extension, if they are counted at all
+        self.lines_by_ext: Optional[Dict[str, int]] = (
+            defaultdict(int) if lines else None
+        )
+        # Language -> [code, comment, blank] lines
+        self.sloc: Optional[Dict[str, List[int]]] = {} if sloc else None
+        # Detected language -> number of files
+        self.files_by_language: Optional[Dict[str, int]] = (
+            defaultdict(int) if detect else None
+        )
+        self.binary_files = 0
+        # Files whose language was only told from their name
+        self.unsniffed_files = 0
+        # Files that could not be read for detection
+        self.unreadable_files = 0
+
+        self.modified_24h = self.modified_7d = self.modified_30d = 0
+        self.empty_files = self.hidden_files = self.temp_files = 0
+        self.large_count = 0
+        # File age in whole days -> number of files
+        self.age_days: Dict[int, int] = defaultdict(int)
+        # File size -> number of files, or a sketch of the sizes
+        self.sizes = defaultdict(int) if exact_quantiles else KLLSketch()
+
+        self.large_files: List[_FileKey] = []
+        self.small_files: List[_FileKey] = []
+        self.oldest: Optional[_FileKey] = None
+        self.newest: Optional[_FileKey] = None
+
+        self.max_depth = 0
+        self.deepest: List[str] = []
+
+        # Only files with several links can be seen twice
+        self.seen_inodes: Set[Tuple[int, int]] = set()
+
+        # Directories nothing was found in yet. Scans list a directory soon
+        # after finding it, so this holds little more than the empty ones.
+        self.unseen_dirs: Set[str] = set()
+        # Tops of shards, whose own entries belong to another partial
+        self.shard_tops: Set[str] = set()
+
+        self.stale = False
+
+    def _depth(self, entry: ScanEntry) -> int:
+        return entry.path[len(self.root) + 1:].count(os.sep) + 1
+
+    def add_dir(self, entry: ScanEntry) -> None:
+        self._found(entry)
+        self.unseen_dirs.add(entry.path)
+        self.total_dirs += 1
+        self._select_dir(entry)
+
+    def add_shard_top(self, path: str) -> None:
+        """Take directory ``path``, counted elsewhere, as the top of this shard.
+
+        It is only counted as empty if nothing is found in it here.
+        """
+        self.shard_tops.add(path)
+        self.unseen_dirs.add(path)
+
+    def _found(self, entry: ScanEntry) -> None:
+        if self.unseen_dirs:
+            self.unseen_dirs.discard(os.path.dirname(entry.path))
+
+    def _select_dir(self, entry: ScanEntry) -> None:
+        d = self._depth(entry)
+        if d > self.max_depth:
+            self.max_depth = d
+            self.deepest = [entry.path]
+        elif d == self.max_depth:
+            _keep(self.deepest, entry.path, DEEPEST_PATHS_COUNT)
+
+    def remove_dir(self, entry: ScanEntry) -> None:
+        self.total_dirs -= 1
+        if self._depth(entry) == self.max_depth:
+            if _discard(self.deepest, entry.path, DEEPEST_PATHS_COUNT):
+                self.stale = True
+
+    def add_file(self, entry: ScanEntry) -> bool:
+        """Count a file; False if it is a link to a file counted already."""
+        self._found(entry)
+        # Check if we've already counted this inode (hard link detection)
+        if entry.nlink != 1:
+            inode = (entry.dev, entry.inode)
+            if inode in self.seen_inodes:
+                return False
+            self.seen_inodes.add(inode)
+
+        self._count_file(entry, 1)
+
+        self._select_file((entry.size, entry.path, entry.mtime))
+        return True
+
+    def add_lines(self, ext: str, lines: int) -> None:
+        """Add the line count of a code file with extension ``ext``."""
+        self.lines_by_ext[ext] += lines
+
+    def add_sloc(self, language: str, code: int, comment: int, blank: int) -> None:
+        """Add the code, comment and blank lines of a file in ``language``."""
+        counts = self.sloc.setdefault(language, [0, 0, 0])
+        counts[0] += code
+        counts[1] += comment
+        counts[2] += blank
+
+    def add_language(
+        self, language: Optional[str], binary: bool = False, sniffed: bool = True
+    ) -> None:
+        """Add the detected ``language`` of a file, None if unknown.
+
+        ``sniffed`` is False if the language was told from the file name, past
+        the detection budget.
+        """
+        if binary:
+            self.binary_files += 1
+        elif language is not None:
+            self.files_by_language[language] += 1
+        if not sniffed:
+            self.unsniffed_files += 1
+
+    def add_unreadable(self) -> None:
+        """Count a file that could not be read for detection."""
+        self.unreadable_files += 1
+
+    def remove_file(self, entry: ScanEntry) -> None:
+        """Take back a file previously passed to ``add_file()``."""
+        if entry.nlink != 1:
+            self.seen_inodes.discard((entry.dev, entry.inode))
+
+        self._count_file(entry, -1)
+
+        key = (entry.size, entry.path, entry.mtime)
+        if (
+            _discard(self.large_files, key, LARGE_FILES_COUNT, _by_size_desc)
+            or _discard(self.small_files, key, SMALL_FILES_COUNT)
+            or key == self.oldest
+            or key == self.newest
+        ):
+            self.stale = True
+
+    def _count_file(self, entry: ScanEntry, n: int) -> None:
+        """Add (``n=1``) or subtract (``n=-1``) a file from the counters."""
+        size = entry.size
+
+        self.total_files += n
+        self.total_size += n * size
+
+        if self.exact_quantiles:
+            self.sizes[size] += n
+            if not self.sizes[size]:
+                del self.sizes[size]
+        elif n > 0:
+            self.sizes.add(size)
+        else:
+            # A sketch cannot forget a value; it is rebuilt by reselect()
+            self.stale = True
+
+        ext = suffix(entry.name).lower() or "<no-ext>"
+        self.count_by_ext[ext] += n
+        self.size_by_ext[ext] += n * size
+        if not self.count_by_ext[ext]:
+            del self.count_by_ext[ext]
+            del self.size_by_ext[ext]
+
+        if size == 0:
+            self.empty_files += n
+
+        if size > LARGE_FILE_SIZE:
+            self.large_count += n
+
+        if entry.name.startswith("."):
+            self.hidden_files += n
+
+        if ext in TEMP_EXTS:
+            self.temp_files += n
+
+        # Files dated in the future (clock skew, or written after ``now`` in
+        # long-lived stats) count as brand new
+        age = max(self.now - entry.mtime, 0.0)
+        days = int(age // DAY)
+        self.age_days[days] += n
+        if not self.age_days[days]:
+            del self.age_days[days]
+        if age <= DAY:
+            self.modified_24h += n
+        if age <= 7 * DAY:
+            self.modified_7d += n
+        if age <= 30 * DAY:
+            self.modified_30d += n
+
+    def _select_file(self, key: _FileKey) -> None:
+        size, path, mtime = key
+        _keep(self.small_files, key, SMALL_FILES_COUNT)
+        if size > LARGE_FILE_SIZE:
+            _keep(self.large_files, key, LARGE_FILES_COUNT, _by_size_desc)
+
+        if self.oldest is None or (mtime, path) < (self.oldest[2], self.oldest[1]):
+            self.oldest = key
+        if self.newest is None or (mtime, path) > (self.newest[2], self.newest[1]):
+            self.newest = key
+
+    def reselect(
+        self, files: Iterable[ScanEntry], dirs: Iterable[ScanEntry]
+    ) -> None:
+        """Rebuild the selections from every file and directory still present."""
+        self.small_files = []
+        self.large_files = []
+        self.oldest = self.newest = None
+        if not self.exact_quantiles:
+            self.sizes = KLLSketch()
+        for entry in files:
+            self._select_file((entry.size, entry.path, entry.mtime))
+            if not self.exact_quantiles:
+                self.sizes.add(entry.size)
+
+        self.max_depth = 0
+        self.deepest = []
+        for entry in dirs:
+            self._select_dir(entry)
+
+        self.stale = False
+
+    def merge(self, other: "PartialStats") -> None:
+        """Fold the aggregates of ``other`` into this partial."""
+        self.total_files += other.total_files
+        self.total_dirs += other.total_dirs
+        self.total_size += other.total_size
+
+        for ext, count in other.count_by_ext.items():
+            self.count_by_ext[ext] += count
+        for ext, size in other.size_by_ext.items():
+            self.size_by_ext[ext] += size
+        if other.lines_by_ext is not None:
+            for ext, lines in other.lines_by_ext.items():
+                self.lines_by_ext[ext] += lines
+        if other.sloc is not None:
+            for language, (code, comment, blank) in other.sloc.items():
+                self.add_sloc(language, code, comment, blank)
+        if other.files_by_language is not None:
+            for language, count in other.files_by_language.items():
+                self.files_by_language[language] += count
+        self.binary_files += other.binary_files
+        self.unsniffed_files += other.unsniffed_files
+        self.unreadable_files += other.unreadable_files
+        self.unseen_dirs -= other.shard_tops
+        self.unseen_dirs |= other.unseen_dirs
+
+        self.modified_24h += other.modified_24h
+        self.modified_7d += other.modified_7d
+        self.modified_30d += other.modified_30d
+        self.empty_files += other.empty_files
+        self.hidden_files += other.hidden_files
+        self.temp_files += other.temp_files
+        self.large_count += other.large_count
+        for days, count in other.age_days.items():
+            self.age_days[days] += count
+        if self.exact_quantiles:
+            for size, count in other.sizes.items():
+                self.sizes[size] += count
+        else:
+            self.sizes.merge(other.sizes)
+
+        for key in other.large_files:
+            _keep(self.large_files, key, LARGE_FILES_COUNT, _by_size_desc)
+        for key in other.small_files:
+            _keep(self.small_files, key, SMALL_FILES_COUNT)
+
+        for key in (other.oldest, other.newest):
+            if key is None:
+                continue
+            if self.oldest is None or (key[2], key[1]) < (self.oldest[2], self.oldest[1]):
+                self.oldest = key
+            if self.newest is None or (key[2], key[1]) > (self.newest[2], self.newest[1]):
+                self.newest = key
+
+        if other.max_depth > self.max_depth:
+            self.max_depth = other.max_depth
+            self.deepest = list(other.deepest)
+        elif other.max_depth == self.max_depth:
+            for path in other.deepest:
+                _keep(self.deepest, path, DEEPEST_PATHS_COUNT)
+
+        self.seen_inodes |= other.seen_inodes
+
+    def structure(self) -> StructureStats:
+        return StructureStats(
+            total_files=self.total_files,
+            total_dirs=self.total_dirs,
+            max_depth=self.max_depth,
+            deepest_paths=[
+                DirStat(Path(d), self.max_depth)
+                for d in heapq.nsmallest(DEEPEST_PATHS_COUNT, self.deepest)
+            ],
+        )
+
+    def size(self) -> SizeStats:
+        return SizeStats(
+            total_size=self.total_size,
+            average_file_size=(
+                self.total_size / self.total_files if self.total_files else 0
+            ),
+            large_files=self._large_file_stats(),
+            small_files=[
+                _file_stat(key)
+                for key in heapq.nsmallest(SMALL_FILES_COUNT, self.small_files)
+            ],
+            large_file_count=self.large_count,
+            file_size_p50=self._size_quantile(0.5),
+            file_size_p90=self._size_quantile(0.9),
+            file_size_p99=self._size_quantile(0.99),
+        )
+
+    def _size_quantile(self, q: float) -> Optional[int]:
+        if self.exact_quantiles:
+            return histogram_quantile(self.sizes, q)
+        return self.sizes.quantile(q)
+
+    def file_types(self) -> FileTypeStats:
+        return FileTypeStats(
+            count_by_extension=dict(self.count_by_ext),
+            size_by_extension=dict(self.size_by_ext),
+            lines_by_extension=(
+                dict(self.lines_by_ext) if self.lines_by_ext is not None else None
+            ),
+        )
+
+    def language(self) -> LanguageStats:
+        counts = self.count_by_ext
+        code_files = sum(counts[e] for e in CODE_EXTS if e in counts)
+        detected = self.files_by_language
+        if detected is not None:
+            primary = max(sorted(detected), key=detected.get, default=None)
+        else:
+            # Without detection, the most common extension stands in
+            primary = max(
+                (e for e in counts if e != "<no-ext>"), key=counts.get, default=None
+            )
+        return LanguageStats(
+            primary_language=primary,
+            code_vs_non_code_ratio=(
+                code_files / self.total_files if self.total_files else None
+            ),
+            total_lines_of_code=(
+                sum(self.lines_by_ext.values())
+                if self.lines_by_ext is not None else None
+            ),
+            lines_by_language=(
+                {
+                    language: LineCounts(*counts)
+                    for language, counts in sorted(self.sloc.items())
+                }
+                if self.sloc is not None else None
+            ),
+            files_by_language=(
+                dict(sorted(detected.items())) if detected is not None else None
+            ),
+            binary_files=self.binary_files if detected is not None else None,
+            unsniffed_files=self.unsniffed_files if detected is not None else None,
+            unreadable_files=self.unreadable_files if detected is not None else None,
+        )
+
+    def time(self) -> TimeStats:
+        return TimeStats(
+            oldest_file=_file_stat(self.oldest) if self.oldest else None,
+            newest_file=_file_stat(self.newest) if self.newest else None,
+            modified_last_24h=self.modified_24h,
+            modified_last_7d=self.modified_7d,
+            modified_last_30d=self.modified_30d,
+            median_file_age_days=_histogram_median(self.age_days),
+            file_age_days_p50=histogram_quantile(self.age_days, 0.5),
+            file_age_days_p90=histogram_quantile(self.age_days, 0.9),
+            file_age_days_p99=histogram_quantile(self.age_days, 0.99),
+        )
+
+    def hygiene(self) -> HygieneStats:
+        return HygieneStats(
+            empty_files=self.empty_files,
+            empty_dirs=len(self.unseen_dirs),
+            large_files=self._large_file_stats(),
+            temp_files=self.temp_files,
+            hidden_files=self.hidden_files,
+        )
+
+    def finalize(
+        self, metadata: MetadataStats, tree: Optional[TreeNode] = None
+    ) -> RepoStats:
+        """Build the RepoStats of the repository this partial covers."""
+        return RepoStats(
+            path=Path(self.root),
+            structure=self.structure(),
+            size=self.size(),
+            file_types=self.file_types(),
+            language=self.language(),
+            time=self.time(),
+            hygiene=self.hygiene(),
+            metadata=metadata,
+            tree=tree,
+        )
+
+    def _large_file_stats(self) -> List[FileStat]:
+        largest = heapq.nsmallest(LARGE_FILES_COUNT, self.large_files, key=_by_size_desc)
+        return [_file_stat(key) for key in sorted(largest, key=lambda k: k[1])]
+
+
+def _histogram_median(histogram: Dict[int, int]) -> Optional[float]:
+    """Median of the values counted in ``histogram``, as statistics.median."""
+    n = sum(histogram.values())
+    if not n:
+        return None
+
+    values = sorted(histogram)
+    # Positions of the middle value(s) in the sorted sequence
+    lo, hi = (n - 1) // 2, n // 2
+    low = high = None
+    seen = 0
+    for value in values:
+        seen += histogram[value]
+        if low is None and seen > lo:
+            low = value
+        if seen > hi:
+            high = value
+            break
+    return low if lo == hi else (low + high) / 2
+
+
+def _file_stat(key: _FileKey) -> FileStat:
+    size, path, mtime = key
+    return FileStat(Path(path), size, mtime)
@@ -0,0 +1,113 @@
+import math
+import random
+from typing import Dict, List, Optional
+
+# Rank error of KLL at k=200: about 1.65% at 99% confidence (the bound
+# published for KLL sketches of this size). Up to roughly k values the
+# sketch is exact.
+DEFAULT_K = 200
+
+# Each level may hold 2/3 as many items as the one above it
+_DECAY = 2 / 3
+
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (Karnin, Lang & Liberty 2016).
+
+    Values are kept in levels; an item on level ``h`` stands for ``2**h``
+    original values. When the sketch is full, the lowest level over its
+    capacity is sorted and every other item (starting at a random offset)
+    is promoted to the next level, halving its size. Memory is about
+    ``3 * k`` values however many are added, and two sketches are combined
+    with ``merge()`` level by level, with the same error bound as if all
+    values had gone into one sketch.
+
+    The random offsets come from a generator with a fixed seed, so the same
+    input in the same order always gives the same answers.
+    """
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.count = 0
+        self._levels: List[list] = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._random = random.Random(k)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(2, math.ceil(self.k * _DECAY ** depth))
+
+    def _grow(self) -> None:
+        self._levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self._levels)))
+
+    def add(self, value) -> None:
+        self._levels[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self) -> None:
+        for h, items in enumerate(self._levels):
+            if len(items) < self._capacity(h):
+                continue
+            if h + 1 == len(self._levels):
+                self._grow()
+            items.sort()
+            # An odd item out stays behind
+            keep = [items.pop()] if len(items) % 2 else []
+            promoted = items[self._random.getrandbits(1)::2]
+            self._levels[h + 1].extend(promoted)
+            self._levels[h] = keep
+            self._size -= len(items) - len(promoted)
+            if self._size < self._max_size:
+                break
+
+    def merge(self, other: "KLLSketch") -> None:
+        """Fold ``other`` into this sketch."""
+        while len(self._levels) < len(other._levels):
+            self._grow()
+        for h, items in enumerate(other._levels):
+            self._levels[h].extend(items)
+        self.count += other.count
+        self._size += other._size
+        while self._size >= self._max_size:
+            self._compress()
+
+    def quantile(self, q: float):
+        """Return the value of rank ``q`` (0-1), or None if empty.
+
+        The rank is approximate once the sketch has compacted; see
+        ``DEFAULT_K`` for the bound.
+        """
+        weighted = sorted(
+            (value, 1 << h)
+            for h, items in enumerate(self._levels)
+            for value in items
+        )
+        return _weighted_quantile(weighted, self.count, q)
+
+
+def histogram_quantile(histogram: Dict[int, int], q: float) -> Optional[int]:
+    """Exact value of rank ``q`` among the values counted in ``histogram``."""
+    n = sum(histogram.values())
+    return _weighted_quantile(sorted(histogram.items()), n, q)
+
+
+def _weighted_quantile(weighted, n: int, q: float):
+    """Nearest-rank quantile of sorted ``(value, weight)`` pairs of total ``n``."""
+    if not n:
+        return None
+    # Smallest value whose cumulative weight reaches ceil(q * n)
+    target = max(1, math.ceil(q * n))
+    seen = 0
+    for value, weight in weighted:
+        seen += weight
+        if seen >= target:
+            return value
+    return weighted[-1][0]
@@ -1,107 +1,97 @@
 import os
+import sys
 from pathlib import Path
-from typing import List, Optional
-from fnmatch import fnmatch
+from typing import Dict, Optional, Set
 from repolyze.models import TreeNode
-from repolyze.core.filesystem.scan import SKIP_DIRS
+from repolyze.core.filesystem.scan import ScanEntry, scan_entries
 
 
-def _load_gitignore(base_path: Path) -> Optional[List[str]]:
-    """Load .gitignore patterns if file exists."""
-    gitignore_path = base_path / ".gitignore"
-    if not gitignore_path.exists():
-        return None
-    
-    try:
-        with open(gitignore_path, 'r', encoding='utf-8') as f:
-            patterns = []
-            for line in f:
-                line = line.strip()
-                # Skip empty lines and comments
-                if line and not line.startswith('#'):
-                    patterns.append(line)
-            return patterns if patterns else None
-    except (OSError, UnicodeDecodeError):
-        return None
+class TreeBuilder:
+    """Assemble a TreeNode hierarchy incrementally from top-down scan results.
 
+    Directories must be added before their contents, which is the order
+    ``scan_entries()`` yields them in. The file count and total size of
+    every directory are kept up to date as entries come in, by adding each
+    file to its ancestors. Entries can be removed again and the tree
+    rebuilt, in which case only directories that changed are re-sorted.
+    """
 
-def _matches_gitignore(rel_path: str, patterns: List[str], is_dir: bool = False) -> bool:
-    """Check if a path matches any gitignore pattern."""
-    if not patterns:
-        return False
-    
-    # Normalize path separators to forward slashes
-    rel_path = rel_path.replace('\\', '/')
-    
-    for pattern in patterns:
-        # Handle negation patterns (starting with !)
-        if pattern.startswith('!'):
-            continue
-        
-        # Remove leading slash for proper matching
-        pattern = pattern.lstrip('/')
-        
-        # Handle directory-only patterns (ending with /)
-        if pattern.endswith('/'):
-            pattern = pattern.rstrip('/')
-            if is_dir and (fnmatch(rel_path, pattern) or fnmatch(rel_path, f"**/{pattern}")):
-                return True
+    def __init__(self, root: Path):
+        self.root = TreeNode(root, 0, 0)
+        self._dirs: Dict[str, TreeNode] = {os.fspath(root): self.root}
+        # Directories whose children have to be sorted again
+        self._dirty: Set[str] = set()
+
+    def add(self, entry: ScanEntry) -> None:
+        parent_path = os.path.dirname(entry.path)
+        parent = self._dirs.get(parent_path)
+        # The parent was skipped (e.g. it vanished mid-walk)
+        if parent is None:
+            return
+        self._dirty.add(parent_path)
+        name = sys.intern(entry.name)
+        if entry.is_dir:
+            node = TreeNode(name, 0, 0)
+            self._dirs[entry.path] = node
         else:
-            # Match both files and directories
-            if fnmatch(rel_path, pattern) or fnmatch(rel_path, f"**/{pattern}"):
-                return True
-            # Check if any parent directory matches
-            parts = rel_path.split('/')
-            for i in range(len(parts)):
-                if fnmatch(parts[i], pattern):
-                    return True
-    
-    return False
+            node = TreeNode(name, 1, entry.size, is_dir=False)
+        parent.add(node)
+        if not entry.is_dir:
+            _roll_up(parent, 1, entry.size)
 
+    def remove(self, path: str) -> None:
+        """Remove the file or directory at ``path``, with everything below it."""
+        parent = self._dirs.get(os.path.dirname(path))
+        if parent is None:
+            return
+        name = os.path.basename(path)
+        for i, child in enumerate(parent.children):
+            if child.name == name:
+                del parent.children[i]
+                break
+        else:
+            return
+        _roll_up(parent, -child.file_count, -child.total_size)
 
-def build_tree(path: Path, root_path: Optional[Path] = None, gitignore_patterns: Optional[List[str]] = None) -> TreeNode:
-    """Build tree structure respecting .gitignore patterns."""
-    # On first call, load gitignore from root
-    if root_path is None:
-        root_path = path
-        gitignore_patterns = _load_gitignore(root_path)
-    
-    node = TreeNode(path, 0, 0)
+        stack = [(child, path)]
+        while stack:
+            node, key = stack.pop()
+            if self._dirs.pop(key, None) is not None:
+                self._dirty.discard(key)
+                stack.extend(
+                    (sub, os.path.join(key, sub.name)) for sub in node.children
+                )
 
-    try:
-        items = sorted(path.iterdir())
-    except (OSError, PermissionError):
-        return node
+    def graft(self, subtree: TreeNode) -> None:
+        """Attach a subtree built separately (e.g. in another process)."""
+        parent_path = os.path.dirname(subtree.name)
+        parent = self._dirs.get(parent_path)
+        if parent is not None:
+            parent.add(subtree)
+            _roll_up(parent, subtree.file_count, subtree.total_size)
+            self._dirty.add(parent_path)
 
-    for p in items:
-        # Skip symlinks
-        if p.is_symlink():
-            continue
-        
-        # Skip directories we're excluding
-        if p.is_dir() and p.name in SKIP_DIRS:
-            continue
-        
-        # Check gitignore patterns
-        if gitignore_patterns:
-            try:
-                rel_path = str(p.relative_to(root_path)).replace('\\', '/')
-                if _matches_gitignore(rel_path, gitignore_patterns, is_dir=p.is_dir()):
-                    continue
-            except ValueError:
-                pass
-        
-        if p.is_dir():
-            child = build_tree(p, root_path, gitignore_patterns)
-            node.children.append(child)
-        else:
-            try:
-                stat = os.stat(p, follow_symlinks=False)
-                node.children.append(
-                    TreeNode(p, 1, stat.st_size, [])
-                )
-            except (OSError, PermissionError):
-                # Skip files we can't access
-                continue
+    def build(self) -> TreeNode:
+        """Sort the children of changed directories by name; return the root."""
+        for key in self._dirty:
+            node = self._dirs.get(key)
+            if node is not None:
+                node.children.sort(key=lambda child: child.name)
+        self._dirty.clear()
+        return self.root
+
+
+def _roll_up(node: Optional[TreeNode], files: int, size: int) -> None:
+    """Add ``files`` and ``size`` to ``node`` and all its ancestors."""
+    while node is not None:
+        node.file_count += files
+        node.total_size += size
+        node = node.parent
 
-    return node
+
+def build_tree(path: Path) -> TreeNode:
+    """Build tree structure respecting .gitignore patterns."""
+    builder = TreeBuilder(path)
+    for entry in scan_entries(path):
+        builder.add(entry)
+    return builder.build()
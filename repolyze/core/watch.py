@@ -0,0 +1,358 @@
+import os
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from repolyze.core.analyze import collect_metadata
+from repolyze.core.filesystem.gitignore import IgnoreRules, root_rules
+from repolyze.core.filesystem.scan import ScanEntry, scan_dir
+from repolyze.core.filesystem.table import FileTable
+from repolyze.core.filesystem.watch import DirectoryWatcher, PollingWatcher, open_watcher
+from repolyze.core.stats.aggregate import PartialStats
+from repolyze.core.tree.build import TreeBuilder
+from repolyze.models import RepoStats
+
+# Counters such as "modified in the last 24h" are relative to the time of
+# the scan; they are recomputed from the index once they are this old
+CLOCK_REFRESH = 60 * 60  # seconds
+
+
+class _Listing:
+    """What the last scan of one directory found."""
+
+    __slots__ = ("rel_root", "rules", "child_rules", "dirs", "files")
+
+    def __init__(
+        self,
+        rel_root: str,
+        rules: IgnoreRules,
+        child_rules: IgnoreRules,
+        dirs: List[ScanEntry],
+        files: array,
+    ):
+        self.rel_root = rel_root
+        # Rules inherited from the parent, to list the directory again
+        self.rules = rules
+        # Rules including the directory's own .gitignore
+        self.child_rules = child_rules
+        self.dirs: Dict[str, ScanEntry] = {e.name: e for e in dirs}
+        # Rows of the files in the watcher's FileTable
+        self.files = files
+
+
+class StatsWatcher:
+    """Keep the RepoStats of a repository current as files change.
+
+    The repository is scanned once, keeping every directory's listing, with
+    the files in a ``FileTable`` so that the index stays compact. From
+    then on the directories reported by a ``DirectoryWatcher`` (inotify on
+    Linux, polling directory mtimes elsewhere) are listed again and only the
+    differences are applied: counters and the tree are updated in place and
+    the top-K selections are rebuilt from memory only when one of their
+    members went away. Bursts of events are coalesced: a batch is applied
+    once no new event arrived for ``debounce`` seconds, or at the latest
+    after ``max_delay``.
+
+    Percentiles are exact, since values have to be taken back out again.
+    Iterating yields a fresh RepoStats after every batch that changed
+    something; ``snapshots()`` yields their ``to_dict()`` instead. The tree
+    is shared between the yielded stats and updated in place.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        debounce: float = 0.2,
+        max_delay: float = 2.0,
+        backend: Union[str, DirectoryWatcher] = "auto",
+        interval: float = 1.0,
+    ):
+        self.path = Path(path).resolve()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._auto = backend == "auto"
+        self._interval = interval
+        self._watcher = (
+            open_watcher(backend, interval) if isinstance(backend, str) else backend
+        )
+        # Incremented by every batch that changed the stats
+        self.version = 0
+        self._listings: Dict[str, _Listing] = {}
+        self._full_scan()
+
+    # ---------- Index ----------
+
+    def _full_scan(self) -> None:
+        for top in self._listings:
+            self._watcher.remove(top)
+
+        self._listings = {}
+        self._table = FileTable()
+        # (dev, inode) -> rows of the links to a multiply linked file; the
+        # first is counted
+        self._links: Dict[Tuple[int, int], List[int]] = {}
+        self._stats = PartialStats(self.path, time.time(), exact_quantiles=True)
+        self._tree = TreeBuilder(self.path)
+        self._walk(os.fspath(self.path), "", root_rules(self.path))
+
+    def _watch(self, top: str) -> None:
+        try:
+            self._watcher.add(top)
+        except OSError:
+            if not self._auto or isinstance(self._watcher, PollingWatcher):
+                raise
+            # Typically out of inotify watches; poll the whole tree instead
+            self._watcher.close()
+            self._watcher = PollingWatcher(self._interval)
+            for path in self._listings:
+                self._watcher.add(path)
+
+    def _walk(self, top: str, rel_root: str, rules: IgnoreRules) -> None:
+        """Index, count and watch the directory ``top`` and everything below."""
+        stack = [(top, rel_root, rules)]
+        while stack:
+            top, rel_root, rules = stack.pop()
+            # Watch before listing, so nothing created in between is missed
+            self._watch(top)
+            dirs, files, child_rules = scan_dir(top, rel_root, rules)
+
+            for entry in dirs:
+                self._add_dir(entry)
+            rows = array("I", [self._add_file(entry) for entry in files])
+            self._listings[top] = _Listing(rel_root, rules, child_rules, dirs, rows)
+            for entry in reversed(dirs):
+                rel_dir = f"{rel_root}/{entry.name}" if rel_root else entry.name
+                stack.append((entry.path, rel_dir, child_rules))
+
+    def _drop(self, entry: ScanEntry) -> None:
+        """Forget directory ``entry`` and everything below it."""
+        self._tree.remove(entry.path)
+        self._stats.remove_dir(entry)
+        stack = [entry.path]
+        while stack:
+            top = stack.pop()
+            listing = self._listings.pop(top, None)
+            self._watcher.remove(top)
+            if listing is None:
+                continue
+            for sub in listing.dirs.values():
+                self._stats.remove_dir(sub)
+                stack.append(sub.path)
+            for row in listing.files:
+                self._forget_file(row, self._table.entry(row))
+
+    def _add_dir(self, entry: ScanEntry) -> None:
+        self._tree.add(entry)
+        self._stats.add_dir(entry)
+
+    def _add_file(self, entry: ScanEntry) -> int:
+        """Index and count file ``entry``; return its row in the table."""
+        self._tree.add(entry)
+        row = self._table.add(entry)
+        self._count_file(row, entry)
+        return row
+
+    def _remove_file(self, row: int) -> None:
+        entry = self._table.entry(row)
+        self._tree.remove(entry.path)
+        self._forget_file(row, entry)
+
+    def _forget_file(self, row: int, entry: ScanEntry) -> None:
+        self._count_file(row, entry, remove=True)
+        self._table.remove(row)
+
+    def _count_file(self, row: int, entry: ScanEntry, remove: bool = False) -> None:
+        if entry.nlink == 1:
+            if remove:
+                self._stats.remove_file(entry)
+            else:
+                self._stats.add_file(entry)
+            return
+
+        # Count each inode once, through whichever of its links came first
+        key = (entry.dev, entry.inode)
+        links = self._links.setdefault(key, [])
+        if not remove:
+            links.append(row)
+            if len(links) == 1:
+                self._stats.add_file(entry)
+            return
+
+        i = links.index(row)
+        del links[i]
+        if i == 0:
+            self._stats.remove_file(entry)
+            if links:
+                self._stats.add_file(self._table.entry(links[0]))
+        if not links:
+            del self._links[key]
+
+    # ---------- Updates ----------
+
+    def apply(self, changed: Optional[Set[str]]) -> bool:
+        """List the ``changed`` directories again and apply the differences.
+
+        None rescans the whole repository. Returns True if anything changed.
+        """
+        if changed is None:
+            self._full_scan()
+            self.version += 1
+            return True
+
+        updated = False
+        # Parents first, so that a removed directory is not listed in vain
+        for top in sorted(changed, key=lambda p: p.count(os.sep)):
+            listing = self._listings.get(top)
+            if listing is not None:
+                updated |= self._rescan(top, listing)
+
+        if self._stats.stale:
+            self._reselect()
+        if updated:
+            self.version += 1
+        return updated
+
+    def _rescan(self, top: str, listing: _Listing) -> bool:
+        """List ``top`` again and apply what changed; False if nothing did."""
+        dirs, files, child_rules = scan_dir(top, listing.rel_root, listing.rules)
+
+        if child_rules.digest != listing.child_rules.digest:
+            # The directory's own .gitignore changed, which can affect
+            # anything below it: index the whole subtree again
+            for entry in listing.dirs.values():
+                self._drop(entry)
+            for row in listing.files:
+                self._remove_file(row)
+            del self._listings[top]
+            self._watcher.remove(top)
+            self._walk(top, listing.rel_root, listing.rules)
+            return True
+
+        new_dirs = {e.name: e for e in dirs}
+        changed = False
+
+        rows = array("I")
+        new_files = {e.name: e for e in files}
+        for row in listing.files:
+            new = new_files.pop(self._table.name[row], None)
+            if new is not None and self._table.matches(row, new):
+                rows.append(row)
+            else:
+                if new is not None:
+                    # Added back below, once all changed files are out
+                    new_files[new.name] = new
+                self._remove_file(row)
+                changed = True
+        for new in new_files.values():
+            rows.append(self._add_file(new))
+            changed = True
+
+        added = []
+        for name, old in listing.dirs.items():
+            # A different inode under the same name is a replaced directory
+            if new_dirs.get(name) != old:
+                self._drop(old)
+                changed = True
+        for name, new in new_dirs.items():
+            if listing.dirs.get(name) != new:
+                self._add_dir(new)
+                added.append(new)
+                changed = True
+
+        listing.dirs = new_dirs
+        listing.files = rows
+        for entry in added:
+            rel_dir = (
+                f"{listing.rel_root}/{entry.name}" if listing.rel_root else entry.name
+            )
+            self._walk(entry.path, rel_dir, child_rules)
+
+        return changed
+
+    def _counted_files(self) -> Iterator[ScanEntry]:
+        table = self._table
+        for row in table:
+            if table.nlink[row] == 1:
+                yield table.entry(row)
+            elif self._links[table.dev[row], table.inode[row]][0] == row:
+                yield table.entry(row)
+
+    def _all_dirs(self) -> Iterator[ScanEntry]:
+        for listing in self._listings.values():
+            yield from listing.dirs.values()
+
+    def _reselect(self) -> None:
+        self._stats.reselect(self._counted_files(), self._all_dirs())
+
+    def _recount(self) -> None:
+        """Rebuild the aggregates from the index, relative to the current time."""
+        stats = PartialStats(self.path, time.time(), exact_quantiles=True)
+        for entry in self._all_dirs():
+            stats.add_dir(entry)
+        for entry in self._counted_files():
+            stats.add_file(entry)
+        self._stats = stats
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for changes and apply them.
+
+        Returns False if nothing was reported within ``timeout`` seconds, or
+        if the reported changes left the stats as they were.
+        """
+        changed = self._watcher.poll(timeout)
+        if changed is not None and not changed:
+            return False
+
+        # Keep collecting until the burst is over
+        deadline = time.monotonic() + self.max_delay
+        while changed is None or changed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            more = self._watcher.poll(min(self.debounce, remaining))
+            if more is None:
+                changed = None
+            elif not more:
+                break
+            elif changed is not None:
+                changed |= more
+
+        return self.apply(changed)
+
+    # ---------- Results ----------
+
+    @property
+    def stats(self) -> RepoStats:
+        """The current stats of the repository."""
+        if time.time() - self._stats.now > CLOCK_REFRESH:
+            self._recount()
+        stats = self._stats.finalize(collect_metadata(self.path), self._tree.build())
+        # Removals are not reflected in PartialStats.empty_dirs
+        root = os.fspath(self.path)
+        stats.hygiene.empty_dirs = sum(
+            1 for top, listing in self._listings.items()
+            if top != root and not listing.dirs and not listing.files
+        )
+        return stats
+
+    def __iter__(self) -> Iterator[RepoStats]:
+        """Yield the current stats, then new stats after every change."""
+        yield self.stats
+        while True:
+            if self.wait():
+                yield self.stats
+
+    def snapshots(self) -> Iterator[Dict]:
+        """Like iterating, but yield ``to_dict()`` snapshots."""
+        for stats in self:
+            yield stats.to_dict()
+
+    def close(self) -> None:
+        self._watcher.close()
+
+    def __enter__(self) -> "StatsWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
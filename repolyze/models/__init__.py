@@ -2,26 +2,44 @@ from .repo import (
     RepoStats,
     FileStat,
     DirStat,
+    DuplicateGroup,
     StructureStats,
     SizeStats,
     FileTypeStats,
     LanguageStats,
+    LineCounts,
     TimeStats,
     HygieneStats,
     MetadataStats,
+    PhaseTime,
+    ProfileStats,
     TreeNode,
 )
+from .snapshot import Snapshot, SnapshotError
+from .diff import CountDelta, ExtensionDelta, PathChange, RepoDiff
+from .batch import BatchRollup
 
 __all__ = [
     "RepoStats",
     "FileStat",
     "DirStat",
+    "DuplicateGroup",
     "StructureStats",
     "SizeStats",
     "FileTypeStats",
     "LanguageStats",
+    "LineCounts",
     "TimeStats",
     "HygieneStats",
     "MetadataStats",
+    "PhaseTime",
+    "ProfileStats",
     "TreeNode",
+    "Snapshot",
+    "SnapshotError",
+    "PathChange",
+    "CountDelta",
+    "ExtensionDelta",
+    "RepoDiff",
+    "BatchRollup",
 ]
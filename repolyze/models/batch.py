@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+from typing import Dict
+
+from repolyze.models.repo import RepoStats
+
+
+@dataclass
+class BatchRollup:
+    """Totals across the repositories of a batch, see ``analyze_many()``."""
+
+    repositories: int = 0
+    # Repositories that could not be analyzed, not counted in the totals
+    failed: int = 0
+    total_files: int = 0
+    total_dirs: int = 0
+    total_size: int = 0  # bytes
+    count_by_extension: Dict[str, int] = field(default_factory=dict)
+    size_by_extension: Dict[str, int] = field(default_factory=dict)
+    # Repositories by primary language, if they have one
+    repositories_by_language: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, stats: RepoStats) -> None:
+        self.repositories += 1
+        self.total_files += stats.structure.total_files
+        self.total_dirs += stats.structure.total_dirs
+        self.total_size += stats.size.total_size
+        for ext, count in stats.file_types.count_by_extension.items():
+            self.count_by_extension[ext] = self.count_by_extension.get(ext, 0) + count
+        for ext, size in stats.file_types.size_by_extension.items():
+            self.size_by_extension[ext] = self.size_by_extension.get(ext, 0) + size
+        language = stats.language.primary_language
+        if language is not None:
+            by_language = self.repositories_by_language
+            by_language[language] = by_language.get(language, 0) + 1
+
+    def to_dict(self) -> Dict:
+        """
+        Convert the roll-up to a JSON-serializable dictionary, the extensions
+        and languages most common first.
+        """
+        result = RepoStats._dataclass_to_dict(self)
+        for name in ("count_by_extension", "size_by_extension", "repositories_by_language"):
+            counts = getattr(self, name)
+            result[name] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+        return result
@@ -0,0 +1,69 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from repolyze.models.repo import RepoStats
+
+
+@dataclass(frozen=True)
+class PathChange:
+    path: Path  # relative to the repository
+    is_dir: bool
+    old_size: Optional[int]  # bytes; None if added
+    new_size: Optional[int]  # bytes; None if removed
+
+    @property
+    def delta(self) -> int:
+        return (self.new_size or 0) - (self.old_size or 0)
+
+
+@dataclass
+class CountDelta:
+    old: Optional[int] = None
+    new: Optional[int] = None
+
+
+@dataclass
+class ExtensionDelta:
+    files: int = 0
+    size: int = 0  # bytes
+
+
+@dataclass
+class RepoDiff:
+    old_path: Path
+    new_path: Path
+    # False if either snapshot was saved without its tree; the file and
+    # directory fields are then left empty
+    compared_files: bool = True
+
+    added_files: int = 0
+    added_bytes: int = 0
+    removed_files: int = 0
+    removed_bytes: int = 0
+    grown_files: int = 0
+    grown_bytes: int = 0  # by which the grown files grew
+    shrunk_files: int = 0
+    shrunk_bytes: int = 0  # by which the shrunk files shrank
+
+    # The files with the largest changes, at most DIFF_LIST_COUNT each
+    largest_added: List[PathChange] = field(default_factory=list)
+    largest_removed: List[PathChange] = field(default_factory=list)
+    most_grown: List[PathChange] = field(default_factory=list)
+    # The directories whose total size changed the most, either way
+    dir_deltas: List[PathChange] = field(default_factory=list)
+
+    # New minus old, for the extensions whose count or size changed
+    extension_deltas: Dict[str, ExtensionDelta] = field(default_factory=dict)
+    # The hygiene counters that changed, of those both analyses have
+    hygiene_changes: Dict[str, CountDelta] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        """
+        Convert the diff to a JSON-serializable dictionary.
+        """
+        result = RepoStats._dataclass_to_dict(self)
+        for name in ("largest_added", "largest_removed", "most_grown", "dir_deltas"):
+            for change, item in zip(getattr(self, name), result[name]):
+                item["delta"] = change.delta
+        return result
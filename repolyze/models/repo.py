@@ -1,6 +1,9 @@
+import heapq
+import os
+from array import array
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Union
 from datetime import datetime
 
 
@@ -14,6 +17,14 @@ class FileStat:
     lines: Optional[int] = None  # line count if applicable
 
 
+@dataclass
+class DuplicateGroup:
+    size: int  # bytes, of each copy
+    paths: List[Path] = field(default_factory=list)
+    # Bytes taken by the copies beyond the first
+    wasted_bytes: int = 0
+
+
 @dataclass(frozen=True)
 class DirStat:
     path: Path
@@ -36,12 +47,27 @@ class SizeStats:
     average_file_size: float = 0.0
     large_files: List[FileStat] = field(default_factory=list)
     small_files: List[FileStat] = field(default_factory=list)
+    # All large files, of which at most LARGE_FILES_COUNT are listed
+    large_file_count: int = 0
+    # Percentiles, approximate unless computed with exact_quantiles
+    file_size_p50: Optional[int] = None
+    file_size_p90: Optional[int] = None
+    file_size_p99: Optional[int] = None
 
 
 @dataclass
 class FileTypeStats:
     count_by_extension: Dict[str, int] = field(default_factory=dict)
     size_by_extension: Dict[str, int] = field(default_factory=dict)
+    # Lines of the code files, if lines were counted
+    lines_by_extension: Optional[Dict[str, int]] = None
+
+
+@dataclass
+class LineCounts:
+    code: int = 0
+    comment: int = 0
+    blank: int = 0
 
 
 @dataclass
@@ -49,6 +75,15 @@ class LanguageStats:
     primary_language: Optional[str] = None
     code_vs_non_code_ratio: Optional[float] = None
     total_lines_of_code: Optional[int] = None
+    # Code, comment and blank lines by language, if they were counted
+    lines_by_language: Optional[Dict[str, LineCounts]] = None
+    # Files by language detected from their contents, if detection ran
+    files_by_language: Optional[Dict[str, int]] = None
+    binary_files: Optional[int] = None
+    # Files past the detection budget, told apart by extension only
+    unsniffed_files: Optional[int] = None
+    # Files that could not be read for detection, e.g. deleted since the scan
+    unreadable_files: Optional[int] = None
 
 
 @dataclass
@@ -59,6 +94,10 @@ class TimeStats:
     modified_last_7d: int = 0
     modified_last_30d: int = 0
     median_file_age_days: Optional[float] = None
+    # Percentiles of the age in whole days
+    file_age_days_p50: Optional[int] = None
+    file_age_days_p90: Optional[int] = None
+    file_age_days_p99: Optional[int] = None
 
 
 @dataclass
@@ -68,6 +107,11 @@ class HygieneStats:
     large_files: List[FileStat] = field(default_factory=list)
     temp_files: int = 0
     hidden_files: int = 0
+    # Identical files, if duplicates were searched for; the groups wasting
+    # the most bytes are listed
+    duplicate_groups: Optional[List[DuplicateGroup]] = None
+    duplicate_group_count: Optional[int] = None
+    wasted_bytes: Optional[int] = None
 
 
 @dataclass
@@ -80,11 +124,158 @@ class MetadataStats:
 
 
 @dataclass
+class PhaseTime:
+    wall: float = 0.0  # seconds
+    cpu: float = 0.0  # seconds, of the threads that ran the phase
+
+
+@dataclass
+class ProfileStats:
+    # Time by phase, see PHASES in repolyze.core.profile
+    phases: Dict[str, PhaseTime] = field(default_factory=dict)
+    # Of the whole analysis, from start to finish
+    total: PhaseTime = field(default_factory=PhaseTime)
+    # Directories listed, not served from the scan cache
+    dirs_visited: int = 0
+    # Entries left out of the walk by SKIP_DIRS and by ignore rules
+    pruned_skip_dirs: int = 0
+    pruned_gitignore: int = 0
+    stat_calls: int = 0
+
+
 class TreeNode:
-    path: Path
-    file_count: int
-    total_size: int
-    children: List["TreeNode"] = field(default_factory=list)
+    """A file or directory of the repository tree.
+
+    A node stores its name and a link to its parent rather than its full
+    path, which ``path`` rebuilds; the root's name is the full path. For a
+    directory, ``file_count`` and ``total_size`` are the totals of its whole
+    subtree. Files are made with ``is_dir=False``; their children are an
+    empty tuple.
+
+    Nodes can be created from a full path; ``add()`` and the ``children``
+    argument attach them, keeping only the last component as their name.
+
+    A node pickles as flat columns of its subtree, in preorder, so that
+    trees deeper than the recursion limit can be sent between processes;
+    the link to its parent is not kept.
+    """
+
+    __slots__ = ("name", "parent", "file_count", "total_size", "children", "is_dir")
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        file_count: int = 0,
+        total_size: int = 0,
+        children: Optional[Sequence["TreeNode"]] = None,
+        is_dir: bool = True,
+    ):
+        self.name = os.fspath(path)
+        self.parent: Optional[TreeNode] = None
+        self.file_count = file_count
+        self.total_size = total_size
+        self.is_dir = is_dir
+        if children is None:
+            children = [] if is_dir else ()
+        self.children = children
+        for child in self.children:
+            child._attach(self)
+
+    def _attach(self, parent: "TreeNode") -> None:
+        self.parent = parent
+        self.name = os.path.basename(self.name) or self.name
+
+    def add(self, child: "TreeNode") -> None:
+        """Attach ``child`` below this directory."""
+        child._attach(self)
+        self.children.append(child)
+
+    @property
+    def path(self) -> Path:
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return Path(*reversed(names))
+
+    def walk(self) -> Iterator["TreeNode"]:
+        """Yield this node and all nodes below it, parents before children."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def heaviest_subtrees(self, n: int) -> List["TreeNode"]:
+        """The ``n`` directories below this one with the largest total size."""
+        dirs = (
+            node for node in self.walk() if node is not self and node.is_dir
+        )
+        return heapq.nlargest(n, dirs, key=lambda node: node.total_size)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TreeNode):
+            return NotImplemented
+        stack = [(self, other)]
+        while stack:
+            a, b = stack.pop()
+            if (
+                a.name != b.name
+                or a.file_count != b.file_count
+                or a.total_size != b.total_size
+                or a.is_dir != b.is_dir
+                or len(a.children) != len(b.children)
+            ):
+                return False
+            stack.extend(zip(a.children, b.children))
+        return True
+
+    __hash__ = None
+
+    def __reduce__(self):
+        names: List[str] = []
+        file_counts, total_sizes, child_counts = array("q"), array("q"), array("q")
+        kinds = bytearray()
+        for node in self.walk():
+            names.append(node.name)
+            file_counts.append(node.file_count)
+            total_sizes.append(node.total_size)
+            child_counts.append(len(node.children))
+            kinds.append(node.is_dir)
+        return _tree_from_columns, (
+            names, file_counts, total_sizes, child_counts, bytes(kinds),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"TreeNode(path={self.path!r}, file_count={self.file_count}, "
+            f"total_size={self.total_size}, children={len(self.children)})"
+        )
+
+
+def _tree_from_columns(
+    names: List[str],
+    file_counts: array,
+    total_sizes: array,
+    child_counts: array,
+    kinds: bytes,
+) -> TreeNode:
+    """Rebuild the tree pickled by ``TreeNode.__reduce__()``."""
+    root = TreeNode(names[0], file_counts[0], total_sizes[0], is_dir=bool(kinds[0]))
+    # The directories whose children are being read, with how many are left
+    stack = [[root, child_counts[0]]] if child_counts[0] else []
+    for i in range(1, len(names)):
+        node = TreeNode(names[i], file_counts[i], total_sizes[i], is_dir=bool(kinds[i]))
+        top = stack[-1]
+        node.parent = top[0]
+        top[0].children.append(node)
+        top[1] -= 1
+        if not top[1]:
+            stack.pop()
+        if child_counts[i]:
+            stack.append([node, child_counts[i]])
+    return root
 
 
 # ---------- Root model ----------
@@ -103,12 +294,18 @@ class RepoStats:
     tree: Optional[TreeNode] = None
 
     created_at: datetime = field(default_factory=datetime.utcnow)
+    # Timings and counters, if the analysis was profiled
+    profile: Optional[ProfileStats] = None
 
-    def to_dict(self) -> Dict:
+    def to_dict(self, tree: bool = True) -> Dict:
         """
         Convert stats to a JSON-serializable dictionary.
+
+        With ``tree=False`` the "tree" entry is None, for callers that
+        serialise the tree themselves. The "profile" entry comes last and
+        only if the analysis was profiled.
         """
-        return {
+        result = {
             "path": str(self.path),
             "structure": self._dataclass_to_dict(self.structure),
             "size": self._dataclass_to_dict(self.size),
@@ -117,9 +314,39 @@ class RepoStats:
             "time": self._dataclass_to_dict(self.time),
             "hygiene": self._dataclass_to_dict(self.hygiene),
             "metadata": self._dataclass_to_dict(self.metadata),
-            "tree": self._tree_to_dict(self.tree),
+            "tree": self._tree_to_dict(self.tree) if tree else None,
             "created_at": self.created_at.isoformat(),
         }
+        if self.profile is not None:
+            result["profile"] = self._dataclass_to_dict(self.profile)
+        return result
+
+    def save(self, path: Union[str, Path], compression: str = "zlib") -> None:
+        """
+        Save the stats to ``path`` in the binary snapshot format.
+
+        Paths are stored once in a string table and the tree as packed
+        numeric columns (see ``Snapshot``). ``compression`` is "none", "zlib"
+        or "lzma"; each section is compressed separately. The file is
+        replaced atomically.
+        """
+        from repolyze.models.snapshot import save
+
+        save(self, path, compression)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], tree: bool = True) -> "RepoStats":
+        """
+        Load stats saved with ``save()``.
+
+        The file is memory-mapped and only the sections needed are decoded:
+        with ``tree=False`` the tree is skipped and ``tree`` is None. Raises
+        SnapshotError for files that are not valid snapshots.
+        """
+        from repolyze.models.snapshot import Snapshot
+
+        with Snapshot(path) as snapshot:
+            return snapshot.stats(tree)
 
     @staticmethod
     def _dataclass_to_dict(obj):
@@ -129,6 +356,8 @@ class RepoStats:
             return str(obj)
         if isinstance(obj, list):
             return [RepoStats._dataclass_to_dict(i) for i in obj]
+        if isinstance(obj, dict):
+            return {k: RepoStats._dataclass_to_dict(v) for k, v in obj.items()}
         if hasattr(obj, "__dict__"):
             return {
                 k: RepoStats._dataclass_to_dict(v)
@@ -140,11 +369,26 @@ class RepoStats:
     def _tree_to_dict(node: Optional[TreeNode]) -> Optional[Dict]:
         if node is None:
             return None
-        return {
-            "path": str(node.path),
-            "file_count": node.file_count,
-            "total_size": node.total_size,
-            "children": [
-                RepoStats._tree_to_dict(child) for child in node.children
-            ],
-        }
+
+        def to_dict(node: TreeNode, path: str) -> Dict:
+            return {
+                "path": path,
+                "file_count": node.file_count,
+                "total_size": node.total_size,
+                "children": [],
+            }
+
+        root = to_dict(node, str(node.path))
+        # With an explicit stack, so that deep trees do not hit the recursion
+        # limit; paths are passed down rather than rebuilt from the parent
+        # links of every node
+        stack = [(node, root)]
+        while stack:
+            node, result = stack.pop()
+            children = result["children"]
+            for child in node.children:
+                child_result = to_dict(child, os.path.join(result["path"], child.name))
+                children.append(child_result)
+                if child.children:
+                    stack.append((child, child_result))
+        return root
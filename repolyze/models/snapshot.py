@@ -0,0 +1,323 @@
+import dataclasses
+import json
+import lzma
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import (
+    Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union, get_type_hints,
+)
+
+from repolyze.models.repo import RepoStats, TreeNode
+
+MAGIC = b"RPLZSNAP"
+# Bump whenever the layout of a section changes
+VERSION = 1
+# Indexed by the compression code of a section
+COMPRESSIONS = ("none", "zlib", "lzma")
+
+# magic, format version, section count; all little-endian
+_HEADER = struct.Struct("<8sHH")
+# Then per section: name, compression, offset, length, crc32 of the stored data
+_SECTION = struct.Struct("<4sBQQI")
+
+# The tree is stored in preorder, children sorted by name, as a string table
+# (NAME, the distinct names joined by NUL) and one column per node field:
+# section name, attribute of TreeNodeRecord, array typecode
+_COLUMNS = (
+    (b"DPTH", "depth", "I"),
+    (b"NMID", "name", "I"),
+    (b"KIND", "is_dir", "B"),
+    (b"FCNT", "file_count", "q"),
+    (b"TSIZ", "total_size", "q"),
+)
+
+
+class SnapshotError(ValueError):
+    """A file is not a snapshot this version of repolyze can read."""
+
+
+class TreeColumns(NamedTuple):
+    """The tree of a snapshot as stored: the string table and the columns."""
+
+    names: List[str]
+    depth: array
+    name: array  # indexes into names
+    is_dir: array
+    file_count: array
+    total_size: array
+
+
+class TreeNodeRecord(NamedTuple):
+    """A tree node as stored in a snapshot, in preorder."""
+
+    depth: int
+    name: str
+    is_dir: bool
+    file_count: int
+    total_size: int
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(data, 6)
+    if compression == "lzma":
+        return lzma.compress(data)
+    return data
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == 1:
+        return zlib.decompress(data)
+    if codec == 2:
+        return lzma.decompress(data)
+    return data
+
+
+def _pack(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def _tree_sections(root: TreeNode) -> Dict[bytes, bytes]:
+    names: Dict[str, int] = {}
+    columns = {attr: array(typecode) for _, attr, typecode in _COLUMNS}
+    depths, name_ids, kinds = columns["depth"], columns["name"], columns["is_dir"]
+    file_counts, total_sizes = columns["file_count"], columns["total_size"]
+
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        name_id = names.get(node.name)
+        if name_id is None:
+            name_id = names[node.name] = len(names)
+        depths.append(depth)
+        name_ids.append(name_id)
+        file_counts.append(node.file_count)
+        total_sizes.append(node.total_size)
+        if node.is_dir:
+            kinds.append(1)
+            children = sorted(node.children, key=lambda child: child.name, reverse=True)
+            stack.extend((child, depth + 1) for child in children)
+        else:
+            kinds.append(0)
+
+    sections = {b"NAME": "\0".join(names).encode("utf-8", "surrogateescape")}
+    for section, attr, _ in _COLUMNS:
+        sections[section] = _pack(columns[attr])
+    return sections
+
+
+def save(stats: RepoStats, path: Union[str, Path], compression: str = "zlib") -> None:
+    """Write ``stats`` to ``path`` as a snapshot; see ``RepoStats.save()``."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"unknown compression: {compression!r}")
+    codec = COMPRESSIONS.index(compression)
+
+    data = stats.to_dict(tree=False)
+    del data["tree"]
+    sections = {b"AGGR": json.dumps(data, separators=(",", ":")).encode()}
+    if stats.tree is not None:
+        sections.update(_tree_sections(stats.tree))
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    table, payloads = [], []
+    for name, raw in sections.items():
+        payload = _compress(raw, compression)
+        table.append(_SECTION.pack(name, codec, offset, len(payload), zlib.crc32(payload)))
+        payloads.append(payload)
+        offset += len(payload)
+
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+            f.writelines(table)
+            f.writelines(payloads)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _decode(hint: Any, value: Any) -> Any:
+    """Convert ``value`` from ``to_dict()`` back to type ``hint``."""
+    if value is None:
+        return None
+    origin = getattr(hint, "__origin__", None)
+    if origin is Union:
+        # Optional[X]
+        hint = next(arg for arg in hint.__args__ if arg is not type(None))
+        return _decode(hint, value)
+    if origin is list:
+        (item,) = hint.__args__
+        return [_decode(item, v) for v in value]
+    if origin is dict:
+        _, item = hint.__args__
+        return {k: _decode(item, v) for k, v in value.items()}
+    if hint is Path:
+        return Path(value)
+    if hint is datetime:
+        return datetime.fromisoformat(value)
+    if hint is float:
+        return float(value)
+    if dataclasses.is_dataclass(hint):
+        hints = get_type_hints(hint)
+        # Fields missing from older snapshots keep their defaults
+        return hint(**{
+            f.name: _decode(hints[f.name], value[f.name])
+            for f in dataclasses.fields(hint)
+            if f.name in value
+        })
+    return value
+
+
+class Snapshot:
+    """A snapshot file, mapped into memory and decoded section by section.
+
+    A snapshot is a header, a table of sections and the sections: AGGR, the
+    aggregates as the JSON of ``RepoStats.to_dict()`` without the tree, and
+    unless the tree was left out, the string table and tree columns. Each
+    section is compressed on its own, so reading one never decompresses
+    another.
+
+    Only the header is read on opening; ``stats()`` decodes the aggregates,
+    and the tree only if asked, and ``nodes()`` streams the tree without
+    building TreeNodes. Raises SnapshotError for files that are not
+    snapshots, are of another version or are corrupt.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"{self.path} is empty") from None
+        try:
+            self._sections = self._read_table()
+        except BaseException:
+            self._map.close()
+            raise
+
+    def _read_table(self) -> Dict[bytes, Tuple[int, int, int, int]]:
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise SnapshotError(f"{self.path} is not a repolyze snapshot")
+        try:
+            _, version, count = _HEADER.unpack_from(self._map)
+            if version != VERSION:
+                raise SnapshotError(
+                    f"{self.path} is a version {version} snapshot, not {VERSION}"
+                )
+            sections = {}
+            for i in range(count):
+                name, *entry = _SECTION.unpack_from(
+                    self._map, _HEADER.size + i * _SECTION.size
+                )
+                sections[name] = tuple(entry)
+        except struct.error:
+            raise SnapshotError(f"{self.path} is truncated") from None
+        return sections
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def has_tree(self) -> bool:
+        return b"NAME" in self._sections
+
+    def _section(self, name: bytes) -> bytes:
+        if name not in self._sections:
+            raise SnapshotError(f"{self.path}: section {name.decode()} is missing")
+        codec, offset, length, crc = self._sections[name]
+        data = self._map[offset:offset + length]
+        if len(data) != length or zlib.crc32(data) != crc:
+            raise SnapshotError(f"{self.path}: section {name.decode()} is corrupt")
+        try:
+            return _decompress(data, codec)
+        except (zlib.error, lzma.LZMAError):
+            raise SnapshotError(
+                f"{self.path}: section {name.decode()} is corrupt"
+            ) from None
+
+    def columns(self) -> Optional[TreeColumns]:
+        """Decode the tree as columns, or None if none was saved.
+
+        Much cheaper than ``tree()`` and ``nodes()`` for callers that go
+        through the nodes by index.
+        """
+        if not self.has_tree:
+            return None
+        names = self._section(b"NAME").decode("utf-8", "surrogateescape").split("\0")
+        return TreeColumns(names, *(
+            _unpack(typecode, self._section(section))
+            for section, _, typecode in _COLUMNS
+        ))
+
+    def nodes(self) -> Iterator[TreeNodeRecord]:
+        """Yield the nodes of the tree in preorder, children sorted by name."""
+        if not self.has_tree:
+            return
+        names, depths, name_ids, kinds, file_counts, total_sizes = self.columns()
+        for i in range(len(depths)):
+            yield TreeNodeRecord(
+                depths[i], names[name_ids[i]], kinds[i] == 1, file_counts[i],
+                total_sizes[i],
+            )
+
+    def tree(self) -> Optional[TreeNode]:
+        """Rebuild the TreeNode tree, or None if none was saved."""
+        if not self.has_tree:
+            return None
+        names, depths, name_ids, kinds, file_counts, total_sizes = self.columns()
+        root = TreeNode(names[name_ids[0]], file_counts[0], total_sizes[0])
+        # The directories from the root to the current node
+        stack = [root]
+        for i in range(1, len(depths)):
+            del stack[depths[i]:]
+            node = TreeNode(
+                names[name_ids[i]], file_counts[i], total_sizes[i],
+                is_dir=kinds[i] == 1,
+            )
+            node.parent = stack[-1]
+            stack[-1].children.append(node)
+            if kinds[i]:
+                stack.append(node)
+        return root
+
+    def stats(self, tree: bool = True) -> RepoStats:
+        """Decode the RepoStats; with ``tree=False`` its ``tree`` is None."""
+        aggregates = self._section(b"AGGR")
+        try:
+            data = json.loads(aggregates)
+        except ValueError:
+            raise SnapshotError(f"{self.path}: section AGGR is corrupt") from None
+        stats = _decode(RepoStats, data)
+        if tree:
+            stats.tree = self.tree()
+        return stats
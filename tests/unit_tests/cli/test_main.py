@@ -1,8 +1,12 @@
 """Tests for repolyze.cli.main module."""
 
 
+import io
+import json
 from unittest.mock import patch, MagicMock
 
+import pytest
+
 from repolyze.cli.main import parse_args, main
 
 
@@ -13,6 +17,18 @@ def test_parse_args_default():
         
         assert args.path == "."
         assert args.json is False
+        assert args.workers == 1
+        assert args.processes == 1
+        assert args.cache_dir is None
+        assert args.watch is False
+        assert args.source == "walk"
+        assert args.verify_index is False
+        assert args.exact_quantiles is False
+        assert args.lines is False
+        assert args.sloc is False
+        assert args.detect is False
+        assert args.detect_budget == 256
+        assert args.duplicates is False
 
 
 def test_parse_args_with_path():
@@ -40,6 +56,69 @@ def test_parse_args_with_path_and_json():
         assert args.json is True
 
 
+def test_parse_args_with_workers():
+    """Test parsing args with --workers."""
+    with patch('sys.argv', ['repolyze', '--workers', '8']):
+        args = parse_args()
+
+        assert args.workers == 8
+
+
+def test_parse_args_with_processes():
+    """Test parsing args with --processes."""
+    with patch('sys.argv', ['repolyze', '--processes', '4']):
+        args = parse_args()
+
+        assert args.processes == 4
+
+
+def test_parse_args_with_cache_dir():
+    """Test parsing args with --cache-dir."""
+    with patch('sys.argv', ['repolyze', '--cache-dir', '/tmp/cache']):
+        args = parse_args()
+
+        assert args.cache_dir == "/tmp/cache"
+
+
+def test_parse_args_with_watch():
+    """Test parsing args with --watch."""
+    with patch('sys.argv', ['repolyze', '--watch']):
+        args = parse_args()
+
+        assert args.watch is True
+
+
+def test_parse_args_with_source():
+    """Test parsing args with --source and --verify-index."""
+    with patch('sys.argv', ['repolyze', '--source', 'git-index', '--verify-index']):
+        args = parse_args()
+
+        assert args.source == "git-index"
+        assert args.verify_index is True
+
+
+def test_parse_args_with_exact_quantiles():
+    """Test parsing args with --exact-quantiles."""
+    with patch('sys.argv', ['repolyze', '--exact-quantiles']):
+        args = parse_args()
+
+        assert args.exact_quantiles is True
+
+
+def test_parse_args_rejects_watch_with_git_index():
+    """Test that watch mode only works with the directory walk."""
+    with patch('sys.argv', ['repolyze', '--watch', '--source', 'git-index']):
+        with pytest.raises(SystemExit):
+            parse_args()
+
+
+def test_parse_args_rejects_zero_workers():
+    """Test that --workers must be positive."""
+    with patch('sys.argv', ['repolyze', '--workers', '0']):
+        with pytest.raises(SystemExit):
+            parse_args()
+
+
 @patch('repolyze.cli.main.analyze')
 @patch('builtins.print')
 def test_main_human_readable_output(mock_print, mock_analyze, tmp_path):
@@ -51,7 +130,9 @@ def test_main_human_readable_output(mock_print, mock_analyze, tmp_path):
     mock_stats.structure.total_dirs = 3
     mock_stats.size.total_size = 5000
     mock_stats.size.large_files = []
+    mock_stats.size.large_file_count = 0
     mock_stats.file_types.count_by_extension = {".py": 5, ".txt": 5}
+    mock_stats.hygiene.duplicate_groups = None
     mock_analyze.return_value = mock_stats
     
     with patch('sys.argv', ['repolyze', str(tmp_path)]):
@@ -91,7 +172,9 @@ def test_main_displays_file_types(mock_print, mock_analyze, tmp_path):
     mock_stats.structure.total_dirs = 3
     mock_stats.size.total_size = 5000
     mock_stats.size.large_files = []
+    mock_stats.size.large_file_count = 0
     mock_stats.file_types.count_by_extension = {".py": 8, ".md": 2}
+    mock_stats.hygiene.duplicate_groups = None
     mock_analyze.return_value = mock_stats
     
     with patch('sys.argv', ['repolyze', str(tmp_path)]):
@@ -117,7 +200,9 @@ def test_main_displays_large_files(mock_print, mock_analyze, tmp_path):
     mock_stats.structure.total_dirs = 1
     mock_stats.size.total_size = 15000000
     mock_stats.size.large_files = [large_file]
+    mock_stats.size.large_file_count = 1
     mock_stats.file_types.count_by_extension = {".bin": 1}
+    mock_stats.hygiene.duplicate_groups = None
     mock_analyze.return_value = mock_stats
     
     with patch('sys.argv', ['repolyze', str(tmp_path)]):
@@ -125,3 +210,448 @@ def test_main_displays_large_files(mock_print, mock_analyze, tmp_path):
     
     # Verify that large files section was printed
     assert mock_print.called
+
+
+@patch('repolyze.cli.main.analyze')
+@patch('repolyze.cli.main.StatsWatcher')
+@patch('builtins.print')
+def test_main_watch_prints_json_lines(mock_print, mock_watcher, mock_analyze, tmp_path):
+    """Test that --watch --json prints one JSON document per update."""
+    first, second = MagicMock(), MagicMock()
+    first.to_dict.return_value = {"files": 1}
+    second.to_dict.return_value = {"files": 2}
+    watcher = mock_watcher.return_value.__enter__.return_value
+    watcher.__iter__.return_value = iter([first, second])
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--watch', '--json']):
+        main()
+
+    mock_analyze.assert_not_called()
+    lines = [call.args[0] for call in mock_print.call_args_list]
+    assert lines == ['{"files": 1}', '{"files": 2}']
+
+
+@patch('repolyze.cli.main.StatsWatcher')
+@patch('builtins.print')
+def test_main_watch_stops_on_interrupt(mock_print, mock_watcher, tmp_path):
+    """Test that ^C ends watch mode quietly."""
+    watcher = mock_watcher.return_value.__enter__.return_value
+    watcher.__iter__.side_effect = KeyboardInterrupt
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--watch']):
+        main()
+
+    mock_print.assert_not_called()
+
+
+@patch('repolyze.cli.main.analyze')
+def test_main_reports_git_index_error(mock_analyze, tmp_path):
+    """Test that a missing git index exits with a message."""
+    from repolyze.core.filesystem.gitindex import GitIndexError
+
+    mock_analyze.side_effect = GitIndexError("not a git work tree")
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--source', 'git-index']):
+        with pytest.raises(SystemExit) as exc:
+            main()
+
+    assert "not a git work tree" in str(exc.value)
+
+
+@patch('repolyze.cli.main.analyze')
+@patch('builtins.print')
+def test_main_mentions_unlisted_large_files(mock_print, mock_analyze, tmp_path):
+    """Test that large files beyond the listed ones are counted."""
+    large_file = MagicMock()
+    large_file.path = tmp_path / "large.bin"
+    large_file.size = 10 * 1024 * 1024
+
+    mock_stats = MagicMock()
+    mock_stats.path = tmp_path
+    mock_stats.size.total_size = 15000000
+    mock_stats.size.large_files = [large_file]
+    mock_stats.size.large_file_count = 3
+    mock_stats.file_types.count_by_extension = {}
+    mock_stats.hygiene.duplicate_groups = None
+    mock_analyze.return_value = mock_stats
+
+    with patch('sys.argv', ['repolyze', str(tmp_path)]):
+        main()
+
+    mock_print.assert_any_call("... and 2 more")
+    # The human-readable output does not show the tree
+    assert mock_analyze.call_args.kwargs["tree"] is False
+
+
+@patch('repolyze.cli.main.analyze')
+@patch('builtins.print')
+def test_main_json_no_tree(mock_print, mock_analyze, tmp_path):
+    """Test that --no-tree leaves the tree out of the JSON output."""
+    mock_analyze.return_value.to_dict.return_value = {}
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--json']):
+        main()
+    assert mock_analyze.call_args.kwargs["tree"] is True
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--json', '--no-tree']):
+        main()
+    assert mock_analyze.call_args.kwargs["tree"] is False
+
+
+def test_parse_args_rejects_watch_with_lines():
+    """Test that --lines cannot be combined with --watch."""
+    with patch('sys.argv', ['repolyze', '--watch', '--lines']):
+        with pytest.raises(SystemExit):
+            parse_args()
+
+
+@patch('repolyze.cli.main.analyze')
+@patch('builtins.print')
+def test_main_lines(mock_print, mock_analyze, tmp_path):
+    """Test that --lines is passed on and the total is shown."""
+    mock_stats = MagicMock()
+    mock_stats.path = tmp_path
+    mock_stats.size.total_size = 0
+    mock_stats.size.large_files = []
+    mock_stats.size.large_file_count = 0
+    mock_stats.language.total_lines_of_code = 1234
+    mock_stats.file_types.count_by_extension = {}
+    mock_stats.hygiene.duplicate_groups = None
+    mock_analyze.return_value = mock_stats
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--lines']):
+        main()
+
+    assert mock_analyze.call_args.kwargs["lines"] is True
+    mock_print.assert_any_call("Lines of code:     1234")
+
+
+@patch('repolyze.cli.main.analyze')
+@patch('builtins.print')
+def test_main_sloc(mock_print, mock_analyze, tmp_path):
+    """Test that --sloc is passed on and the breakdown is shown."""
+    from repolyze.models import LineCounts
+
+    mock_stats = MagicMock()
+    mock_stats.path = tmp_path
+    mock_stats.size.total_size = 0
+    mock_stats.size.large_files = []
+    mock_stats.size.large_file_count = 0
+    mock_stats.language.total_lines_of_code = 6
+    mock_stats.language.lines_by_language = {"Python": LineCounts(3, 2, 1)}
+    mock_stats.file_types.count_by_extension = {}
+    mock_stats.hygiene.duplicate_groups = None
+    mock_analyze.return_value = mock_stats
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--sloc']):
+        main()
+
+    assert mock_analyze.call_args.kwargs["sloc"] is True
+    mock_print.assert_any_call("Python: 3 / 2 / 1")
+
+
+def test_parse_args_rejects_watch_with_detect():
+    """Test that --detect cannot be combined with --watch."""
+    with patch('sys.argv', ['repolyze', '--watch', '--detect']):
+        with pytest.raises(SystemExit):
+            parse_args()
+
+
+@patch('repolyze.cli.main.analyze')
+@patch('builtins.print')
+def test_main_detect(mock_print, mock_analyze, tmp_path):
+    """Test that --detect and its budget are passed on and the results shown."""
+    mock_stats = MagicMock()
+    mock_stats.path = tmp_path
+    mock_stats.size.total_size = 0
+    mock_stats.size.large_files = []
+    mock_stats.size.large_file_count = 0
+    mock_stats.language.total_lines_of_code = None
+    mock_stats.language.lines_by_language = None
+    mock_stats.language.primary_language = "Python"
+    mock_stats.language.binary_files = 2
+    mock_stats.language.files_by_language = {"Python": 3, "Shell": 1}
+    mock_stats.file_types.count_by_extension = {}
+    mock_stats.hygiene.duplicate_groups = None
+    mock_analyze.return_value = mock_stats
+
+    argv = ['repolyze', str(tmp_path), '--detect', '--detect-budget', '1']
+    with patch('sys.argv', argv):
+        main()
+
+    assert mock_analyze.call_args.kwargs["detect"] is True
+    assert mock_analyze.call_args.kwargs["detect_budget"] == 1024 * 1024
+    mock_print.assert_any_call("Primary language:  Python")
+    mock_print.assert_any_call("Binary files:      2")
+    mock_print.assert_any_call("Shell: 1")
+
+
+def test_parse_args_rejects_watch_with_duplicates():
+    """Test that --duplicates cannot be combined with --watch."""
+    with patch('sys.argv', ['repolyze', '--watch', '--duplicates']):
+        with pytest.raises(SystemExit):
+            parse_args()
+
+
+@patch('repolyze.cli.main.analyze')
+@patch('builtins.print')
+def test_main_duplicates(mock_print, mock_analyze, tmp_path):
+    """Test that --duplicates is passed on and the groups are listed."""
+    from repolyze.models import DuplicateGroup
+
+    mock_stats = MagicMock()
+    mock_stats.path = tmp_path
+    mock_stats.size.total_size = 0
+    mock_stats.size.large_files = []
+    mock_stats.size.large_file_count = 0
+    mock_stats.file_types.count_by_extension = {}
+    mock_stats.hygiene.duplicate_groups = [
+        DuplicateGroup(1024 * 1024, [tmp_path / "a.bin", tmp_path / "b.bin"], 1024 * 1024)
+    ]
+    mock_stats.hygiene.duplicate_group_count = 3
+    mock_stats.hygiene.wasted_bytes = 2 * 1024 * 1024
+    mock_analyze.return_value = mock_stats
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--duplicates']):
+        main()
+
+    assert mock_analyze.call_args.kwargs["duplicates"] is True
+    mock_print.assert_any_call("\nDuplicate files: 3 groups, 2.00 MB wasted")
+    mock_print.assert_any_call("1048576 bytes x 2: a.bin, b.bin")
+    mock_print.assert_any_call("... and 2 more")
+
+
+def test_parse_args_tree_options():
+    """Test that --tree-depth and --tree-top imply --tree."""
+    with patch('sys.argv', ['repolyze']):
+        assert parse_args().tree is False
+    with patch('sys.argv', ['repolyze', '--tree-depth', '2', '--tree-top', '5']):
+        args = parse_args()
+    assert (args.tree, args.tree_depth, args.tree_top) == (True, 2, 5)
+
+
+def test_parse_args_rejects_tree_with_no_tree():
+    """Test that --tree cannot be combined with --no-tree."""
+    with patch('sys.argv', ['repolyze', '--tree', '--no-tree']):
+        with pytest.raises(SystemExit):
+            parse_args()
+    with patch('sys.argv', ['repolyze', '--tree-top', '0']):
+        with pytest.raises(SystemExit):
+            parse_args()
+
+
+@patch('repolyze.cli.main.analyze')
+@patch('builtins.print')
+def test_main_tree(mock_print, mock_analyze, tmp_path):
+    """Test that --tree builds the tree and prints it pruned."""
+    from repolyze.models import TreeNode
+
+    mock_stats = MagicMock()
+    mock_stats.path = tmp_path
+    mock_stats.size.total_size = 0
+    mock_stats.size.large_files = []
+    mock_stats.size.large_file_count = 0
+    mock_stats.file_types.count_by_extension = {}
+    mock_stats.hygiene.duplicate_groups = None
+    mock_stats.tree = TreeNode(tmp_path, 2, 30, [
+        TreeNode(tmp_path / "a.txt", 1, 10, is_dir=False),
+        TreeNode(tmp_path / "b.txt", 1, 20, is_dir=False),
+    ])
+    mock_analyze.return_value = mock_stats
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--tree-top', '1']):
+        main()
+
+    assert mock_analyze.call_args.kwargs["tree"] is True
+    mock_print.assert_any_call("\nTree:")
+    mock_print.assert_any_call(f"{tmp_path.name}/")
+    mock_print.assert_any_call("├─ b.txt")
+    mock_print.assert_any_call("└─ … 1 more")
+
+
+@patch('repolyze.cli.main.analyze')
+def test_main_json_compact(mock_analyze, tmp_path, capsys):
+    """Test that --compact writes the JSON document without whitespace."""
+    mock_analyze.return_value.to_dict.return_value = {"path": "p", "files": [1, 2]}
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--json', '--compact']):
+        main()
+
+    assert capsys.readouterr().out == '{"path":"p","files":[1,2]}\n'
+    mock_analyze.return_value.to_dict.assert_called_once_with(tree=False)
+
+
+def test_parse_args_rejects_emit_files_with_json():
+    """Test that --emit-files replaces the other outputs."""
+    with patch('sys.argv', ['repolyze', '--emit-files', 'csv', '--json']):
+        with pytest.raises(SystemExit):
+            parse_args()
+
+
+@patch('repolyze.cli.main.analyze')
+def test_main_emit_files(mock_analyze, tmp_path, capsys):
+    """Test that --emit-files streams records without analyzing."""
+    (tmp_path / "a.py").write_text("x = 1\n")
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--emit-files', 'ndjson', '--lines']):
+        main()
+
+    mock_analyze.assert_not_called()
+    (line,) = capsys.readouterr().out.splitlines()
+    record = json.loads(line)
+    assert (record["path"], record["size"], record["lines"]) == ("a.py", 6, 1)
+
+
+def test_main_save(tmp_path, capsys):
+    """Test that --save writes a snapshot of the analysis, tree included."""
+    from repolyze.models import RepoStats
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("x = 1\n")
+    file = tmp_path / "stats.snap"
+
+    with patch('sys.argv', ['repolyze', str(repo), '--save', str(file)]):
+        main()
+
+    loaded = RepoStats.load(file)
+    assert loaded.structure.total_files == 1
+    assert loaded.tree.file_count == 1
+
+
+def test_main_diff(tmp_path, capsys):
+    """Test that 'repolyze diff' compares two saved analyses."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("x = 1\n")
+    old, new = tmp_path / "old.snap", tmp_path / "new.snap"
+    with patch('sys.argv', ['repolyze', str(repo), '--save', str(old)]):
+        main()
+    (repo / "a.py").write_text("x = 1000\n")
+    (repo / "b.py").write_text("y = 2\n")
+    with patch('sys.argv', ['repolyze', str(repo), '--save', str(new)]):
+        main()
+    capsys.readouterr()
+
+    with patch('sys.argv', ['repolyze', 'diff', str(old), str(new)]):
+        main()
+    out = capsys.readouterr().out
+    assert "Files added:    1 (+6 bytes)" in out
+    assert "a.py: 6 -> 9 bytes (+3)" in out
+    assert ".py: +1 / +9" in out
+
+    with patch('sys.argv', ['repolyze', 'diff', str(old), str(new), '--json']):
+        main()
+    result = json.loads(capsys.readouterr().out)
+    assert result["largest_added"][0]["path"] == "b.py"
+
+
+def test_main_diff_rejects_other_files(tmp_path):
+    """Test that diffing a file that is not a snapshot exits with an error."""
+    bad = tmp_path / "bad"
+    bad.write_text("{}")
+
+    with patch('sys.argv', ['repolyze', 'diff', str(bad), str(bad)]):
+        with pytest.raises(SystemExit) as exc:
+            main()
+    assert "not a repolyze snapshot" in str(exc.value)
+
+
+def test_main_batch(tmp_path, capsys):
+    """Test that 'repolyze batch' prints one line per repository and a roll-up."""
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "f.py").write_text("x = 1\n")
+    listing = tmp_path / "repos.txt"
+    listing.write_text(f"# checkouts\n{tmp_path / 'b'}\n\n{tmp_path / 'missing'}\n")
+
+    argv = ['repolyze', 'batch', str(tmp_path / 'a'), '--from-file', str(listing),
+            '--processes', '1']
+    with patch('sys.argv', argv):
+        with pytest.raises(SystemExit) as exc:
+            main()
+
+    assert "1 repositories could not be analyzed" in str(exc.value)
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(lines) == 4
+    assert {line["path"] for line in lines[:3]} == {
+        str((tmp_path / name).resolve()) for name in ("a", "b", "missing")
+    }
+    assert lines[-1]["rollup"]["repositories"] == 2
+    assert lines[-1]["rollup"]["failed"] == 1
+
+
+def test_parse_batch_args_requires_paths():
+    """Test that a batch needs at least one repository."""
+    with patch('sys.argv', ['repolyze', 'batch']):
+        with pytest.raises(SystemExit):
+            main()
+
+
+def test_parse_args_rejects_profile_with_watch():
+    """Test that --profile is not supported with --watch."""
+    with patch('sys.argv', ['repolyze', '--watch', '--profile']):
+        with pytest.raises(SystemExit):
+            parse_args()
+
+
+def test_main_profile(tmp_path, capsys):
+    """Test that --profile prints the timings after the summary."""
+    (tmp_path / "a.py").write_text("x = 1\n")
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--profile']):
+        main()
+
+    out = capsys.readouterr().out
+    summary, profile = out.split("\nProfile:\n")
+    assert "Files:        1" in summary
+    phases = [line.split()[0] for line in profile.splitlines()[1:10]]
+    assert phases == [
+        "walk", "filter", "stat", "aggregate", "tree", "metadata", "other",
+        "total", "serialize",
+    ]
+    assert "stat calls:" in profile
+
+
+def test_main_profile_json(tmp_path, capsys):
+    """Test that with --json the profile is part of the document."""
+    (tmp_path / "a.py").write_text("x = 1\n")
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--profile', '--json']):
+        main()
+
+    data = json.loads(capsys.readouterr().out)
+    assert data["profile"]["stat_calls"] == 1
+    assert data["profile"]["phases"]["serialize"]["wall"] > 0
+
+
+def test_parse_args_commands():
+    """Test that a directory named like a command can still be analyzed."""
+    assert parse_args(["diff", "old", "new"]).command == "diff"
+    for argv in (["./diff"], ["analyze", "diff"]):
+        args = parse_args(argv)
+        assert (args.command, args.path) == ("analyze", argv[-1])
+    assert parse_args(["--json"]).command == "analyze"
+
+
+def test_parse_args_help_lists_commands(capsys):
+    """Test that --help lists the subcommands."""
+    with pytest.raises(SystemExit):
+        parse_args(["--help"])
+    out = capsys.readouterr().out
+    assert all(command in out for command in ("analyze", "diff", "batch"))
+
+
+def test_main_emit_files_csv_newlines(tmp_path):
+    """Test that CSV rows end in \\r\\n even where stdout translates newlines."""
+    (tmp_path / "a.py").write_text("x = 1\n")
+    out = io.BytesIO()
+    stdout = io.TextIOWrapper(out, encoding="utf-8", newline="\r\n")
+
+    with patch('sys.argv', ['repolyze', str(tmp_path), '--emit-files', 'csv']):
+        with patch('sys.stdout', stdout):
+            main()
+    stdout.flush()
+
+    assert out.getvalue().count(b"\r\n") == 2
+    assert b"\r\r\n" not in out.getvalue()
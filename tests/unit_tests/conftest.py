@@ -0,0 +1,26 @@
+"""Fixtures shared by the unit tests."""
+
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from repolyze.core.filesystem.scan import ScanEntry
+
+
+@pytest.fixture
+def scan_entry() -> Callable[..., ScanEntry]:
+    """Make the ``ScanEntry`` of an existing file, as the scan would.
+
+    The fields come from ``os.stat()`` of the file; keyword arguments
+    replace them.
+    """
+    def make(path: Path, **fields) -> ScanEntry:
+        st = path.stat()
+        entry = ScanEntry(
+            str(path), path.name, False, st.st_size, st.st_mtime, st.st_ino,
+            st.st_dev, st.st_nlink, st.st_mtime_ns,
+        )
+        return entry._replace(**fields)
+
+    return make
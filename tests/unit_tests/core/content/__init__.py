@@ -0,0 +1 @@
+"""Tests for repolyze.core.content module."""
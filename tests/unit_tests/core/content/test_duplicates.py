@@ -0,0 +1,109 @@
+"""Tests for repolyze.core.content.duplicates module."""
+
+from pathlib import Path
+
+from repolyze.core.content.duplicates import (
+    DUPLICATE_GROUPS_COUNT, EDGE_SIZE, DuplicateFinder, edge_digest, fill_duplicates,
+    full_digest,
+)
+from repolyze.core.stats.aggregate import PartialStats
+
+
+def _find(entries, threads=2):
+    finder = DuplicateFinder()
+    for entry in entries:
+        finder.add(entry)
+    return finder, finder.find(threads)
+
+
+def test_edge_digest_small_file_is_full_digest(tmp_path):
+    """Test that files up to two edges long are hashed whole."""
+    path = tmp_path / "f"
+    path.write_bytes(b"a" * (2 * EDGE_SIZE))
+
+    assert edge_digest(str(path), 2 * EDGE_SIZE) == full_digest(str(path))
+
+
+def test_edge_digest_ignores_the_middle(tmp_path):
+    """Test that only the first and last EDGE_SIZE bytes are hashed."""
+    size = 3 * EDGE_SIZE
+    a = tmp_path / "a"
+    a.write_bytes(b"h" * EDGE_SIZE + b"1" * EDGE_SIZE + b"t" * EDGE_SIZE)
+    b = tmp_path / "b"
+    b.write_bytes(b"h" * EDGE_SIZE + b"2" * EDGE_SIZE + b"t" * EDGE_SIZE)
+
+    assert edge_digest(str(a), size) == edge_digest(str(b), size)
+    assert full_digest(str(a)) != full_digest(str(b))
+
+
+def test_digest_unreadable(tmp_path):
+    """Test that a file gone since the scan has no digest."""
+    missing = str(tmp_path / "missing")
+
+    assert full_digest(missing) is None
+    assert edge_digest(missing, 3 * EDGE_SIZE) is None
+
+
+def test_find_small_duplicates(tmp_path, scan_entry):
+    """Test that same-size files are told apart by content."""
+    for name, data in [("a", b"same"), ("b", b"same"), ("c", b"diff"), ("d", b"other")]:
+        (tmp_path / name).write_bytes(data)
+
+    finder, groups = _find(map(scan_entry, sorted(tmp_path.iterdir())))
+
+    assert groups == [(4, [str(tmp_path / "a"), str(tmp_path / "b")])]
+    # d has a size of its own and is never read
+    assert finder.bytes_read == 12
+
+
+def test_find_large_duplicates(tmp_path, scan_entry):
+    """Test that files alike at both ends are hashed in full before matching."""
+    head, tail = b"h" * EDGE_SIZE, b"t" * EDGE_SIZE
+    (tmp_path / "a").write_bytes(head + b"1" * EDGE_SIZE + tail)
+    (tmp_path / "b").write_bytes(head + b"1" * EDGE_SIZE + tail)
+    (tmp_path / "c").write_bytes(head + b"2" * EDGE_SIZE + tail)
+    (tmp_path / "d").write_bytes(b"x" + head[1:] + b"1" * EDGE_SIZE + tail)
+
+    finder, groups = _find(map(scan_entry, sorted(tmp_path.iterdir())))
+
+    assert groups == [(3 * EDGE_SIZE, [str(tmp_path / "a"), str(tmp_path / "b")])]
+    # d differs in its first bytes and is not hashed in full
+    assert finder.bytes_read == 4 * 2 * EDGE_SIZE + 3 * 3 * EDGE_SIZE
+
+
+def test_find_skips_empty_files(tmp_path, scan_entry):
+    """Test that empty files are not reported as duplicates."""
+    (tmp_path / "a").write_bytes(b"")
+    (tmp_path / "b").write_bytes(b"")
+
+    assert _find(map(scan_entry, sorted(tmp_path.iterdir())))[1] == []
+
+
+def test_finder_merge(tmp_path, scan_entry):
+    """Test that copies found by different shards are matched."""
+    (tmp_path / "a").write_bytes(b"copy")
+    (tmp_path / "b").write_bytes(b"copy")
+    first, second = DuplicateFinder(), DuplicateFinder()
+    first.add(scan_entry(tmp_path / "a"))
+    second.add(scan_entry(tmp_path / "b"))
+
+    first.merge(second)
+
+    assert first.find(1) == [(4, [str(tmp_path / "a"), str(tmp_path / "b")])]
+
+
+def test_fill_duplicates(tmp_path):
+    """Test that the most wasteful groups are listed, and all are counted."""
+    groups = [(10, [f"/r/s{i}a", f"/r/s{i}b"]) for i in range(DUPLICATE_GROUPS_COUNT)]
+    groups.append((100, ["/r/x", "/r/y", "/r/z"]))
+    stats = PartialStats(tmp_path, 0.0).finalize(None)
+
+    fill_duplicates(stats, groups)
+
+    hygiene = stats.hygiene
+    assert hygiene.duplicate_group_count == DUPLICATE_GROUPS_COUNT + 1
+    assert hygiene.wasted_bytes == 10 * DUPLICATE_GROUPS_COUNT + 200
+    assert len(hygiene.duplicate_groups) == DUPLICATE_GROUPS_COUNT
+    first = hygiene.duplicate_groups[0]
+    assert (first.size, first.wasted_bytes) == (100, 200)
+    assert first.paths == [Path("/r/x"), Path("/r/y"), Path("/r/z")]
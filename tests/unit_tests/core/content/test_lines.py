@@ -0,0 +1,148 @@
+"""Tests for repolyze.core.content.lines module."""
+
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+import pytest
+
+from repolyze.core.content.lines import (
+    BLOCK_SIZE, BATCH_SIZE, PENDING_PER_WORKER, LineCounter, count_lines,
+    fill_file_lines,
+)
+from repolyze.core.stats.aggregate import PartialStats
+from repolyze.models import FileStat
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (b"", 0),
+        (b"\n", 1),
+        (b"one", 1),
+        (b"one\n", 1),
+        (b"one\ntwo", 2),
+        (b"one\r\ntwo\r\n", 2),
+        (b"\n\n\n", 3),
+    ],
+)
+def test_count_lines(tmp_path, data, expected):
+    """Test counting lines, with and without a trailing newline."""
+    path = tmp_path / "f.py"
+    path.write_bytes(data)
+
+    assert count_lines(str(path)) == expected
+
+
+def test_count_lines_across_blocks(tmp_path):
+    """Test files larger than the buffer, ending mid-block."""
+    path = tmp_path / "big.py"
+    line = b"x = 1\n"
+    path.write_bytes(line * (3 * BLOCK_SIZE // len(line)) + b"tail")
+
+    assert count_lines(str(path), bytearray(4096)) == 3 * BLOCK_SIZE // len(line) + 1
+
+
+def test_count_lines_skips_binary(tmp_path):
+    """Test that a NUL byte near the start marks the file as binary."""
+    path = tmp_path / "blob.c"
+    path.write_bytes(b"abc\n\0def\n")
+
+    assert count_lines(str(path)) is None
+
+
+def test_count_lines_unreadable(tmp_path):
+    """Test that a missing file has no line count."""
+    assert count_lines(str(tmp_path / "missing.py")) is None
+
+
+@pytest.mark.parametrize("pool", [False, True])
+def test_line_counter(tmp_path, pool, scan_entry):
+    """Test that only code files are counted, by extension, with or without a pool."""
+    for i in range(BATCH_SIZE + 10):
+        (tmp_path / f"m{i}.py").write_text("a\nb\n")
+    (tmp_path / "main.go").write_text("package main\n")
+    (tmp_path / "notes.txt").write_text("not\ncode\n")
+    (tmp_path / "blob.c").write_bytes(b"\0\n")
+
+    stats = PartialStats(tmp_path, 0.0, lines=True)
+    executor = ThreadPoolExecutor(2) if pool else None
+    counter = LineCounter(stats, executor)
+    for path in sorted(tmp_path.iterdir()):
+        counter.add(scan_entry(path))
+    counter.close()
+    if executor is not None:
+        executor.shutdown()
+
+    assert dict(stats.lines_by_ext) == {".py": 2 * (BATCH_SIZE + 10), ".go": 1}
+
+
+class _LazyPool(Executor):
+    """Runs a batch only when its result is asked for, like a slow pool."""
+
+    def __init__(self):
+        self.in_flight = self.most_in_flight = 0
+
+    def submit(self, fn, *args):
+        pool = self
+        pool.in_flight += 1
+        pool.most_in_flight = max(pool.most_in_flight, pool.in_flight)
+
+        class LazyFuture(Future):
+            def done(self):
+                return False
+
+            def result(self, timeout=None):
+                pool.in_flight -= 1
+                return fn(*args)
+
+        return LazyFuture()
+
+
+def test_line_counter_bounds_batches_in_flight(tmp_path, scan_entry):
+    """Test that the scan waits for the oldest batch when workers fall behind."""
+    for i in range(BATCH_SIZE * 10):
+        (tmp_path / f"m{i}.py").write_text("a\n")
+
+    stats = PartialStats(tmp_path, 0.0, lines=True)
+    pool = _LazyPool()
+    counter = LineCounter(stats, pool, workers=2)
+    for path in tmp_path.iterdir():
+        counter.add(scan_entry(path))
+    counter.close()
+
+    assert pool.most_in_flight == 2 * PENDING_PER_WORKER + 1
+    assert pool.in_flight == 0
+    assert dict(stats.lines_by_ext) == {".py": BATCH_SIZE * 10}
+
+
+def test_fill_file_lines(tmp_path, scan_entry):
+    """Test that listed code files get their line count, other files none."""
+    code = tmp_path / "a.py"
+    code.write_text("1\n2\n3\n")
+    text = tmp_path / "b.txt"
+    text.write_text("1\n")
+    stats = PartialStats(tmp_path, 0.0, lines=True)
+    for path in (code, text):
+        stats.add_file(scan_entry(path))
+    result = stats.finalize(None)
+
+    fill_file_lines(result)
+
+    lines = {f.path.name: f.lines for f in result.size.small_files}
+    assert lines == {"a.py": 3, "b.txt": None}
+    assert isinstance(result.time.oldest_file, FileStat)
+
+
+def test_line_counter_sloc(tmp_path, scan_entry):
+    """Test that a counter for sloc stats classifies lines by language."""
+    (tmp_path / "a.py").write_text("# c\n\nx = 1\n")
+    (tmp_path / "b.go").write_text("package b\n")
+    stats = PartialStats(tmp_path, 0.0, lines=True, sloc=True)
+
+    with ThreadPoolExecutor(1) as executor:
+        counter = LineCounter(stats, executor)
+        for path in sorted(tmp_path.iterdir()):
+            counter.add(scan_entry(path))
+        counter.close()
+
+    assert stats.sloc == {"Python": [1, 1, 1], "Go": [1, 0, 0]}
+    assert dict(stats.lines_by_ext) == {".py": 3, ".go": 1}
@@ -0,0 +1,90 @@
+"""Tests for repolyze.core.content.sloc module."""
+
+import pytest
+
+from repolyze.core.content import sloc as sloc_module
+from repolyze.core.content.sloc import LANGUAGES, SYNTAX, classify, count_sloc
+from repolyze.core.stats.aggregate import CODE_EXTS
+
+
+def test_every_code_extension_has_a_language():
+    """Test that the syntax table covers CODE_EXTS."""
+    assert set(LANGUAGES) == CODE_EXTS
+    assert set(LANGUAGES.values()) == set(SYNTAX)
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (b"", (0, 0, 0)),
+        (b"x = 1\n", (1, 0, 0)),
+        (b"# comment\n\n  \nx = 1  # trailing\n", (1, 1, 2)),
+        (b"x = 1\n# last line, no newline", (1, 1, 0)),
+        (b"s = '# not a comment'\n", (1, 0, 0)),
+        (b'"""Docstring.\n\nMore.\n"""\nx = 1\n', (1, 3, 1)),
+        (b"def f():\n    r'''Raw docstring.'''\n", (1, 1, 0)),
+        (b'x = """\n# inside a string\n"""\n', (3, 0, 0)),
+        (b"x = 1\r\n# comment\r\n\r\n", (1, 1, 1)),
+    ],
+)
+def test_classify_python(data, expected):
+    """Test Python comments, docstrings and strings."""
+    assert classify(data, "Python") == expected
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (b"/* one\n * two\n */\nint x;\n", (1, 3, 0)),
+        (b"int x; // trailing\n// alone\n", (1, 1, 0)),
+        (b'char *s = "/* not */ // not";\n', (1, 0, 0)),
+        (b"char q = '\"';\n// comment\n", (1, 1, 0)),
+        (b"int x; /* starts\nends */ int y;\n", (2, 0, 0)),
+        (b"/* never closed\nint x;\n", (0, 2, 0)),
+        (b"/*\n\n*/\n", (0, 2, 1)),
+    ],
+)
+def test_classify_c(data, expected):
+    """Test line and block comments and string literals in C."""
+    assert classify(data, "C") == expected
+
+
+@pytest.mark.parametrize(
+    "language, data, expected",
+    [
+        ("JavaScript", b"const s = `\n// in template\n`;\n", (3, 0, 0)),
+        ("TypeScript", b"const s = '//x'; // c\n", (1, 0, 0)),
+        ("Java", b'String s = """\n  // text block\n  """;\n', (3, 0, 0)),
+        ("C++", b'auto s = R"x(\n// raw\n)x";\n// c\n', (3, 1, 0)),
+        ("Rust", b"fn f<'a>(x: &'a str) {} /* c\n */\n", (1, 1, 0)),
+        ("Rust", b'let s = r#"\n// raw "quoted"\n"#;\n', (3, 0, 0)),
+        ("Go", b"s := `\n// raw\n`\n// c\n", (3, 1, 0)),
+    ],
+)
+def test_classify_strings_spanning_lines(language, data, expected):
+    """Test the multi-line and raw string syntaxes of each language."""
+    assert classify(data, language) == expected
+
+
+def test_count_sloc(tmp_path):
+    """Test classifying files, skipping binary and unreadable ones."""
+    source = tmp_path / "a.go"
+    source.write_bytes(b"// c\n\npackage a\n")
+    binary = tmp_path / "b.go"
+    binary.write_bytes(b"\0package b\n")
+
+    assert count_sloc(str(source), "Go") == (1, 1, 1)
+    assert count_sloc(str(binary), "Go") is None
+    assert count_sloc(str(tmp_path / "missing.go"), "Go") is None
+
+
+def test_count_sloc_in_chunks(tmp_path, monkeypatch):
+    """Test that files are classified in chunks cut at line breaks."""
+    monkeypatch.setattr(sloc_module, "CHUNK_SIZE", 8)
+    source = tmp_path / "a.go"
+    source.write_bytes(b"// c\n\npackage a\nx := 1 // one\n\ny")
+    generated = tmp_path / "b.go"
+    generated.write_bytes(b"x := []int{1, 2, 3}\n")
+
+    assert count_sloc(str(source), "Go") == (3, 1, 2)
+    assert count_sloc(str(generated), "Go") is None
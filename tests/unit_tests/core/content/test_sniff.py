@@ -0,0 +1,201 @@
+"""Tests for repolyze.core.content.sniff module."""
+
+import os
+import pickle
+
+import pytest
+
+from repolyze.core.content.sniff import (
+    SNIFF_SIZE, ContentSniffer, Sniff, detect, is_binary,
+)
+
+
+@pytest.mark.parametrize(
+    "block, binary",
+    [
+        (b"", False),
+        (b"plain text\n", False),
+        ("café\n".encode("utf-8"), False),
+        # Latin-1 text is not valid UTF-8, but has no control characters
+        ("café au lait\n".encode("latin-1"), False),
+        # A multi-byte character cut off at the end of the block
+        ("x€".encode("utf-8")[:-1], False),
+        (b"abc\0def", True),
+        (b"\x7fELF\x02\x01\x01", True),
+        (b"\x89PNG\r\n\x1a\n", True),
+        (b"PK\x03\x04", True),
+        (bytes(range(1, 32)) * 4 + b"\xff", True),
+    ],
+)
+def test_is_binary(block, binary):
+    """Test the magic number, NUL byte and control character checks."""
+    assert is_binary(block) is binary
+
+
+@pytest.mark.parametrize(
+    "block, name, language",
+    [
+        (b"#!/usr/bin/env python3\n", "tool", "Python"),
+        (b"#!/usr/bin/python3.11 -u\n", "tool", "Python"),
+        (b"#! /bin/sh\n", "configure", "Shell"),
+        (b"#!/usr/bin/env -S node --harmony\n", "cli", "JavaScript"),
+        (b"#!/usr/bin/env bash\n", "build.py", "Shell"),
+        (b"# -*- mode: ruby; coding: utf-8 -*-\n", "Rakefile", "Ruby"),
+        (b"// -*- c++ -*-\n", "vector", "C++"),
+        (b"x = 1\n# vim: set ft=python:\n", "script", "Python"),
+        # A coding declaration is not a mode
+        (b"# -*- coding: utf-8 -*-\n", "notes", None),
+        (b"x = 1\n", "a.py", "Python"),
+        (b"int x;\n", "a.H", "C"),
+        (b"#!/usr/bin/unknown\n", "a.go", "Go"),
+        (b"hello\n", "README", None),
+    ],
+)
+def test_detect(block, name, language):
+    """Test shebangs, modelines and the extension fallback, in that order."""
+    assert detect(block, name) == Sniff(False, language)
+
+
+def test_detect_binary():
+    """Test that binary files have no language."""
+    assert detect(b"\0\0\0", "a.py") == Sniff(True, None)
+
+
+def test_sniff_reads_only_the_start(tmp_path, scan_entry):
+    """Test that at most SNIFF_SIZE bytes of a file are read."""
+    path = tmp_path / "big"
+    path.write_bytes(b"#!/bin/sh\n" + b"x" * (4 * SNIFF_SIZE))
+    sniffer = ContentSniffer()
+
+    assert sniffer.sniff(scan_entry(path)) == Sniff(False, "Shell")
+    assert sniffer.bytes_read == SNIFF_SIZE
+
+
+def test_sniff_budget(tmp_path, scan_entry):
+    """Test that files past the byte budget are not read."""
+    entries = []
+    for i in range(3):
+        path = tmp_path / f"f{i}"
+        path.write_bytes(b"#!/bin/sh\n")
+        entries.append(scan_entry(path))
+    sniffer = ContentSniffer(budget=25)
+
+    results = [sniffer.sniff(entry) for entry in entries]
+
+    assert results == [Sniff(False, "Shell"), Sniff(False, "Shell"), None]
+    assert sniffer.bytes_read == 20
+    assert sniffer.skipped == 1
+
+
+def test_sniff_memoizes(tmp_path, scan_entry):
+    """Test that a file is read once, and again after it changes."""
+    path = tmp_path / "tool"
+    path.write_bytes(b"#!/bin/sh\n")
+    sniffer = ContentSniffer()
+    sniffer.sniff(scan_entry(path))
+
+    assert sniffer.sniff(scan_entry(path)) == Sniff(False, "Shell")
+    assert (sniffer.hits, sniffer.bytes_read) == (1, 10)
+
+    path.write_bytes(b"#!/usr/bin/env python\n")
+    assert sniffer.sniff(scan_entry(path)) == Sniff(False, "Python")
+    assert sniffer.hits == 1
+
+
+def test_sniff_memo_applies_each_name(tmp_path, scan_entry):
+    """Test that links to one file are detected by their own extensions."""
+    path = tmp_path / "a.py"
+    path.write_bytes(b"x = 1\n")
+    link = tmp_path / "a.rb"
+    os.link(path, link)
+    sniffer = ContentSniffer()
+
+    assert sniffer.sniff(scan_entry(path)) == Sniff(False, "Python")
+    assert sniffer.sniff(scan_entry(link)) == Sniff(False, "Ruby")
+    assert sniffer.hits == 1
+
+
+def test_sniff_unreadable(tmp_path, scan_entry):
+    """Test that a file gone since the scan raises and gives back its budget."""
+    path = tmp_path / "gone"
+    path.write_bytes(b"data")
+    entry = scan_entry(path)
+    path.unlink()
+    sniffer = ContentSniffer(budget=4)
+
+    with pytest.raises(OSError):
+        sniffer.sniff(entry)
+
+    assert sniffer.unreadable == 1
+    assert sniffer.skipped == 0
+    assert sniffer.bytes_read == 0
+    other = tmp_path / "other"
+    other.write_bytes(b"text")
+    assert sniffer.sniff(scan_entry(other)) == Sniff(False, None)
+
+
+def test_sniff_unreadable_shared_budget(tmp_path, scan_entry):
+    """Test that the reservation is given back to a shared budget too."""
+    import multiprocessing
+
+    path = tmp_path / "gone"
+    path.write_bytes(b"data")
+    entry = scan_entry(path)
+    path.unlink()
+    sniffer = ContentSniffer(remaining=multiprocessing.Value("q", 10))
+
+    with pytest.raises(OSError):
+        sniffer.sniff(entry)
+
+    assert sniffer.remaining.value == 10
+
+
+def test_sniffer_open_and_save(tmp_path, scan_entry):
+    """Test that results used in a run are kept for the next one."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    kept = repo / "kept"
+    kept.write_bytes(b"#!/bin/sh\n")
+    gone = repo / "gone"
+    gone.write_bytes(b"#!/bin/sh\n")
+    cache_dir = tmp_path / "cache"
+
+    sniffer = ContentSniffer.open(cache_dir, repo)
+    sniffer.sniff(scan_entry(kept))
+    sniffer.sniff(scan_entry(gone))
+    sniffer.save()
+
+    sniffer = ContentSniffer.open(cache_dir, repo, budget=0)
+    assert sniffer.sniff(scan_entry(kept)) == Sniff(False, "Shell")
+    sniffer.save()
+
+    sniffer = ContentSniffer.open(cache_dir, repo, budget=0)
+    assert sniffer.sniff(scan_entry(kept)) == Sniff(False, "Shell")
+    assert sniffer.sniff(scan_entry(gone)) is None
+
+
+def test_sniffer_open_ignores_corrupt_memo(tmp_path):
+    """Test that a damaged memo file is treated as empty."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    sniffer = ContentSniffer.open(tmp_path, repo)
+    sniffer.save()
+    sniffer.file.write_bytes(b"garbage")
+
+    assert ContentSniffer.open(tmp_path, repo)._memo == {}
+
+
+def test_sniffer_copy_for_workers(tmp_path, scan_entry):
+    """Test that a worker's copy reports back what it found."""
+    path = tmp_path / "tool"
+    path.write_bytes(b"#!/bin/sh\n")
+    sniffer = ContentSniffer.open(tmp_path / "cache", tmp_path)
+
+    copy = pickle.loads(pickle.dumps(sniffer))
+    copy.sniff(scan_entry(path))
+    copy.trim()
+    sniffer.update(pickle.loads(pickle.dumps(copy)))
+
+    assert copy.file is None
+    assert sniffer.bytes_read == 10
+    assert list(sniffer.used.values()) == [(False, "Shell")]
@@ -0,0 +1,185 @@
+"""Tests for repolyze.core.filesystem.cache module."""
+
+import marshal
+import os
+import time
+
+from repolyze.core.analyze import analyze
+from repolyze.core.filesystem.cache import ScanCache
+from repolyze.core.filesystem.gitignore import root_rules
+from repolyze.core.filesystem.scan import scan_subtree
+
+
+def _age(root, seconds=100):
+    """Push every directory's mtime into the past, out of the racy window."""
+    t = time.time() - seconds
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, (t, t))
+
+
+def _make_repo(root):
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "pkg" / "mod.py").write_text("code")
+    (root / "README.md").write_text("readme")
+    _age(root)
+
+
+def _scan(root, cache):
+    entries = scan_subtree(os.fspath(root), "", root_rules(root), cache=cache)
+    return sorted(e.path for e in entries)
+
+
+def _record_scandir(monkeypatch):
+    listed = []
+    original_scandir = os.scandir
+
+    def recording_scandir(path):
+        listed.append(os.fspath(path))
+        return original_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+    return listed
+
+
+def test_cache_serves_unchanged_directories(tmp_path, monkeypatch):
+    """Test that a second run does not list unchanged directories."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _make_repo(repo)
+
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    first = _scan(repo, cache)
+    cache.save()
+
+    listed = _record_scandir(monkeypatch)
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    second = _scan(repo, cache)
+
+    assert second == first
+    assert listed == []
+    assert cache.hits == 3
+    assert cache.misses == 0
+
+
+def test_cache_rescans_changed_directory(tmp_path, monkeypatch):
+    """Test that only a directory whose mtime changed is listed again."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _make_repo(repo)
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    _scan(repo, cache)
+    cache.save()
+
+    (repo / "src" / "pkg" / "new.py").write_text("new")
+
+    listed = _record_scandir(monkeypatch)
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    result = _scan(repo, cache)
+
+    assert listed == [os.fspath(repo / "src" / "pkg")]
+    assert os.fspath(repo / "src" / "pkg" / "new.py") in result
+
+
+def test_cache_skips_racy_directories(tmp_path):
+    """Test that directories modified just now are not cached."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "file.txt").touch()
+
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    _scan(repo, cache)
+
+    assert len(cache) == 0
+
+
+def test_cache_detects_gitignore_edit(tmp_path):
+    """Test that editing a .gitignore in place invalidates its directory."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / ".gitignore").write_text("*.log\n")
+    (repo / "a.log").touch()
+    (repo / "a.tmp").touch()
+    _age(repo)
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    _scan(repo, cache)
+    cache.save()
+
+    (repo / ".gitignore").write_text("*.tmp\n")
+    _age(repo)
+
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    names = [os.path.basename(p) for p in _scan(repo, cache)]
+
+    assert "a.log" in names
+    assert "a.tmp" not in names
+
+
+def test_cache_ignores_corrupt_file(tmp_path):
+    """Test that a corrupt cache file is treated as empty."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _make_repo(repo)
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    _scan(repo, cache)
+    cache.save()
+
+    data = bytearray(cache.file.read_bytes())
+    data[-1] ^= 0xFF
+    cache.file.write_bytes(bytes(data))
+
+    reopened = ScanCache.open(tmp_path / "cache", repo)
+
+    assert len(reopened) == 0
+    assert _scan(repo, reopened) == _scan(repo, None)
+
+
+def test_cache_ignores_truncated_file(tmp_path):
+    """Test that a truncated cache file is treated as empty."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    cache.file.parent.mkdir(parents=True)
+    cache.file.write_bytes(b"RPLZ")
+
+    assert len(ScanCache.open(tmp_path / "cache", repo)) == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that records untouched for longest are evicted over the cap."""
+    repo = tmp_path / "repo"
+    for name in ["old", "new"]:
+        (repo / name).mkdir(parents=True)
+        for i in range(20):
+            (repo / name / f"file{i}.txt").touch()
+    _age(repo)
+
+    def scan_dir(cache, name):
+        return list(
+            scan_subtree(os.fspath(repo / name), name, root_rules(repo), cache=cache)
+        )
+
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    scan_dir(cache, "old")
+    scan_dir(cache, "new")
+    cache.save()
+
+    # A later run only touches "new", and the cap only fits one record
+    cache = ScanCache.open(tmp_path / "cache", repo)
+    scan_dir(cache, "new")
+    cache.max_bytes = len(marshal.dumps(cache._records["new"]))
+    cache.save()
+
+    reopened = ScanCache.open(tmp_path / "cache", repo)
+    assert reopened.subset("new")._records
+    assert not reopened.subset("old")._records
+
+
+def test_unusable_cache_dir_is_ignored(tmp_path):
+    """Test that a cache directory that cannot be created is not an error."""
+    _make_repo(tmp_path / "repo")
+    blocker = tmp_path / "file"
+    blocker.write_text("not a directory")
+
+    stats = analyze(tmp_path / "repo", cache_dir=blocker / "cache", detect=True)
+
+    assert stats.structure.total_files == 2
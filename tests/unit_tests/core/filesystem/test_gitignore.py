@@ -0,0 +1,266 @@
+"""Tests for repolyze.core.filesystem.gitignore module."""
+
+import shutil
+import subprocess
+
+import pytest
+
+from repolyze.core.filesystem.gitignore import (
+    GitIgnore, IgnoreRules, git_dir, load_gitignore, read_patterns, root_rules
+)
+
+
+# (patterns, path, is_dir, ignored) following git's documented semantics.
+# Paths are relative to the directory holding the ignore file.
+GIT_CORPUS = [
+    # Plain names match at any level, files and directories alike
+    (["*.log"], "file.log", False, True),
+    (["*.log"], "a/b/file.log", False, True),
+    (["*.log"], "file.txt", False, False),
+    (["temp.txt"], "temp.txt", False, True),
+    (["temp.txt"], "sub/temp.txt", False, True),
+    (["build"], "build", True, True),
+    (["build"], "src/build", True, True),
+    (["build"], "build", False, True),
+    # A trailing slash only matches directories
+    (["build/"], "build", True, True),
+    (["build/"], "build", False, False),
+    (["build/"], "src/build", True, True),
+    # A leading or middle slash anchors to the ignore file's directory
+    (["/build"], "build", True, True),
+    (["/build"], "src/build", True, False),
+    (["doc/frotz"], "doc/frotz", False, True),
+    (["doc/frotz"], "a/doc/frotz", False, False),
+    (["doc/frotz/"], "doc/frotz", True, True),
+    # '*' and '?' never match a slash
+    (["doc/*.txt"], "doc/notes.txt", False, True),
+    (["doc/*.txt"], "doc/server/arch.txt", False, False),
+    (["file?.txt"], "file1.txt", False, True),
+    (["file?.txt"], "file10.txt", False, False),
+    # Character classes
+    (["file[0-9].txt"], "file7.txt", False, True),
+    (["file[0-9].txt"], "filex.txt", False, False),
+    (["file[!0-9].txt"], "filex.txt", False, True),
+    (["file[!0-9].txt"], "file7.txt", False, False),
+    # Leading "**/" matches in all directories
+    (["**/foo"], "foo", False, True),
+    (["**/foo"], "a/b/foo", True, True),
+    (["**/foo/bar"], "x/foo/bar", False, True),
+    (["**/foo/bar"], "foo/bar", False, True),
+    # Trailing "/**" matches everything inside, not the directory itself
+    (["abc/**"], "abc/x", False, True),
+    (["abc/**"], "abc/x/y", False, True),
+    (["abc/**"], "abc", True, False),
+    # "/**/" matches zero or more directories
+    (["a/**/b"], "a/b", False, True),
+    (["a/**/b"], "a/x/b", False, True),
+    (["a/**/b"], "a/x/y/b", False, True),
+    (["a/**/b"], "b", False, False),
+    # Other consecutive asterisks are regular asterisks
+    (["foo**bar"], "fooxbar", False, True),
+    (["foo**bar"], "foo/bar", False, False),
+    # The last matching pattern wins, including negations
+    (["*.log", "!keep.log"], "keep.log", False, False),
+    (["*.log", "!keep.log"], "other.log", False, True),
+    (["!keep.log", "*.log"], "keep.log", False, True),
+    (["build/", "!build/"], "build", True, False),
+    # Suffix globs and plain names, which are served from hash tables
+    (["*.log"], "logs.log", True, True),
+    (["*.d/"], "conf.d", True, True),
+    (["*.d/"], "conf.d", False, False),
+    (["*.log"], ".log", False, True),
+    ([".env"], "config/.env", False, True),
+    ([".env"], "config/.envrc", False, False),
+    (["**/build/"], "a/build", True, True),
+    (["**/build/"], "a/build", False, False),
+    (["*.log", "!*.log", "*.log"], "x.log", False, True),
+    (["*.log", "[a-z].log", "!x.log"], "x.log", False, False),
+    # Escapes
+    (["\\!important"], "!important", False, True),
+    (["\\#hash"], "#hash", False, True),
+    (["trailing   "], "trailing", False, True),
+    (["space\\ "], "space ", False, True),
+]
+
+
+def _corpus_id(case):
+    patterns, path, is_dir, _ = case
+    return f"{'|'.join(patterns)}-{path}{'/' if is_dir else ''}"
+
+
+@pytest.mark.parametrize("case", GIT_CORPUS, ids=_corpus_id)
+def test_gitignore_corpus(case):
+    """Test the compiled matcher against the git semantics corpus."""
+    patterns, path, is_dir, ignored = case
+
+    assert bool(GitIgnore(patterns).match(path, is_dir)) is ignored
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+@pytest.mark.parametrize("case", GIT_CORPUS, ids=_corpus_id)
+def test_gitignore_corpus_agrees_with_git(case, tmp_path):
+    """Test that the corpus expectations are what git itself reports."""
+    patterns, path, is_dir, ignored = case
+    (tmp_path / ".gitignore").write_text("\n".join(patterns) + "\n")
+    target = tmp_path / path
+    if is_dir:
+        target.mkdir(parents=True)
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.touch()
+
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    result = subprocess.run(
+        ["git", "check-ignore", "-q", "--no-index", path],
+        cwd=tmp_path,
+    )
+
+    assert (result.returncode == 0) is ignored
+
+
+def test_read_patterns(tmp_path):
+    """Test reading patterns, skipping comments and blank lines."""
+    gitignore = tmp_path / ".gitignore"
+    gitignore.write_text("*.log\n# comment\ntemp/\n\n")
+
+    assert read_patterns(gitignore) == ["*.log", "temp/"]
+
+
+def test_read_patterns_missing(tmp_path):
+    """Test reading a missing ignore file."""
+    assert read_patterns(tmp_path / ".gitignore") == []
+
+
+def test_load_gitignore_not_exists(tmp_path):
+    """Test loading .gitignore when it doesn't exist."""
+    assert load_gitignore(tmp_path) is None
+
+
+def test_load_gitignore_exists(tmp_path):
+    """Test loading .gitignore when it exists."""
+    (tmp_path / ".gitignore").write_text("*.log\n# comment\ntemp/\n\n")
+
+    gitignore = load_gitignore(tmp_path)
+
+    assert len(gitignore) == 2
+    assert gitignore.match("file.log")
+    assert gitignore.match("temp", is_dir=True)
+
+
+def test_load_gitignore_empty(tmp_path):
+    """Test loading empty .gitignore."""
+    (tmp_path / ".gitignore").write_text("# only comments\n\n")
+
+    assert load_gitignore(tmp_path) is None
+
+
+def test_match_simple_pattern():
+    """Test gitignore pattern matching with simple patterns."""
+    gitignore = GitIgnore(["*.log", "temp.txt"])
+
+    assert gitignore.match("file.log", is_dir=False)
+    assert gitignore.match("temp.txt", is_dir=False)
+    assert not gitignore.match("file.txt", is_dir=False)
+
+
+def test_match_directory_pattern():
+    """Test gitignore pattern matching with directory patterns."""
+    gitignore = GitIgnore(["build/", "*.pyc"])
+
+    assert gitignore.match("build", is_dir=True)
+    assert not gitignore.match("build", is_dir=False)
+    assert gitignore.match("file.pyc", is_dir=False)
+
+
+def test_match_nested_path():
+    """Test gitignore pattern matching with nested paths."""
+    gitignore = GitIgnore(["*.log", "temp/"])
+
+    assert gitignore.match("dir/file.log", is_dir=False)
+    assert gitignore.match("temp", is_dir=True)
+
+
+def test_match_no_patterns():
+    """Test matching with no patterns."""
+    gitignore = GitIgnore([])
+
+    assert not gitignore
+    assert gitignore.match("any/path") is None
+
+
+def test_match_distinguishes_negation():
+    """Test that a re-included path is reported as False, not None."""
+    gitignore = GitIgnore(["*.log", "!keep.log"])
+
+    assert gitignore.match("keep.log") is False
+    assert gitignore.match("file.txt") is None
+
+
+def test_is_ignored_checks_parents():
+    """Test that files inside an ignored directory cannot be re-included."""
+    gitignore = GitIgnore(["build/", "!build/keep.txt"])
+
+    assert gitignore.is_ignored("build/keep.txt")
+    assert gitignore.is_ignored("build/other.txt")
+    assert not gitignore.is_ignored("src/keep.txt")
+
+
+def test_ignore_rules_child_without_patterns_is_shared():
+    """Test that a directory without its own patterns reuses its parent's rules."""
+    rules = IgnoreRules().child("", ["*.log"])
+
+    assert rules.child("src", []) is rules
+
+
+def test_ignore_rules_identical_files_share_matcher():
+    """Test that identical ignore files are compiled only once."""
+    rules = IgnoreRules()
+
+    a = rules.child("a", ["*.tmp", "out/"])
+    b = rules.child("b", ["*.tmp", "out/"])
+
+    assert a is not b
+    assert a.gitignore is b.gitignore
+
+
+def test_ignore_rules_relative_to_base():
+    """Test that nested patterns are matched relative to their directory."""
+    rules = IgnoreRules().child("", ["*.log"]).child("pkg", ["/generated/"])
+
+    assert rules.match("pkg/generated", is_dir=True)
+    assert not rules.match("generated", is_dir=True)
+    assert rules.match("pkg/file.log")
+
+
+def test_ignore_rules_deeper_overrides():
+    """Test that a deeper ignore file overrides a shallower one."""
+    rules = IgnoreRules().child("", ["*.log"]).child("pkg", ["!keep.log"])
+
+    assert rules.match("pkg/keep.log") is False
+    assert rules.match("keep.log") is True
+
+
+def test_root_rules_reads_info_exclude(tmp_path):
+    """Test that .git/info/exclude is loaded for the scan root."""
+    (tmp_path / ".git" / "info").mkdir(parents=True)
+    (tmp_path / ".git" / "info" / "exclude").write_text("*.secret\n")
+
+    rules = root_rules(tmp_path)
+
+    assert rules.match("key.secret")
+    assert not rules.match("key.txt")
+
+
+def test_root_rules_without_git(tmp_path):
+    """Test that a plain directory has no base rules."""
+    assert not root_rules(tmp_path)
+
+
+def test_git_dir_follows_gitdir_file(tmp_path):
+    """Test resolving the git directory of a worktree."""
+    (tmp_path / "real.git").mkdir()
+    (tmp_path / "work").mkdir()
+    (tmp_path / "work" / ".git").write_text(f"gitdir: {tmp_path / 'real.git'}\n")
+
+    assert git_dir(tmp_path / "work") == tmp_path / "real.git"
+    assert git_dir(tmp_path) is None
@@ -0,0 +1,241 @@
+"""Tests for repolyze.core.filesystem.gitindex module."""
+
+import os
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from repolyze.core.filesystem.gitindex import (
+    GitIndexError, index_entries, read_index,
+)
+
+REGULAR = 0o100644
+
+
+def _varint(value):
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        value -= 1
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+
+def _index(entries, version=2, hash_size=20, extensions=b""):
+    """Encode ``(path, size, mtime_s, flags, extended_flags)`` entries."""
+    out = [struct.pack(">4sII", b"DIRC", version, len(entries))]
+    previous = b""
+    for path, size, mtime_s, flags, extended in entries:
+        name = path.encode()
+        if extended is not None:
+            flags |= 0x4000
+        entry = struct.pack(">10I", 0, 0, mtime_s, 0, 1, 2, REGULAR, 0, 0, size)
+        entry += b"\0" * hash_size + struct.pack(">H", flags | min(len(name), 0xFFF))
+        if extended is not None:
+            entry += struct.pack(">H", extended)
+        if version == 4:
+            common = len(os.path.commonprefix([previous, name]))
+            entry += _varint(len(previous) - common) + name[common:] + b"\0"
+            previous = name
+        else:
+            entry += name
+            entry += b"\0" * (8 - len(entry) % 8)
+        out.append(entry)
+    out.append(extensions)
+    out.append(b"\0" * hash_size)
+    return b"".join(out)
+
+
+ENTRIES = [
+    ("README.md", 10, 1000, 0, None),
+    ("src/app/main.py", 20, 1001, 0, None),
+    ("src/app/models.py", 30, 1002, 0, None),
+    ("src/lib.py", 40, 1003, 0, None),
+]
+
+
+@pytest.mark.parametrize("version", [2, 3, 4])
+def test_read_index_versions(tmp_path, version):
+    """Test parsing every supported version, including v4 prefix compression."""
+    index = tmp_path / "index"
+    index.write_bytes(_index(ENTRIES, version))
+
+    entries = list(read_index(index))
+
+    assert [e.path for e in entries] == [e[0] for e in ENTRIES]
+    assert [e.size for e in entries] == [10, 20, 30, 40]
+    assert [e.mtime_s for e in entries] == [1000, 1001, 1002, 1003]
+    assert entries[0].mode == REGULAR
+
+
+def test_varint_multibyte(tmp_path):
+    """Test v4 entries that strip more than 127 bytes of the previous path."""
+    long_dir = "d" * 200
+    entries = [(f"{long_dir}/a.txt", 1, 0, 0, None), ("b.txt", 2, 0, 0, None)]
+    index = tmp_path / "index"
+    index.write_bytes(_index(entries, 4))
+
+    assert [e.path for e in read_index(index)] == [f"{long_dir}/a.txt", "b.txt"]
+
+
+def test_read_index_skips_skip_worktree_and_conflicts(tmp_path):
+    """Test that sparse and conflicted entries are handled."""
+    entries = [
+        ("a.txt", 1, 0, 0, None),
+        ("conflict.txt", 2, 0, 0x1000, None),
+        ("conflict.txt", 3, 0, 0x2000, None),
+        ("conflict.txt", 4, 0, 0x3000, None),
+        ("sparse.txt", 5, 0, 0, 0x4000),
+        ("z.txt", 6, 0, 0, 0),
+    ]
+    index = tmp_path / "index"
+    index.write_bytes(_index(entries, 3))
+
+    assert [e.path for e in read_index(index)] == ["a.txt", "conflict.txt", "z.txt"]
+
+
+def test_read_index_sha256(tmp_path):
+    """Test indexes of SHA-256 repositories."""
+    index = tmp_path / "index"
+    index.write_bytes(_index(ENTRIES, 2, hash_size=32))
+
+    assert [e.size for e in read_index(index, hash_size=32)] == [10, 20, 30, 40]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"DIRC", b"NOPE" + b"\0" * 20, struct.pack(">4sII", b"DIRC", 5, 0)],
+)
+def test_read_index_rejects_bad_files(tmp_path, data):
+    """Test that unreadable indexes raise GitIndexError."""
+    index = tmp_path / "index"
+    index.write_bytes(data)
+
+    with pytest.raises(GitIndexError):
+        list(read_index(index))
+
+
+def test_read_index_rejects_truncated_entries(tmp_path):
+    """Test that an index cut short raises GitIndexError."""
+    index = tmp_path / "index"
+    index.write_bytes(_index(ENTRIES)[:100])
+
+    with pytest.raises(GitIndexError):
+        list(read_index(index))
+
+
+def test_read_index_rejects_split_index(tmp_path):
+    """Test that split indexes are refused rather than half-read."""
+    index = tmp_path / "index"
+    index.write_bytes(_index(ENTRIES, extensions=b"link" + struct.pack(">I", 20) + b"\0" * 20))
+
+    with pytest.raises(GitIndexError):
+        list(read_index(index))
+
+
+def test_index_entries_requires_git_repo(tmp_path):
+    """Test that a directory without a git index raises GitIndexError."""
+    with pytest.raises(GitIndexError):
+        list(index_entries(tmp_path))
+
+
+def test_index_entries_derives_directories(tmp_path):
+    """Test that parent directories are yielded before their files."""
+    (tmp_path / ".git").mkdir()
+    entries = ENTRIES + [("build/out.o", 1, 0, 0, None)]
+    (tmp_path / ".git" / "index").write_bytes(_index(sorted(entries)))
+
+    scanned = list(index_entries(tmp_path))
+    rel = [
+        (os.path.relpath(e.path, tmp_path).replace(os.sep, "/"), e.is_dir)
+        for e in scanned
+    ]
+
+    # build/ is in SKIP_DIRS, as in the walk
+    assert rel == [
+        ("README.md", False),
+        ("src", True),
+        ("src/app", True),
+        ("src/app/main.py", False),
+        ("src/app/models.py", False),
+        ("src/lib.py", False),
+    ]
+    # Taken from the index, without touching the (nonexistent) files
+    assert scanned[0].size == 10 and scanned[0].mtime == 1000
+
+
+# ---------- Against a real git index ----------
+
+
+def _git(root, *args):
+    subprocess.run(
+        ["git", *args], cwd=root, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "pkg" / "mod.py").write_text("x" * 50)
+    (tmp_path / "src" / "main.py").write_text("print(1)")
+    (tmp_path / "README.md").write_text("# readme")
+    # Older than the index, so that no entry is racily clean
+    for name in ("src/pkg/mod.py", "src/main.py", "README.md"):
+        os.utime(tmp_path / name, (1_600_000_000, 1_600_000_000))
+    _git(tmp_path, "add", "-A")
+    return tmp_path
+
+
+@pytest.mark.parametrize("version", [2, 3, 4])
+def test_index_entries_match_lstat(git_repo, version):
+    """Test that cached stat data agrees with lstat for a real index."""
+    _git(git_repo, "update-index", "--index-version", str(version))
+
+    files = [e for e in index_entries(git_repo) if not e.is_dir]
+
+    assert [os.path.relpath(e.path, git_repo) for e in files] == [
+        "README.md", os.path.join("src", "main.py"), os.path.join("src", "pkg", "mod.py"),
+    ]
+    for entry in files:
+        st = os.lstat(entry.path)
+        assert (entry.size, entry.mtime) == (st.st_size, st.st_mtime)
+
+
+def test_index_entries_verify(git_repo):
+    """Test that verify picks up edits and deletions made after the index."""
+    os.remove(git_repo / "README.md")
+    with open(git_repo / "src" / "main.py", "a") as f:
+        f.write("print(2)")
+    # Put the edit clearly before the index, so only verify can notice it
+    index_mtime = os.stat(git_repo / ".git" / "index").st_mtime
+    os.utime(git_repo / "src" / "main.py", (index_mtime - 10, index_mtime - 10))
+
+    trusted = {os.path.basename(e.path): e.size for e in index_entries(git_repo)}
+    verified = {os.path.basename(e.path): e.size for e in index_entries(git_repo, verify=True)}
+
+    assert trusted["main.py"] == len("print(1)")
+    assert "README.md" in trusted
+    assert verified["main.py"] == len("print(1)print(2)")
+    assert "README.md" not in verified
+
+
+def test_index_entries_check_racy_entries(git_repo):
+    """Test that entries not older than the index are lstat'ed anyway."""
+    import time
+
+    # Cached with an mtime past the index's, so git cannot vouch for it
+    future = time.time() + 3600
+    os.utime(git_repo / "README.md", (future, future))
+    _git(git_repo, "add", "README.md")
+    (git_repo / "README.md").write_text("# rewritten readme")
+
+    sizes = {os.path.basename(e.path): e.size for e in index_entries(git_repo)}
+
+    assert sizes["README.md"] == len("# rewritten readme")
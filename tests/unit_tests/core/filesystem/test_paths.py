@@ -3,7 +3,7 @@
 from pathlib import Path
 import pytest
 
-from repolyze.core.filesystem.paths import depth
+from repolyze.core.filesystem.paths import depth, suffix
 
 
 def test_depth_same_directory():
@@ -40,3 +40,16 @@ def test_depth_raises_when_not_relative():
     target = Path("/different/path")
     with pytest.raises(ValueError):
         depth(base, target)
+
+
+def test_suffix():
+    """Test extracting the extension from a file name."""
+    assert suffix("file.py") == ".py"
+    assert suffix("archive.tar.gz") == ".gz"
+    assert suffix("Makefile") == ""
+
+
+def test_suffix_dotfiles():
+    """Test that leading dots do not start an extension."""
+    assert suffix(".bashrc") == ""
+    assert suffix(".config.json") == ".json"
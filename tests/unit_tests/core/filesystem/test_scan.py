@@ -1,7 +1,8 @@
 """Tests for repolyze.core.filesystem.scan module."""
 
+import pytest
 
-from repolyze.core.filesystem.scan import scan, _load_gitignore, _matches_gitignore
+from repolyze.core.filesystem.scan import scan, scan_entries
 
 
 def test_scan_empty_directory(tmp_path):
@@ -69,57 +70,191 @@ def test_scan_respects_gitignore(tmp_path):
     assert "temp" not in result_names
 
 
-def test_load_gitignore_not_exists(tmp_path):
-    """Test loading .gitignore when it doesn't exist."""
-    result = _load_gitignore(tmp_path)
-    assert result is None
+def test_scan_respects_gitignore_negation(tmp_path):
+    """Test that scan keeps files re-included with a ! pattern."""
+    (tmp_path / ".gitignore").write_text("*.log\n!keep.log\n")
+    (tmp_path / "drop.log").touch()
+    (tmp_path / "keep.log").touch()
 
+    result_names = [p.name for p in scan(tmp_path)]
 
-def test_load_gitignore_exists(tmp_path):
-    """Test loading .gitignore when it exists."""
-    gitignore = tmp_path / ".gitignore"
-    gitignore.write_text("*.log\n# comment\ntemp/\n\n")
-    
-    result = _load_gitignore(tmp_path)
-    assert result == ["*.log", "temp/"]
+    assert "keep.log" in result_names
+    assert "drop.log" not in result_names
 
 
-def test_load_gitignore_empty(tmp_path):
-    """Test loading empty .gitignore."""
-    gitignore = tmp_path / ".gitignore"
-    gitignore.write_text("# only comments\n\n")
-    
-    result = _load_gitignore(tmp_path)
-    assert result is None
+def test_scan_entries_records(tmp_path):
+    """Test that scan_entries yields typed records with stat data."""
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "file.txt").write_text("hello")
 
+    entries = {e.name: e for e in scan_entries(tmp_path)}
 
-def test_matches_gitignore_simple_pattern():
-    """Test gitignore pattern matching with simple patterns."""
-    patterns = ["*.log", "temp.txt"]
-    
-    assert _matches_gitignore("file.log", patterns, is_dir=False)
-    assert _matches_gitignore("temp.txt", patterns, is_dir=False)
-    assert not _matches_gitignore("file.txt", patterns, is_dir=False)
+    assert entries["dir"].is_dir
+    assert entries["dir"].size == 0
+    file_entry = entries["file.txt"]
+    assert not file_entry.is_dir
+    assert file_entry.path == str(tmp_path / "dir" / "file.txt")
+    assert file_entry.size == 5
+    st = (tmp_path / "dir" / "file.txt").stat()
+    assert file_entry.mtime == st.st_mtime
+    assert file_entry.inode == st.st_ino
 
 
-def test_matches_gitignore_directory_pattern():
-    """Test gitignore pattern matching with directory patterns."""
-    patterns = ["build/", "*.pyc"]
-    
-    assert _matches_gitignore("build", patterns, is_dir=True)
-    assert not _matches_gitignore("build", patterns, is_dir=False)
-    assert _matches_gitignore("file.pyc", patterns, is_dir=False)
+def test_scan_entries_top_down(tmp_path):
+    """Test that directories are yielded before their contents."""
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "file.txt").touch()
+    (tmp_path / "top.txt").touch()
 
+    order = [e.name for e in scan_entries(tmp_path)]
 
-def test_matches_gitignore_nested_path():
-    """Test gitignore pattern matching with nested paths."""
-    patterns = ["*.log", "temp/"]
-    
-    assert _matches_gitignore("dir/file.log", patterns, is_dir=False)
-    assert _matches_gitignore("temp", patterns, is_dir=True)
+    assert order.index("a") < order.index("b") < order.index("file.txt")
+
+
+def test_scan_entries_skips_symlinks(tmp_path):
+    """Test that symlinks are not yielded."""
+    (tmp_path / "real.txt").touch()
+    try:
+        (tmp_path / "link.txt").symlink_to(tmp_path / "real.txt")
+    except OSError as e:
+        pytest.skip(f"Cannot create symlinks: {e}")
+
+    names = [e.name for e in scan_entries(tmp_path)]
+
+    assert names == ["real.txt"]
+
+
+def test_scan_respects_nested_gitignore(tmp_path):
+    """Test that .gitignore files in subdirectories apply to their subtree."""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / ".gitignore").write_text("/out/\n*.gen\n")
+    (tmp_path / "pkg" / "out").mkdir()
+    (tmp_path / "pkg" / "out" / "data.txt").touch()
+    (tmp_path / "pkg" / "code.gen").touch()
+    (tmp_path / "pkg" / "code.py").touch()
+    (tmp_path / "out").mkdir()
+    (tmp_path / "code.gen").touch()
+
+    result = {p.relative_to(tmp_path).as_posix() for p in scan(tmp_path)}
+
+    assert "pkg/code.py" in result
+    assert "pkg/out" not in result
+    assert "pkg/code.gen" not in result
+    # Patterns of pkg/.gitignore do not leak outside pkg
+    assert "out" in result
+    assert "code.gen" in result
+
+
+def test_scan_nested_gitignore_overrides_parent(tmp_path):
+    """Test that a deeper .gitignore can re-include what a parent ignores."""
+    (tmp_path / ".gitignore").write_text("*.log\n")
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / ".gitignore").write_text("!keep.log\n")
+    (tmp_path / "logs" / "keep.log").touch()
+    (tmp_path / "logs" / "drop.log").touch()
+    (tmp_path / "keep.log").touch()
+
+    result = {p.relative_to(tmp_path).as_posix() for p in scan(tmp_path)}
+
+    assert "logs/keep.log" in result
+    assert "logs/drop.log" not in result
+    assert "keep.log" not in result
+
+
+def test_scan_respects_info_exclude(tmp_path):
+    """Test that scan honours .git/info/exclude."""
+    (tmp_path / ".git" / "info").mkdir(parents=True)
+    (tmp_path / ".git" / "info" / "exclude").write_text("local/\n")
+    (tmp_path / "local").mkdir()
+    (tmp_path / "local" / "file.txt").touch()
+    (tmp_path / "file.txt").touch()
+
+    result = [p.name for p in scan(tmp_path)]
+
+    assert result == ["file.txt"]
+
+
+def test_scan_prunes_ignored_directories(tmp_path, monkeypatch):
+    """Test that ignored directories are never listed."""
+    import os
+
+    (tmp_path / ".gitignore").write_text("generated/\n")
+    (tmp_path / "generated" / "deep").mkdir(parents=True)
+    (tmp_path / "generated" / "deep" / "file.txt").touch()
+
+    listed = []
+    original_scandir = os.scandir
+
+    def recording_scandir(path):
+        listed.append(os.fspath(path))
+        return original_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+    list(scan(tmp_path))
+
+    assert listed == [os.fspath(tmp_path)]
+
+
+def _make_wide_tree(root, width=4, depth=3):
+    (root / ".gitignore").write_text("*.log\n")
+    dirs = [root]
+    for level in range(depth):
+        next_dirs = []
+        for d in dirs:
+            for i in range(width):
+                sub = d / f"d{level}{i}"
+                sub.mkdir()
+                (sub / "file.txt").touch()
+                (sub / "skip.log").touch()
+                next_dirs.append(sub)
+        dirs = next_dirs
+
+
+def test_scan_entries_parallel_matches_serial(tmp_path):
+    """Test that a parallel scan yields exactly the serial order."""
+    _make_wide_tree(tmp_path)
+
+    serial = [e.path for e in scan_entries(tmp_path)]
+    parallel = [e.path for e in scan_entries(tmp_path, workers=4)]
+
+    assert parallel == serial
+    assert not any(p.endswith(".log") for p in parallel)
+
+
+def test_scan_entries_parallel_early_exit(tmp_path):
+    """Test that abandoning a parallel scan shuts the pool down."""
+    _make_wide_tree(tmp_path)
+
+    gen = scan_entries(tmp_path, workers=2)
+    first = next(gen)
+    gen.close()
+
+    assert first.is_dir
+
+
+def test_scan_dir_profiler(tmp_path):
+    """Test that scan_dir() times its phases and counts what it prunes."""
+    import os
+
+    from repolyze.core.filesystem.gitignore import root_rules
+    from repolyze.core.filesystem.scan import scan_dir
+    from repolyze.core.profile import Profiler
+
+    (tmp_path / ".gitignore").write_text("*.log\n")
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "src").mkdir()
+    (tmp_path / "a.py").write_text("x")
+    (tmp_path / "b.log").write_text("x")
+    profiler = Profiler()
 
+    dirs, files, _ = scan_dir(os.fspath(tmp_path), "", root_rules(tmp_path), profiler)
+    scan_dir(os.fspath(tmp_path / "missing"), "missing", root_rules(tmp_path), profiler)
 
-def test_matches_gitignore_no_patterns():
-    """Test gitignore pattern matching with no patterns."""
-    assert not _matches_gitignore("any/path", [], is_dir=False)
-    assert not _matches_gitignore("any/path", None, is_dir=False)
+    assert [d.name for d in dirs] == ["src"]
+    assert sorted(f.name for f in files) == [".gitignore", "a.py"]
+    stats = profiler.stats
+    assert stats.dirs_visited == 1
+    assert stats.pruned_skip_dirs == 1
+    assert stats.pruned_gitignore == 1
+    assert stats.stat_calls == 2
+    assert all(stats.phases[name].wall > 0 for name in ("walk", "filter", "stat"))
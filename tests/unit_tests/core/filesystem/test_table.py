@@ -0,0 +1,69 @@
+"""Tests for repolyze.core.filesystem.table module."""
+
+import pytest
+
+from repolyze.core.filesystem.table import FileTable
+
+
+@pytest.fixture
+def entry(tmp_path, scan_entry):
+    """Make the entry of a file under ``tmp_path``, creating it."""
+    def make(rel_path, **fields):
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        return scan_entry(path, **fields)
+
+    return make
+
+
+def test_table_round_trip(entry):
+    """Test that stored entries are given back unchanged."""
+    entries = [
+        entry("repo/a.py", size=2**40, mtime=-1.25),
+        entry("repo/src/a.py", inode=2**63, nlink=3),
+    ]
+    table = FileTable()
+
+    rows = [table.add(e) for e in entries]
+
+    assert [table.entry(row) for row in rows] == entries
+    assert len(table) == 2
+    assert list(table) == rows
+
+
+def test_table_interns_names(entry):
+    """Test that equal names in different directories share one string."""
+    table = FileTable()
+    a = table.add(entry("a/__init__.py"))
+    b = table.add(entry("b/__init__.py", name="".join(["__init__", ".py"])))
+
+    assert table.name[a] is table.name[b]
+
+
+def test_table_reuses_rows(entry):
+    """Test that rows and directories of removed entries are freed and reused."""
+    table = FileTable()
+    first = table.add(entry("old/a"))
+    table.remove(first)
+
+    assert len(table) == 0
+    assert list(table) == []
+
+    new = entry("new/b")
+    assert table.add(new) == first
+    assert table.entry(first) == new
+
+
+def test_table_matches(entry):
+    """Test that any changed field makes an entry differ from its row."""
+    table = FileTable()
+    a = entry("repo/a.py")
+    row = table.add(a)
+
+    assert table.matches(row, a)
+    assert not table.matches(row, a._replace(size=a.size + 1))
+    assert not table.matches(row, a._replace(mtime=a.mtime + 1))
+    assert not table.matches(row, a._replace(inode=a.inode + 1))
+    assert not table.matches(row, a._replace(nlink=a.nlink + 1))
+    assert not table.matches(row, a._replace(mtime_ns=a.mtime_ns + 1))
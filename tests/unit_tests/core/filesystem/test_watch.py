@@ -0,0 +1,100 @@
+"""Tests for repolyze.core.filesystem.watch module."""
+
+import os
+
+import pytest
+
+from repolyze.core.filesystem.watch import (
+    DirectoryWatcher, InotifyWatcher, PollingWatcher, open_watcher,
+)
+
+
+def _inotify():
+    try:
+        return InotifyWatcher()
+    except OSError:
+        pytest.skip("inotify is not available")
+
+
+def test_polling_watcher_reports_changed_directory(tmp_path):
+    """Test that a new entry is reported through its directory's mtime."""
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    watcher = PollingWatcher(interval=0.01)
+    watcher.add(str(tmp_path))
+    watcher.add(str(sub))
+
+    # Make sure the mtime moves even on coarse timestamps
+    (sub / "new.txt").write_text("x")
+    st = os.stat(sub)
+    os.utime(sub, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    assert watcher.poll(1) == {str(sub)}
+    assert watcher.poll(0.05) == set()
+
+
+def test_polling_watcher_stops_after_remove(tmp_path):
+    """Test that removed directories are no longer checked."""
+    watcher = PollingWatcher(interval=0.01)
+    watcher.add(str(tmp_path))
+    watcher.remove(str(tmp_path))
+
+    (tmp_path / "new.txt").write_text("x")
+
+    assert watcher.poll(0.05) == set()
+
+
+def test_inotify_watcher_reports_changes(tmp_path):
+    """Test that creating and modifying files reports their directory."""
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    with _inotify() as watcher:
+        watcher.add(str(tmp_path))
+        watcher.add(str(sub))
+
+        (sub / "file.txt").write_text("x")
+        assert watcher.poll(1) == {str(sub)}
+
+        with open(sub / "file.txt", "a") as f:
+            f.write("more")
+        assert watcher.poll(1) == {str(sub)}
+
+        assert watcher.poll(0.01) == set()
+
+
+def test_inotify_watcher_follows_moved_directory(tmp_path):
+    """Test that a directory moved and re-added keeps being watched."""
+    (tmp_path / "a").mkdir()
+    with _inotify() as watcher:
+        watcher.add(str(tmp_path))
+        watcher.add(str(tmp_path / "a"))
+
+        os.rename(tmp_path / "a", tmp_path / "b")
+        assert watcher.poll(1) == {str(tmp_path)}
+        watcher.add(str(tmp_path / "b"))
+        watcher.remove(str(tmp_path / "a"))
+
+        (tmp_path / "b" / "file.txt").write_text("x")
+        assert watcher.poll(1) == {str(tmp_path / "b")}
+
+
+def test_open_watcher_backends():
+    """Test backend selection."""
+    assert isinstance(open_watcher("poll"), PollingWatcher)
+    with open_watcher("auto") as watcher:
+        assert isinstance(watcher, (InotifyWatcher, PollingWatcher))
+    with pytest.raises(ValueError):
+        open_watcher("fsevents")
+
+
+def test_incomplete_watcher_cannot_be_created():
+    """Test that a backend missing a method fails when it is instantiated."""
+    class NoPoll(DirectoryWatcher):
+        def add(self, path):
+            pass
+
+        def remove(self, path):
+            pass
+
+    with pytest.raises(TypeError):
+        NoPoll()
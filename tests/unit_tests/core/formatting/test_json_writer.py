@@ -0,0 +1,92 @@
+"""Tests for repolyze.core.formatting.json_writer module."""
+
+import io
+import json
+import sys
+
+import pytest
+
+from repolyze.core.analyze import analyze
+from repolyze.core.formatting import json_writer
+from repolyze.core.formatting.json_writer import write_json
+from repolyze.models import TreeNode
+
+
+@pytest.fixture
+def stats(tmp_path):
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "pkg" / "a.py").write_text("x = 1\n")
+    (tmp_path / "src" / "b.py").write_text("y = 2\n")
+    (tmp_path / "empty").mkdir()
+    (tmp_path / "café.txt").write_text("menu")
+    return analyze(tmp_path, tree=True)
+
+
+def _write(stats, **kwargs):
+    out = io.StringIO()
+    write_json(stats, out, **kwargs)
+    return out.getvalue()
+
+
+def test_write_json_matches_dumps(stats):
+    """Test that the output is that of json.dumps() on to_dict()."""
+    assert _write(stats) == json.dumps(stats.to_dict(), indent=2)
+
+
+def test_write_json_compact(stats):
+    """Test that compact output has no whitespace between tokens."""
+    expected = json.dumps(stats.to_dict(), separators=(",", ":"))
+
+    assert _write(stats, compact=True) == expected
+
+
+def test_write_json_without_tree(stats):
+    """Test that stats without a tree have a null tree."""
+    stats.tree = None
+
+    assert json.loads(_write(stats))["tree"] is None
+
+
+def test_write_json_writes_in_chunks(stats, monkeypatch):
+    """Test that the document is written in several calls."""
+    monkeypatch.setattr(json_writer, "CHUNK_PARTS", 2)
+    out = io.StringIO()
+    writes = []
+    monkeypatch.setattr(out, "write", lambda s: writes.append(s))
+
+    write_json(stats, out)
+
+    assert len(writes) > 1
+    assert "".join(writes) == json.dumps(stats.to_dict(), indent=2)
+
+
+def test_write_json_deeper_than_recursion_limit(stats):
+    """Test that trees deeper than the recursion limit are written."""
+    depth = sys.getrecursionlimit() + 100
+    node = stats.tree = TreeNode(stats.path, 1, 1, [])
+    for _ in range(depth):
+        child = TreeNode("d", 1, 1, [])
+        node.add(child)
+        node = child
+
+    output = _write(stats, compact=True)
+
+    assert output.count('"file_count":1,"total_size":1,') == depth + 1
+    assert '"children":[]' + "}]" * depth + "}," in output
+
+
+def test_write_json_profile_last(tmp_path):
+    """Test that the profile comes last, with the time to write the rest."""
+    (tmp_path / "a.py").write_text("x = 1\n")
+    stats = analyze(tmp_path, profile=True)
+
+    data = json.loads(_write(stats))
+
+    assert list(data)[-1] == "profile"
+    assert data["profile"]["phases"]["serialize"]["wall"] > 0
+    # The time is kept in the stats too
+    assert data["profile"] == stats.to_dict()["profile"]
+    del data["profile"]
+    expected = stats.to_dict()
+    del expected["profile"]
+    assert data == json.loads(json.dumps(expected))
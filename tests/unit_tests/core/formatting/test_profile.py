@@ -0,0 +1,32 @@
+"""Tests for repolyze.core.formatting.profile module."""
+
+from repolyze.core.formatting.profile import render_profile
+from repolyze.models import PhaseTime, ProfileStats
+
+
+def test_render_profile():
+    """Test that phases, the rest of the total and the counters are shown."""
+    profile = ProfileStats(
+        {
+            "walk": PhaseTime(0.5, 0.25),
+            "filter": PhaseTime(0.25, 0.25),
+            "serialize": PhaseTime(0.125, 0.125),
+        },
+        total=PhaseTime(1.0, 0.75),
+        dirs_visited=12, pruned_skip_dirs=1, pruned_gitignore=3, stat_calls=40,
+    )
+
+    lines = render_profile(profile)
+
+    assert lines[0].split() == ["Phase", "Wall", "(ms)", "CPU", "(ms)"]
+    assert [line.split() for line in lines[1:6]] == [
+        ["walk", "500.0", "250.0"],
+        ["filter", "250.0", "250.0"],
+        ["other", "250.0", "250.0"],
+        ["total", "1000.0", "750.0"],
+        ["serialize", "125.0", "125.0"],
+    ]
+    assert lines[6] == ""
+    assert lines[7].startswith("Directories visited:")
+    assert lines[7].split()[-1] == "12"
+    assert [line.split()[-1] for line in lines[8:]] == ["1", "3", "40"]
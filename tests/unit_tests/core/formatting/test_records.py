@@ -0,0 +1,45 @@
+"""Tests for repolyze.core.formatting.records module."""
+
+import csv
+import io
+import json
+
+import pytest
+
+from repolyze.core.formatting.records import write_records
+from repolyze.core.records import FIELDS, FileRecord
+
+RECORDS = [
+    FileRecord("src/a.py", 10, 1700000000.25, ".py", 42, 3),
+    FileRecord('odd, "name"é', 0, 1.5, "", 7),
+]
+
+
+def test_write_ndjson():
+    """Test that each record becomes one JSON object per line."""
+    out = io.StringIO()
+    write_records(RECORDS, out, "ndjson")
+
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        dict(zip(FIELDS, record)) for record in RECORDS
+    ]
+
+
+def test_write_csv():
+    """Test that records follow a header row, with empty missing lines."""
+    out = io.StringIO(newline="")
+    write_records(RECORDS, out, "csv")
+
+    rows = list(csv.reader(io.StringIO(out.getvalue(), newline="")))
+    assert rows == [
+        list(FIELDS),
+        ["src/a.py", "10", "1700000000.25", ".py", "42", "3"],
+        ['odd, "name"é', "0", "1.5", "", "7", ""],
+    ]
+
+
+def test_write_records_unknown_format():
+    """Test that an unknown format is rejected."""
+    with pytest.raises(ValueError):
+        write_records(RECORDS, io.StringIO(), "xml")
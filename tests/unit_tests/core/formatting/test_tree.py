@@ -1,8 +1,9 @@
 """Tests for repolyze.core.formatting.tree module."""
 
+import sys
 from pathlib import Path
 
-from repolyze.core.formatting.tree import render_tree
+from repolyze.core.formatting.tree import iter_tree, render_tree
 from repolyze.models import TreeNode
 
 
@@ -82,3 +83,59 @@ def test_render_tree_connectors():
     assert "├─ first.txt" in result[1]
     # Last item should use └─
     assert "└─ second.txt" in result[2]
+
+
+def _chain(depth):
+    """A tree of ``depth`` directories nested in one another."""
+    root = node = TreeNode(Path("/root"), 1, 1, [])
+    for _ in range(depth):
+        child = TreeNode("d", 1, 1, [])
+        node.add(child)
+        node = child
+    node.add(TreeNode("f", 1, 1, is_dir=False))
+    return root
+
+
+def test_iter_tree_deeper_than_recursion_limit():
+    """Test that trees deeper than the recursion limit are rendered."""
+    depth = sys.getrecursionlimit() + 100
+    lines = iter_tree(_chain(depth))
+
+    assert next(lines) == "root/"
+    assert next(lines) == "└─ d/"
+    assert next(lines) == "   └─ d/"
+    assert sum(1 for _ in lines) == depth - 1
+
+
+def _sized_tree():
+    return TreeNode(Path("/root"), 0, 0, [
+        TreeNode(Path("/root/a"), 1, 10, [
+            TreeNode(Path("/root/a/x.txt"), 1, 10, is_dir=False),
+        ]),
+        TreeNode(Path("/root/b.txt"), 1, 300, is_dir=False),
+        TreeNode(Path("/root/c.txt"), 1, 5, is_dir=False),
+        TreeNode(Path("/root/d.txt"), 1, 200, is_dir=False),
+    ])
+
+
+def test_render_tree_max_depth():
+    """Test that directories below max_depth are summarised."""
+    assert render_tree(_sized_tree(), max_depth=1) == [
+        "root/",
+        "├─ a/",
+        "│  └─ … 1 more",
+        "├─ b.txt",
+        "├─ c.txt",
+        "└─ d.txt",
+    ]
+    assert render_tree(_sized_tree(), max_depth=0) == ["root/", "└─ … 4 more"]
+
+
+def test_render_tree_top():
+    """Test that only the largest entries are listed, in their order."""
+    assert render_tree(_sized_tree(), top=2) == [
+        "root/",
+        "├─ b.txt",
+        "├─ d.txt",
+        "└─ … 2 more",
+    ]
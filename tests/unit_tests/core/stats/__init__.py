@@ -0,0 +1 @@
+"""Tests for repolyze.core.stats module."""
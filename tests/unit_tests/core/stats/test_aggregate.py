@@ -0,0 +1,347 @@
+"""Tests for repolyze.core.stats.aggregate module."""
+
+from pathlib import Path
+
+from repolyze.core.filesystem.scan import ScanEntry
+from repolyze.core.stats.aggregate import (
+    DAY, DEEPEST_PATHS_COUNT, LARGE_FILE_SIZE, LARGE_FILES_COUNT,
+    SMALL_FILES_COUNT, PartialStats,
+)
+from repolyze.models import LineCounts
+
+ROOT = Path("/repo")
+NOW = 1_700_000_000.0
+
+
+def _file(name, size=10, age_days=0.0, inode=None, nlink=1):
+    return ScanEntry(
+        f"/repo/{name}", name.rsplit("/", 1)[-1], False, size,
+        NOW - age_days * DAY, inode or hash(name), 1, nlink,
+    )
+
+
+def _dir(name):
+    return ScanEntry(f"/repo/{name}", name.rsplit("/", 1)[-1], True, 0, 0.0, 0, 0)
+
+
+def _summary(stats):
+    return (
+        stats.structure(), stats.size(), stats.file_types(),
+        stats.language(), stats.time(), stats.hygiene(),
+    )
+
+
+def test_partial_counts_files():
+    """Test the counters of a single partial."""
+    stats = PartialStats(ROOT, NOW)
+    stats.add_file(_file("a.py", size=0, age_days=0.5))
+    stats.add_file(_file(".env", size=5, age_days=3))
+    stats.add_file(_file("old.tmp", size=7, age_days=100))
+
+    assert stats.total_files == 3
+    assert stats.total_size == 12
+    assert stats.count_by_ext == {".py": 1, "<no-ext>": 1, ".tmp": 1}
+    assert stats.empty_files == 1
+    assert stats.hidden_files == 1
+    assert stats.temp_files == 1
+    assert (stats.modified_24h, stats.modified_7d, stats.modified_30d) == (1, 2, 2)
+    assert stats.time().oldest_file.path == Path("/repo/old.tmp")
+    assert stats.time().newest_file.path == Path("/repo/a.py")
+
+
+def test_partial_tracks_deepest_dirs():
+    """Test that only the deepest directories are kept."""
+    stats = PartialStats(ROOT, NOW)
+    for name in ["a", "a/b", "c", "c/d"]:
+        stats.add_dir(_dir(name))
+
+    structure = stats.structure()
+
+    assert structure.total_dirs == 4
+    assert structure.max_depth == 2
+    assert [d.path for d in structure.deepest_paths] == [
+        Path("/repo/a/b"), Path("/repo/c/d")
+    ]
+
+
+def test_partial_keeps_smallest_files():
+    """Test that the five smallest files survive trimming."""
+    stats = PartialStats(ROOT, NOW)
+    for i in range(50, 0, -1):
+        stats.add_file(_file(f"f{i}.txt", size=i))
+
+    small = stats.size().small_files
+
+    assert [f.size for f in small] == [1, 2, 3, 4, 5]
+
+
+def test_partial_deduplicates_hard_links():
+    """Test that files with several links are counted once."""
+    stats = PartialStats(ROOT, NOW)
+    stats.add_file(_file("a.txt", inode=7, nlink=2))
+    stats.add_file(_file("b.txt", inode=7, nlink=2))
+
+    assert stats.total_files == 1
+
+
+def test_merge_matches_single_partial():
+    """Test that merging shards gives the same result as one partial."""
+    entries = [
+        _dir("src"), _file("src/a.py", 100, 1), _file("src/b.py", 0, 10),
+        _dir("src/deep"), _file("src/deep/c.js", 6 * 1024 * 1024, 40),
+        _dir("docs"), _file("docs/readme.md", 30, 2), _file("docs/x.bak", 3, 0),
+    ]
+
+    whole = PartialStats(ROOT, NOW)
+    for entry in entries:
+        (whole.add_dir if entry.is_dir else whole.add_file)(entry)
+
+    first, second = PartialStats(ROOT, NOW), PartialStats(ROOT, NOW)
+    for i, entry in enumerate(entries):
+        shard = first if i < 5 else second
+        (shard.add_dir if entry.is_dir else shard.add_file)(entry)
+    first.merge(second)
+
+    assert _summary(first) == _summary(whole)
+
+
+def test_remove_file_reverses_add_file():
+    """Test that removing entries gives the same result as never adding them."""
+    entries = [
+        _dir("src"), _file("src/a.py", 100, 1), _file("src/b.py", 0, 10),
+        _dir("src/deep"), _file("src/deep/c.js", 6 * 1024 * 1024, 40),
+        _file("docs.bak", 3, 0),
+    ]
+    removed = [entries[2], entries[3], entries[4]]
+
+    stats = PartialStats(ROOT, NOW)
+    for entry in entries:
+        (stats.add_dir if entry.is_dir else stats.add_file)(entry)
+    for entry in removed:
+        (stats.remove_dir if entry.is_dir else stats.remove_file)(entry)
+
+    # b.py was the smallest and c.js the oldest file, src/deep the deepest dir
+    assert stats.stale
+    kept = [e for e in entries if e not in removed]
+    stats.reselect([e for e in kept if not e.is_dir], [e for e in kept if e.is_dir])
+
+    expected = PartialStats(ROOT, NOW)
+    for entry in kept:
+        (expected.add_dir if entry.is_dir else expected.add_file)(entry)
+
+    assert not stats.stale
+    assert _summary(stats) == _summary(expected)
+    assert stats.count_by_ext == {".py": 1, ".bak": 1}
+
+
+def test_remove_file_outside_selections_is_not_stale():
+    """Test that removing an unselected file needs no reselection."""
+    # Sketched sizes cannot be taken back, exact ones can
+    stats = PartialStats(ROOT, NOW, exact_quantiles=True)
+    for i in range(SMALL_FILES_COUNT + 1):
+        stats.add_file(_file(f"f{i}.txt", size=i, age_days=i))
+    stats.add_file(_file("big.txt", size=100, age_days=2.5))
+
+    stats.remove_file(_file("big.txt", size=100, age_days=2.5))
+
+    assert not stats.stale
+    assert stats.total_files == SMALL_FILES_COUNT + 1
+
+
+def test_median_age_matches_statistics_median():
+    """Test the histogram median against statistics.median."""
+    from statistics import median
+
+    for ages in ([3], [1, 2], [0, 0, 5, 9], [4, 1, 1, 7, 30], [2] * 6 + [8] * 5):
+        stats = PartialStats(ROOT, NOW)
+        for i, age in enumerate(ages):
+            stats.add_file(_file(f"f{i}", age_days=age + 0.5))
+
+        assert stats.time().median_file_age_days == median(ages)
+
+    assert PartialStats(ROOT, NOW).time().median_file_age_days is None
+
+
+def test_future_files_count_as_new():
+    """Test that files dated after ``now`` get an age of zero."""
+    stats = PartialStats(ROOT, NOW)
+    stats.add_file(_file("future.py", age_days=-3))
+
+    assert stats.time().median_file_age_days == 0
+    assert stats.modified_24h == 1
+
+
+def test_selections_stay_bounded():
+    """Test that selections keep a bounded number of items however many files."""
+    stats = PartialStats(ROOT, NOW)
+    n = 20 * LARGE_FILES_COUNT
+    for i in range(n):
+        stats.add_file(_file(f"big{i:05d}.bin", size=LARGE_FILE_SIZE + 1 + i))
+        stats.add_dir(_dir(f"d{i:05d}"))
+
+        assert len(stats.large_files) < 4 * LARGE_FILES_COUNT
+        assert len(stats.small_files) < 4 * SMALL_FILES_COUNT
+        assert len(stats.deepest) < 4 * DEEPEST_PATHS_COUNT
+
+    size = stats.size()
+    assert size.large_file_count == n
+    # The largest ones, listed by path
+    assert [f.size for f in size.large_files] == list(
+        range(LARGE_FILE_SIZE + 1 + n - LARGE_FILES_COUNT, LARGE_FILE_SIZE + 1 + n)
+    )
+    assert len(stats.structure().deepest_paths) == DEEPEST_PATHS_COUNT
+    assert stats.structure().deepest_paths[0].path == Path("/repo/d00000")
+
+
+def test_merge_keeps_largest_files():
+    """Test that merging bounded selections keeps the overall largest files."""
+    first, second = PartialStats(ROOT, NOW), PartialStats(ROOT, NOW)
+    for i in range(2 * LARGE_FILES_COUNT):
+        shard = first if i % 2 else second
+        shard.add_file(_file(f"big{i:05d}.bin", size=LARGE_FILE_SIZE + 1 + i))
+    first.merge(second)
+
+    size = first.size()
+    assert size.large_file_count == 2 * LARGE_FILES_COUNT
+    assert min(f.size for f in size.large_files) == LARGE_FILE_SIZE + 1 + LARGE_FILES_COUNT
+
+
+def test_size_and_age_percentiles():
+    """Test percentiles in exact and sketch mode on a small input."""
+    sizes = list(range(1, 101))
+    for exact in (True, False):
+        stats = PartialStats(ROOT, NOW, exact_quantiles=exact)
+        for size in sizes:
+            stats.add_file(_file(f"f{size}", size=size, age_days=size // 10 + 0.5))
+
+        size = stats.size()
+        # Below the sketch capacity both modes are exact (nearest rank)
+        assert (size.file_size_p50, size.file_size_p90, size.file_size_p99) == (50, 90, 99)
+        time = stats.time()
+        assert (time.file_age_days_p50, time.file_age_days_p90, time.file_age_days_p99) == (5, 9, 9)
+
+
+def test_sketched_sizes_rebuilt_after_removal():
+    """Test that removing a file from sketched sizes forces a reselect."""
+    stats = PartialStats(ROOT, NOW)
+    files = [_file(f"f{i}", size=i) for i in range(1, 11)]
+    for entry in files:
+        stats.add_file(entry)
+
+    stats.remove_file(files[-1])
+    assert stats.stale
+    stats.reselect(files[:-1], [])
+
+    assert stats.size().file_size_p99 == 9
+
+
+def test_merge_percentiles():
+    """Test that merged sketches answer for the union of their inputs."""
+    first, second = PartialStats(ROOT, NOW), PartialStats(ROOT, NOW)
+    for i in range(1, 5001):
+        (first if i % 2 else second).add_file(_file(f"f{i}", size=i))
+    first.merge(second)
+
+    p50 = first.size().file_size_p50
+    # Sketches of 2500 values each have compacted; the rank error is small
+    assert abs(p50 - 2500) < 0.02 * 5000
+
+
+def test_partial_lines():
+    """Test that line counts are only reported when counted, and merge."""
+    assert PartialStats(ROOT, NOW).language().total_lines_of_code is None
+    assert PartialStats(ROOT, NOW).file_types().lines_by_extension is None
+
+    first = PartialStats(ROOT, NOW, lines=True)
+    second = PartialStats(ROOT, NOW, lines=True)
+    first.add_lines(".py", 10)
+    second.add_lines(".py", 5)
+    second.add_lines(".go", 2)
+    first.merge(second)
+
+    assert first.file_types().lines_by_extension == {".py": 15, ".go": 2}
+    assert first.language().total_lines_of_code == 17
+
+
+def test_partial_add_file_reports_links_seen():
+    """Test that add_file() returns False for a second link to a file."""
+    stats = PartialStats(ROOT, NOW)
+
+    assert stats.add_file(_file("a.txt", inode=7, nlink=2)) is True
+    assert stats.add_file(_file("b.txt", inode=7, nlink=2)) is False
+
+
+def test_partial_sloc():
+    """Test that per-language line counts are reported sorted, and merge."""
+    assert PartialStats(ROOT, NOW, lines=True).language().lines_by_language is None
+
+    first = PartialStats(ROOT, NOW, lines=True, sloc=True)
+    second = PartialStats(ROOT, NOW, lines=True, sloc=True)
+    first.add_sloc("Python", 10, 2, 1)
+    second.add_sloc("Python", 1, 1, 1)
+    second.add_sloc("Go", 5, 0, 0)
+    first.merge(second)
+
+    by_language = first.language().lines_by_language
+    assert list(by_language) == ["Go", "Python"]
+    assert by_language["Python"] == LineCounts(code=11, comment=3, blank=2)
+
+
+def test_partial_detected_languages():
+    """Test that detected languages decide the primary language, and merge."""
+    assert PartialStats(ROOT, NOW).language().files_by_language is None
+
+    first = PartialStats(ROOT, NOW, detect=True)
+    second = PartialStats(ROOT, NOW, detect=True)
+    first.add_language("Shell")
+    first.add_language(None)
+    second.add_language("Python")
+    second.add_language("Python", sniffed=False)
+    second.add_language(None, binary=True)
+    second.add_unreadable()
+    first.merge(second)
+
+    language = first.language()
+    assert language.primary_language == "Python"
+    assert language.files_by_language == {"Python": 2, "Shell": 1}
+    assert language.binary_files == 1
+    assert language.unsniffed_files == 1
+    assert language.unreadable_files == 1
+
+
+def test_partial_primary_language_skips_no_extension():
+    """Test that without detection, "<no-ext>" is never the primary language."""
+    stats = PartialStats(ROOT, NOW)
+    for name in ("Makefile", "LICENSE", "setup.py"):
+        stats.add_file(_file(name))
+
+    assert stats.language().primary_language == ".py"
+
+
+def test_partial_empty_dirs():
+    """Test that directories nothing was found in are counted as empty."""
+    stats = PartialStats(ROOT, NOW)
+    stats.add_dir(_dir("a"))
+    stats.add_dir(_dir("b"))
+    stats.add_dir(_dir("a/c"))
+    stats.add_file(_file("b/f.txt"))
+
+    # a holds c, which holds nothing
+    assert stats.hygiene().empty_dirs == 1
+
+
+def test_partial_empty_dirs_merge_shard_tops():
+    """Test that the top of a shard is empty only if the shard found nothing."""
+    stats = PartialStats(ROOT, NOW)
+    stats.add_dir(_dir("full"))
+    stats.add_dir(_dir("empty"))
+    full = PartialStats(ROOT, NOW)
+    full.add_shard_top(_dir("full").path)
+    full.add_file(_file("full/f.txt"))
+    empty = PartialStats(ROOT, NOW)
+    empty.add_shard_top(_dir("empty").path)
+
+    stats.merge(full)
+    stats.merge(empty)
+
+    assert stats.hygiene().empty_dirs == 1
@@ -0,0 +1,83 @@
+"""Tests for repolyze.core.stats.sketch module."""
+
+import bisect
+import random
+
+import pytest
+
+from repolyze.core.stats.sketch import KLLSketch, histogram_quantile
+
+
+def _rank_error(sorted_values, value, q):
+    lo = bisect.bisect_left(sorted_values, value) / len(sorted_values)
+    hi = bisect.bisect_right(sorted_values, value) / len(sorted_values)
+    return 0.0 if lo <= q <= hi else min(abs(lo - q), abs(hi - q))
+
+
+def test_empty_sketch():
+    """Test that an empty sketch has no quantiles."""
+    assert KLLSketch().quantile(0.5) is None
+    assert histogram_quantile({}, 0.5) is None
+
+
+def test_small_input_is_exact():
+    """Test that the sketch is exact until it first compacts."""
+    sketch = KLLSketch()
+    for value in range(100, 0, -1):
+        sketch.add(value)
+
+    assert [sketch.quantile(q) for q in (0, 0.01, 0.5, 0.9, 1)] == [1, 1, 50, 90, 100]
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_rank_error_and_memory_bound(seed):
+    """Test the rank error bound and constant memory on a large stream."""
+    rng = random.Random(seed)
+    values = [int(rng.lognormvariate(8, 2)) for _ in range(100_000)]
+    sketch = KLLSketch()
+    for value in values:
+        sketch.add(value)
+
+    assert len(sketch) == len(values)
+    assert sum(len(level) for level in sketch._levels) <= 3 * sketch.k + 100
+    values.sort()
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        assert _rank_error(values, sketch.quantile(q), q) < 0.0165
+
+
+def test_merge_matches_union():
+    """Test that merged sketches stay within the bound for the union."""
+    rng = random.Random(3)
+    values = [rng.random() for _ in range(50_000)]
+    parts = [KLLSketch() for _ in range(7)]
+    for i, value in enumerate(values):
+        parts[i % 7].add(value)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+
+    assert len(merged) == len(values)
+    values.sort()
+    for q in (0.1, 0.5, 0.99):
+        assert _rank_error(values, merged.quantile(q), q) < 0.0165
+
+
+def test_deterministic():
+    """Test that the same input gives the same answers."""
+    def build():
+        sketch = KLLSketch()
+        for value in range(10_000):
+            sketch.add(value * 7919 % 10_007)
+        return sketch
+
+    assert build().quantile(0.37) == build().quantile(0.37)
+
+
+def test_histogram_quantile():
+    """Test nearest-rank quantiles over a histogram."""
+    histogram = {1: 5, 2: 3, 10: 2}
+
+    assert histogram_quantile(histogram, 0.5) == 1
+    assert histogram_quantile(histogram, 0.6) == 2
+    assert histogram_quantile(histogram, 0.81) == 10
+    assert histogram_quantile(histogram, 1.0) == 10
@@ -1,5 +1,7 @@
 """Tests for repolyze.core.analyze module."""
 
+import pytest
+
 from repolyze.core.analyze import analyze
 
 
@@ -190,3 +192,586 @@ def test_analyze_tree_structure(tmp_path):
     
     assert stats.tree is not None
     assert stats.tree.path == tmp_path
+
+
+def test_analyze_tree_matches_build_tree(tmp_path):
+    """Test that the tree built during analysis matches build_tree."""
+    from repolyze.core.tree.build import build_tree
+
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.py").write_text("print('hi')")
+    (tmp_path / "README.md").write_text("# readme")
+
+    stats = analyze(tmp_path)
+
+    assert stats.tree == build_tree(tmp_path.resolve())
+
+
+def test_analyze_single_walk(tmp_path, monkeypatch):
+    """Test that analyze lists each directory and stats each file once."""
+    import os
+    from collections import Counter
+
+    from repolyze.core.filesystem import scan as scan_module
+
+    for d in range(3):
+        (tmp_path / f"dir{d}").mkdir()
+        for f in range(5):
+            (tmp_path / f"dir{d}" / f"file{f}.txt").write_text("x")
+
+    listed = Counter()
+    stated = Counter()
+
+    class CountingEntry:
+        def __init__(self, entry):
+            self._entry = entry
+
+        def stat(self, *args, **kwargs):
+            stated[self._entry.path] += 1
+            return self._entry.stat(*args, **kwargs)
+
+        def __getattr__(self, name):
+            return getattr(self._entry, name)
+
+    class CountingOs:
+        """The os module, as seen by the scan, with counted listings."""
+
+        def __getattr__(self, name):
+            return getattr(os, name)
+
+        def scandir(self, path):
+            listed[os.fspath(path)] += 1
+            it = os.scandir(path)
+
+            class Listing:
+                def __enter__(self):
+                    return (CountingEntry(e) for e in it)
+
+                def __exit__(self, *exc):
+                    it.close()
+
+            return Listing()
+
+    monkeypatch.setattr(scan_module, "os", CountingOs())
+    stats = analyze(tmp_path)
+
+    assert stats.structure.total_files == 15
+    dirs = [tmp_path] + [tmp_path / f"dir{d}" for d in range(3)]
+    assert listed == Counter({os.fspath(d): 1 for d in dirs})
+    assert len(stated) == 15
+    assert set(stated.values()) == {1}
+
+
+def test_analyze_parallel_matches_serial(tmp_path):
+    """Test that analyzing with several workers gives the same results."""
+    for d in range(5):
+        sub = tmp_path / f"dir{d}" / "nested"
+        sub.mkdir(parents=True)
+        (sub / f"file{d}.py").write_text("x" * d)
+        (tmp_path / f"dir{d}" / "notes.txt").write_text("notes")
+
+    serial = analyze(tmp_path).to_dict()
+    parallel = analyze(tmp_path, workers=4).to_dict()
+
+    serial.pop("created_at")
+    parallel.pop("created_at")
+    assert parallel == serial
+
+
+def _make_sharded_repo(root):
+    (root / ".gitignore").write_text("*.log\n")
+    (root / "top.py").write_text("print(1)")
+    for d in range(4):
+        sub = root / f"pkg{d}" / "inner"
+        sub.mkdir(parents=True)
+        (sub / f"mod{d}.py").write_text("x" * (d + 1))
+        (sub / "skip.log").write_text("log")
+        (root / f"pkg{d}" / "README.md").write_text("readme")
+
+
+def test_analyze_processes_match_serial(tmp_path):
+    """Test that sharded analysis across processes gives the same results."""
+    _make_sharded_repo(tmp_path)
+
+    serial = analyze(tmp_path).to_dict()
+    sharded = analyze(tmp_path, processes=2).to_dict()
+
+    serial.pop("created_at")
+    sharded.pop("created_at")
+    assert sharded == serial
+
+
+def test_analyze_processes_deeper_than_recursion_limit(tmp_path):
+    """Test that shards send back trees deeper than the recursion limit."""
+    import os
+    import sys
+
+    path = str(tmp_path / "top")
+    os.mkdir(path)
+    for _ in range(sys.getrecursionlimit() + 100):
+        path = os.path.join(path, "d")
+        os.mkdir(path)
+    with open(os.path.join(path, "f"), "w") as f:
+        f.write("x")
+
+    try:
+        stats = analyze(tmp_path, processes=2)
+
+        assert stats.tree == analyze(tmp_path).tree
+        assert stats.structure.total_files == 1
+    finally:
+        # pytest removes tmp_path with shutil.rmtree(), which recurses
+        os.unlink(os.path.join(path, "f"))
+        while path != str(tmp_path):
+            os.rmdir(path)
+            path = os.path.dirname(path)
+
+
+def test_analyze_processes_deduplicate_hard_links_across_shards(tmp_path):
+    """Test that a file hard-linked into two shards is counted once."""
+    import os
+
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "data.bin").write_text("payload")
+    try:
+        os.link(tmp_path / "a" / "data.bin", tmp_path / "b" / "data.bin")
+    except OSError as e:
+        pytest.skip(f"Cannot create hard links: {e}")
+
+    stats = analyze(tmp_path, processes=2)
+
+    assert stats.structure.total_files == 1
+    assert stats.size.total_size == len("payload")
+
+
+def test_analyze_with_cache_dir(tmp_path):
+    """Test that cached runs give the same results as uncached ones."""
+    import os
+    import time
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _make_sharded_repo(repo)
+    t = time.time() - 100
+    for dirpath, _, _ in os.walk(repo):
+        os.utime(dirpath, (t, t))
+
+    expected = analyze(repo).to_dict()
+    first = analyze(repo, cache_dir=tmp_path / "cache").to_dict()
+    second = analyze(repo, cache_dir=tmp_path / "cache").to_dict()
+    sharded = analyze(repo, processes=2, cache_dir=tmp_path / "cache").to_dict()
+
+    for result in (expected, first, second, sharded):
+        result.pop("created_at")
+    assert first == expected
+    assert second == expected
+    assert sharded == expected
+    assert list((tmp_path / "cache").iterdir())
+
+
+def test_analyze_git_index_matches_walk(tmp_path):
+    """Test that reading the git index gives the same results as walking."""
+    import shutil
+    import subprocess
+
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    _make_sharded_repo(tmp_path)
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "add", "-A"], cwd=tmp_path, check=True)
+
+    walked = analyze(tmp_path)
+    indexed = analyze(tmp_path, source="git-index")
+
+    assert indexed.structure == walked.structure
+    assert indexed.size == walked.size
+    assert indexed.file_types == walked.file_types
+    assert indexed.tree == walked.tree
+
+
+def test_analyze_git_index_hard_links(tmp_path):
+    """Test that hard links count once per path unless the index is verified."""
+    import os
+    import shutil
+    import subprocess
+
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    (tmp_path / "a.txt").write_text("x" * 10)
+    try:
+        os.link(tmp_path / "a.txt", tmp_path / "b.txt")
+    except OSError:
+        pytest.skip("no hard links on this filesystem")
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "add", "-A"], cwd=tmp_path, check=True)
+    # Older than the index, so that the entries are not racily clean
+    old = os.stat(tmp_path / ".git" / "index").st_mtime - 10
+    os.utime(tmp_path / "a.txt", (old, old))
+    subprocess.run(["git", "update-index", "--refresh", "-q"], cwd=tmp_path, check=True)
+
+    walked = analyze(tmp_path)
+    indexed = analyze(tmp_path, source="git-index")
+    verified = analyze(tmp_path, source="git-index", verify_index=True)
+
+    assert walked.structure.total_files == 1
+    assert indexed.structure.total_files == 2
+    assert verified.structure.total_files == 1
+
+
+def test_analyze_rejects_unknown_source(tmp_path):
+    """Test that an unknown source raises ValueError."""
+    with pytest.raises(ValueError):
+        analyze(tmp_path, source="svn")
+
+
+def test_analyze_git_index_requires_repo(tmp_path):
+    """Test that --source=git-index outside a git work tree raises."""
+    from repolyze.core.filesystem.gitindex import GitIndexError
+
+    with pytest.raises(GitIndexError):
+        analyze(tmp_path, source="git-index")
+
+
+def _make_wide_repo(root, dirs_per_top):
+    for t in range(8):
+        for d in range(dirs_per_top):
+            sub = root / f"top{t}" / f"sub{d}"
+            sub.mkdir(parents=True)
+            for f in range(12):
+                (sub / f"file{f}.txt").write_text("x" * (f % 7))
+    (root / "top0" / "sub0" / "deepest").mkdir()
+
+
+def test_analyze_memory_does_not_grow_with_file_count(tmp_path):
+    """Test that without the tree, peak memory is independent of file count."""
+    import tracemalloc
+
+    peaks = []
+    for dirs_per_top in (4, 32):
+        root = tmp_path / str(dirs_per_top)
+        _make_wide_repo(root, dirs_per_top)
+        # Warm up caches (compiled patterns, imports) outside the measurement
+        analyze(root, tree=False)
+
+        tracemalloc.start()
+        try:
+            stats = analyze(root, tree=False)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        assert stats.tree is None
+
+    assert stats.structure.total_files == 8 * 32 * 12
+    # 2688 more files, but only longer directory listings to hold: well
+    # under the ~1 MB that keeping a tree or a record per file would need
+    assert peaks[1] - peaks[0] < 64 * 1024
+
+
+def test_analyze_percentiles(tmp_path):
+    """Test that sketched and exact percentiles agree on a small repository."""
+    for i in range(1, 21):
+        (tmp_path / f"file{i}.txt").write_text("x" * i)
+
+    sketched = analyze(tmp_path).size
+    exact = analyze(tmp_path, exact_quantiles=True).size
+
+    assert (exact.file_size_p50, exact.file_size_p90, exact.file_size_p99) == (10, 18, 20)
+    assert sketched == exact
+
+
+def test_analyze_lines(tmp_path):
+    """Test line counting of code files, serial and with processes."""
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("import os\n\nprint(os.sep)\n")
+    (tmp_path / "src" / "b.go").write_text("package b")
+    (tmp_path / "main.py").write_text("x = 1\n")
+    (tmp_path / "README.md").write_text("one\ntwo\n")
+    (tmp_path / "blob.c").write_bytes(b"\0\0\n")
+
+    assert analyze(tmp_path).language.total_lines_of_code is None
+
+    for processes in (1, 2):
+        stats = analyze(tmp_path, processes=processes, lines=True)
+
+        assert stats.file_types.lines_by_extension == {".py": 4, ".go": 1}
+        assert stats.language.total_lines_of_code == 5
+        lines = {f.path.name: f.lines for f in stats.size.small_files}
+        assert lines["main.py"] == 1
+        assert lines["README.md"] is None
+
+
+def test_analyze_lines_git_index_pool(tmp_path):
+    """Test that the git index source counts lines on a process pool."""
+    import shutil
+    import subprocess
+
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    for i in range(300):
+        (tmp_path / f"m{i}.py").write_text("a\nb\n")
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "add", "-A"], cwd=tmp_path, check=True)
+
+    stats = analyze(tmp_path, source="git-index", processes=2, lines=True)
+
+    assert stats.language.total_lines_of_code == 600
+
+
+def test_analyze_sloc(tmp_path):
+    """Test that sloc classifies lines per language and implies lines."""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text('"""Doc."""\n\nx = 1  # c\n')
+    (tmp_path / "b.c").write_text("/* c */\nint b;\n")
+
+    for processes in (1, 2):
+        language = analyze(tmp_path, processes=processes, sloc=True).language
+
+        counts = {
+            name: (c.code, c.comment, c.blank)
+            for name, c in language.lines_by_language.items()
+        }
+        assert language.total_lines_of_code == 5
+        assert counts == {"C": (1, 1, 0), "Python": (1, 1, 1)}
+
+
+def test_analyze_detect(tmp_path):
+    """Test that languages come from file contents, in one or more processes."""
+    (tmp_path / "bin").mkdir()
+    (tmp_path / "bin" / "tool").write_text("#!/usr/bin/env python3\nprint(1)\n")
+    (tmp_path / "bin" / "run").write_text("#!/bin/sh\necho\n")
+    (tmp_path / "setup").write_text("#!/usr/bin/python3\n")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    (tmp_path / "README").write_text("no language\n")
+
+    for processes in (1, 2):
+        language = analyze(tmp_path, processes=processes, detect=True).language
+
+        assert language.primary_language == "Python"
+        assert language.files_by_language == {"Python": 2, "Shell": 1}
+        assert language.binary_files == 1
+        assert language.unsniffed_files == 0
+
+
+def test_analyze_detect_budget(tmp_path):
+    """Test that files past the budget are detected by extension only."""
+    for i in range(4):
+        (tmp_path / f"s{i}.py").write_text("#!/bin/sh\n")
+
+    language = analyze(tmp_path, detect=True, detect_budget=20).language
+
+    assert language.unsniffed_files == 2
+    assert language.files_by_language == {"Python": 2, "Shell": 2}
+
+
+def test_analyze_detect_unreadable(tmp_path, monkeypatch):
+    """Test that files that cannot be read are counted apart, without a language."""
+    import os
+
+    from repolyze.core.content import sniff as sniff_module
+
+    for name in ("a.sh", "b.sh"):
+        (tmp_path / name).write_text("#!/bin/sh\n")
+    original_open = os.open
+
+    def failing_open(path, *args, **kwargs):
+        if os.fspath(path).endswith("a.sh"):
+            raise FileNotFoundError(path)
+        return original_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(sniff_module.os, "open", failing_open)
+    language = analyze(tmp_path, detect=True).language
+
+    assert language.unreadable_files == 1
+    assert language.unsniffed_files == 0
+    assert language.files_by_language == {"Shell": 1}
+
+
+def test_analyze_detect_memo(tmp_path):
+    """Test that detection results are kept in the cache directory."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "tool").write_text("#!/bin/bash\n")
+    cache_dir = tmp_path / "cache"
+
+    analyze(repo, cache_dir=cache_dir, detect=True)
+    # Nothing is left to read, so a budget of zero is enough
+    language = analyze(repo, cache_dir=cache_dir, detect=True, detect_budget=0).language
+
+    assert language.files_by_language == {"Shell": 1}
+    assert language.unsniffed_files == 0
+
+
+def test_analyze_detect_memo_renamed(tmp_path):
+    """Test that a renamed file is detected by its new extension."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("x = 1\n")
+    cache_dir = tmp_path / "cache"
+
+    analyze(repo, cache_dir=cache_dir, detect=True)
+    (repo / "a.py").rename(repo / "a.rb")
+    language = analyze(repo, cache_dir=cache_dir, detect=True, detect_budget=0).language
+
+    assert language.files_by_language == {"Ruby": 1}
+    assert language.unsniffed_files == 0
+
+
+def test_analyze_primary_language_ignores_no_extension(tmp_path):
+    """Test that files without an extension are not a primary language."""
+    for name in ("Makefile", "LICENSE", "AUTHORS"):
+        (tmp_path / name).write_text("x\n")
+    (tmp_path / "main.go").write_text("package main\n")
+
+    assert analyze(tmp_path).language.primary_language == ".go"
+
+
+def test_analyze_duplicates(tmp_path):
+    """Test that copies are found across shards, and hard links are not copies."""
+    import os
+
+    (tmp_path / "vendor" / "lib").mkdir(parents=True)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "lib.js").write_text("module.exports = 1;\n")
+    (tmp_path / "vendor" / "lib" / "lib.js").write_text("module.exports = 1;\n")
+    (tmp_path / "other.js").write_text("module.exports = 2;\n")
+    (tmp_path / "blob").write_bytes(b"x" * 1000)
+    try:
+        os.link(tmp_path / "blob", tmp_path / "src" / "blob-link")
+    except OSError as e:
+        pytest.skip(f"Cannot create hard links: {e}")
+
+    for processes in (1, 2):
+        hygiene = analyze(tmp_path, processes=processes, duplicates=True).hygiene
+
+        assert hygiene.duplicate_group_count == 1
+        assert hygiene.wasted_bytes == 20
+        [group] = hygiene.duplicate_groups
+        assert group.paths == [
+            tmp_path / "src" / "lib.js", tmp_path / "vendor" / "lib" / "lib.js"
+        ]
+
+
+def test_analyze_without_duplicates(tmp_path):
+    """Test that duplicates are only searched for on request."""
+    (tmp_path / "a").write_text("same")
+    (tmp_path / "b").write_text("same")
+
+    assert analyze(tmp_path).hygiene.duplicate_groups is None
+
+
+def test_analyze_empty_dirs_and_rollups(tmp_path):
+    """Test that empty directories are counted and directory totals rolled up."""
+    (tmp_path / "empty").mkdir()
+    (tmp_path / "src" / "none").mkdir(parents=True)
+    (tmp_path / "src" / "lib").mkdir()
+    (tmp_path / "src" / "lib" / "a.py").write_text("12345")
+    (tmp_path / "top.txt").write_text("1")
+
+    for processes in (1, 2):
+        for tree in (True, False):
+            stats = analyze(tmp_path, processes=processes, tree=tree)
+            assert stats.hygiene.empty_dirs == 2
+
+    node = analyze(tmp_path, processes=2).tree
+    assert (node.file_count, node.total_size) == (2, 6)
+    [src] = node.heaviest_subtrees(1)
+    assert src.path == tmp_path.resolve() / "src"
+    assert (src.file_count, src.total_size) == (1, 5)
+
+
+def _make_profiled_repo(root):
+    (root / ".gitignore").write_text("*.log\nout/\n")
+    (root / "node_modules").mkdir()
+    (root / "node_modules" / "dep.js").write_text("x")
+    (root / "out").mkdir()
+    (root / "out" / "a.o").write_text("x")
+    for d in ("src", "docs"):
+        (root / d).mkdir()
+        for i in range(3):
+            (root / d / f"f{i}.py").write_text("x = 1\n")
+        (root / d / "debug.log").write_text("x")
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_analyze_profile(tmp_path, processes, workers):
+    """Test that profile=True times the phases and counts the walk."""
+    from repolyze.core.profile import PHASES
+
+    _make_profiled_repo(tmp_path)
+
+    stats = analyze(tmp_path, workers=workers, processes=processes, profile=True)
+    plain = analyze(tmp_path, workers=workers, processes=processes)
+
+    profile = stats.profile
+    assert list(profile.phases) == list(PHASES)
+    assert profile.phases["walk"].wall > 0
+    assert profile.phases["serialize"].wall == 0
+    assert profile.total.wall > 0
+    # The root, src and docs
+    assert profile.dirs_visited == 3
+    assert profile.pruned_skip_dirs == 1
+    # out/ and the two debug.log
+    assert profile.pruned_gitignore == 3
+    # .gitignore and the six .py files
+    assert profile.stat_calls == 7
+    assert plain.profile is None
+    assert stats.to_dict(tree=False)["structure"] == plain.to_dict()["structure"]
+    assert stats.tree == plain.tree
+
+
+def test_analyze_profile_many_batches(tmp_path, monkeypatch):
+    """Test that profiling in batches gives the same results."""
+    import repolyze.core.analyze as analyze_module
+
+    monkeypatch.setattr(analyze_module, "PROFILE_BATCH", 2)
+    _make_profiled_repo(tmp_path)
+
+    stats = analyze(tmp_path, lines=True, profile=True)
+    plain = analyze(tmp_path, lines=True)
+
+    assert stats.tree == plain.tree
+    assert stats.file_types == plain.file_types
+    assert stats.language.total_lines_of_code == 6
+
+
+def test_analyze_profile_cache(tmp_path):
+    """Test that directories served from the scan cache are not visited."""
+    import os
+    import time
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _make_profiled_repo(repo)
+    old = time.time() - 60
+    for d in (repo, repo / "src", repo / "docs"):
+        os.utime(d, (old, old))
+
+    analyze(repo, cache_dir=tmp_path / "cache")
+    stats = analyze(repo, cache_dir=tmp_path / "cache", profile=True)
+
+    assert stats.structure.total_files == 7
+    assert stats.profile.dirs_visited == 0
+    # One stat per directory to validate its record
+    assert stats.profile.stat_calls == 3
+
+
+def test_analyze_profile_git_index(tmp_path):
+    """Test that the git index source counts the files it lstat's."""
+    import shutil
+    import subprocess
+
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    for i in range(3):
+        (tmp_path / f"m{i}.py").write_text("a\n")
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "add", "-A"], cwd=tmp_path, check=True)
+
+    stats = analyze(tmp_path, source="git-index", verify_index=True, profile=True)
+
+    assert stats.structure.total_files == 3
+    assert stats.profile.stat_calls == 3
+    assert stats.profile.dirs_visited == 0
+    assert stats.profile.phases["walk"].wall > 0
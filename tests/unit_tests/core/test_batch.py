@@ -0,0 +1,91 @@
+"""Tests for repolyze.core.batch module."""
+
+from pathlib import Path
+
+import pytest
+
+from repolyze.core import batch as batch_module
+from repolyze.core.batch import analyze_many, estimate_size
+from repolyze.models import RepoStats
+
+
+def _repo(root: Path, files: int, index: int = 0) -> Path:
+    root.mkdir()
+    for i in range(files):
+        (root / f"f{i}.py").write_text("x = 1\n")
+    if index:
+        (root / ".git").mkdir()
+        (root / ".git" / "index").write_bytes(b"\0" * index)
+    return root
+
+
+def test_estimate_size(tmp_path):
+    """Test that the size of the git index is the estimate."""
+    assert estimate_size(_repo(tmp_path / "git", 1, index=100)) == 100
+    assert estimate_size(_repo(tmp_path / "plain", 1)) == 0
+
+
+def test_analyze_many_largest_first(tmp_path):
+    """Test that repositories are analyzed largest first, then in order."""
+    paths = [
+        _repo(tmp_path / "plain_a", 1),
+        _repo(tmp_path / "small", 2, index=10),
+        _repo(tmp_path / "plain_b", 3),
+        _repo(tmp_path / "large", 4, index=1000),
+    ]
+
+    results = list(analyze_many(paths))
+
+    assert [path.name for path, _ in results] == ["large", "small", "plain_a", "plain_b"]
+    assert [stats.structure.total_files for _, stats in results] == [4, 2, 1, 3]
+    assert all(stats.tree is None for _, stats in results)
+
+
+def test_analyze_many_reports_failures(tmp_path):
+    """Test that repositories that cannot be analyzed do not stop the batch."""
+    good = _repo(tmp_path / "good", 1)
+
+    results = dict(analyze_many([tmp_path / "missing", good], source="walk"))
+
+    assert isinstance(results[(tmp_path / "missing").resolve()], NotADirectoryError)
+    assert isinstance(results[good.resolve()], RepoStats)
+
+
+def test_analyze_many_git_index_errors(tmp_path):
+    """Test that a missing git index is reported for that repository only."""
+    plain = _repo(tmp_path / "plain", 1)
+
+    ((path, error),) = analyze_many([plain], source="git-index")
+
+    assert isinstance(error, ValueError)
+
+
+def test_analyze_many_reports_any_error(tmp_path, monkeypatch):
+    """Test that an unexpected error is reported for its repository only."""
+    good = _repo(tmp_path / "good", 1)
+    bad = _repo(tmp_path / "bad", 1)
+    original = batch_module.analyze
+
+    def analyze(path, **options):
+        if path.name == "bad":
+            raise RecursionError("maximum recursion depth exceeded")
+        return original(path, **options)
+
+    monkeypatch.setattr(batch_module, "analyze", analyze)
+    results = dict(analyze_many([good, bad]))
+
+    assert isinstance(results[bad.resolve()], RecursionError)
+    assert isinstance(results[good.resolve()], RepoStats)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_analyze_many_options(tmp_path, processes):
+    """Test that options apply to every repository, in or out of process."""
+    paths = [_repo(tmp_path / f"r{i}", i + 1) for i in range(3)]
+
+    results = dict(analyze_many(paths, processes=processes, tree=True, lines=True))
+
+    assert set(results) == {p.resolve() for p in paths}
+    for path, stats in results.items():
+        assert stats.tree is not None
+        assert stats.language.total_lines_of_code == stats.structure.total_files
@@ -0,0 +1,177 @@
+"""Tests for repolyze.core.diff module."""
+
+from pathlib import Path
+
+import pytest
+
+from repolyze.core.diff import DIFF_LIST_COUNT, diff_snapshots, iter_changes
+from repolyze.models import (
+    FileTypeStats, HygieneStats, LanguageStats, MetadataStats, PathChange, RepoStats,
+    SizeStats, Snapshot, StructureStats, TimeStats, TreeNode,
+)
+
+
+def _stats(root, hygiene=None, file_types=None):
+    return RepoStats(
+        path=root.path,
+        structure=StructureStats(),
+        size=SizeStats(),
+        file_types=file_types or FileTypeStats(),
+        language=LanguageStats(),
+        time=TimeStats(),
+        hygiene=hygiene or HygieneStats(),
+        metadata=MetadataStats(),
+        tree=root,
+    )
+
+
+def _file(name, size):
+    return TreeNode(name, 1, size, is_dir=False)
+
+
+def _dir(name, *children):
+    return TreeNode(
+        name, sum(c.file_count for c in children), sum(c.total_size for c in children),
+        list(children),
+    )
+
+
+def _save(tmp_path, name, stats):
+    file = tmp_path / name
+    stats.save(file)
+    return file
+
+
+def _changes(tmp_path, old_root, new_root):
+    old = _save(tmp_path, "old", _stats(old_root))
+    new = _save(tmp_path, "new", _stats(new_root))
+    with Snapshot(old) as a, Snapshot(new) as b:
+        return list(iter_changes(a, b))
+
+
+def test_iter_changes(tmp_path):
+    """Test that added, removed and resized paths are found, in path order."""
+    old = _dir(Path("/old"),
+        _dir("a", _file("same", 1), _file("grows", 2)),
+        _dir("gone", _dir("deep", _file("x", 4))),
+        _file("z", 5),
+    )
+    new = _dir(Path("/new"),
+        _dir("a", _file("added", 3), _file("same", 1), _file("grows", 7)),
+        _file("z", 5),
+        _dir("zz", _file("y", 6)),
+    )
+
+    assert _changes(tmp_path, old, new) == [
+        PathChange(Path("a"), True, 3, 11),
+        PathChange(Path("a/added"), False, None, 3),
+        PathChange(Path("a/grows"), False, 2, 7),
+        PathChange(Path("gone"), True, 4, None),
+        PathChange(Path("gone/deep"), True, 4, None),
+        PathChange(Path("gone/deep/x"), False, 4, None),
+        PathChange(Path("zz"), True, None, 6),
+        PathChange(Path("zz/y"), False, None, 6),
+    ]
+
+
+def test_iter_changes_file_becomes_directory(tmp_path):
+    """Test that a path changing kind is removed and added again."""
+    old = _dir(Path("/r"), _dir("p", _file("in", 1)), _file("q", 2))
+    new = _dir(Path("/r"), _file("p", 1), _dir("q", _file("in", 2)))
+
+    assert _changes(tmp_path, old, new) == [
+        PathChange(Path("p"), True, 1, None),
+        PathChange(Path("p"), False, None, 1),
+        PathChange(Path("p/in"), False, 1, None),
+        PathChange(Path("q"), False, 2, None),
+        PathChange(Path("q"), True, None, 2),
+        PathChange(Path("q/in"), False, None, 2),
+    ]
+
+
+def test_iter_changes_identical(tmp_path):
+    """Test that identical trees under different roots have no changes."""
+    def tree(root):
+        return _dir(Path(root), _dir("d", _file("f", 1)), _file("g", 2))
+
+    assert _changes(tmp_path, tree("/one"), tree("/two")) == []
+
+
+def test_diff_snapshots(tmp_path):
+    """Test the totals, largest changes and aggregate deltas."""
+    old = _dir(Path("/r"),
+        _dir("src", *[_file(f"f{i:02}", 10) for i in range(DIFF_LIST_COUNT + 2)]),
+        _file("old.bin", 100),
+    )
+    new = _dir(Path("/r"),
+        _dir("src", *[_file(f"f{i:02}", 10 + i) for i in range(DIFF_LIST_COUNT + 2)]),
+        _file("new.bin", 50),
+    )
+    old_stats = _stats(
+        old,
+        HygieneStats(empty_files=1, temp_files=2),
+        FileTypeStats({".py": 3, ".bin": 1}, {".py": 30, ".bin": 100}),
+    )
+    new_stats = _stats(
+        new,
+        HygieneStats(empty_files=1, temp_files=5),
+        FileTypeStats({".py": 3, ".bin": 1}, {".py": 40, ".bin": 50}),
+    )
+
+    diff = diff_snapshots(
+        _save(tmp_path, "old", old_stats), _save(tmp_path, "new", new_stats)
+    )
+
+    assert (diff.added_files, diff.added_bytes) == (1, 50)
+    assert (diff.removed_files, diff.removed_bytes) == (1, 100)
+    assert diff.grown_files == DIFF_LIST_COUNT + 1
+    assert diff.grown_bytes == sum(range(DIFF_LIST_COUNT + 2))
+    assert len(diff.most_grown) == DIFF_LIST_COUNT
+    assert diff.most_grown[0].path == Path(f"src/f{DIFF_LIST_COUNT + 1:02}")
+    assert [c.path for c in diff.dir_deltas] == [Path("src")]
+    assert {ext: (d.files, d.size) for ext, d in diff.extension_deltas.items()} == {
+        ".bin": (0, -50), ".py": (0, 10),
+    }
+    assert {k: (v.old, v.new) for k, v in diff.hygiene_changes.items()} == {
+        "temp_files": (2, 5),
+    }
+    assert diff.to_dict()["most_grown"][0]["delta"] == DIFF_LIST_COUNT + 1
+
+
+def test_diff_snapshots_skips_counts_missing_on_one_side(tmp_path):
+    """Test that counters only one snapshot has are not reported as changed."""
+    root = _dir(Path("/r"), _file("f", 1))
+    old = _save(tmp_path, "old", _stats(root, HygieneStats(empty_files=1)))
+    new = _save(tmp_path, "new", _stats(
+        root, HygieneStats(empty_files=2, duplicate_group_count=3, wasted_bytes=10)
+    ))
+
+    diff = diff_snapshots(old, new)
+
+    assert {k: (v.old, v.new) for k, v in diff.hygiene_changes.items()} == {
+        "empty_files": (1, 2),
+    }
+
+
+def test_diff_snapshots_without_tree(tmp_path):
+    """Test that snapshots without a tree are compared by aggregates only."""
+    stats = _stats(_dir(Path("/r"), _file("f", 1)))
+    old = _save(tmp_path, "old", stats)
+    stats.tree = None
+    new = _save(tmp_path, "new", stats)
+
+    diff = diff_snapshots(old, new)
+
+    assert not diff.compared_files
+    assert diff.added_files == 0
+
+
+def test_iter_changes_requires_trees(tmp_path):
+    """Test that iter_changes() refuses snapshots without a tree."""
+    stats = _stats(_dir(Path("/r")))
+    stats.tree = None
+    file = _save(tmp_path, "old", stats)
+
+    with Snapshot(file) as a, Snapshot(file) as b:
+        with pytest.raises(ValueError):
+            list(iter_changes(a, b))
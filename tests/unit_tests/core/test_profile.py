@@ -0,0 +1,94 @@
+"""Tests for repolyze.core.profile module."""
+
+import threading
+
+from repolyze.core.profile import PHASES, Profiler, recording, timed
+from repolyze.models import PhaseTime, ProfileStats
+
+
+def test_profiler_phases_start_at_zero():
+    """Test that a new profiler has every phase, in order, at zero."""
+    stats = Profiler().stats
+
+    assert list(stats.phases) == list(PHASES)
+    assert all(phase == PhaseTime() for phase in stats.phases.values())
+
+
+def test_profiler_phase_adds_time():
+    """Test that each timed block adds to its phase."""
+    profiler = Profiler()
+
+    with profiler.phase("walk"):
+        sum(range(10000))
+    first = profiler.stats.phases["walk"].wall
+    with profiler.phase("walk"):
+        sum(range(10000))
+
+    assert first > 0
+    assert profiler.stats.phases["walk"].wall > first
+    assert profiler.stats.phases["stat"].wall == 0
+
+
+def test_profiler_counts_from_threads():
+    """Test that counters can be added to from several threads."""
+    profiler = Profiler()
+
+    def work():
+        for _ in range(1000):
+            profiler.count(dirs_visited=1, stat_calls=2)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert profiler.stats.dirs_visited == 4000
+    assert profiler.stats.stat_calls == 8000
+
+
+def test_profiler_merge():
+    """Test that the profile of another process is added up."""
+    profiler = Profiler()
+    profiler.add("walk", 1.0, 0.5)
+    profiler.count(pruned_gitignore=2)
+    other = ProfileStats(
+        {"walk": PhaseTime(2.0, 1.0), "tree": PhaseTime(0.25, 0.25)},
+        pruned_gitignore=3, stat_calls=4,
+    )
+
+    profiler.merge(other)
+
+    assert profiler.stats.phases["walk"] == PhaseTime(3.0, 1.5)
+    assert profiler.stats.phases["tree"] == PhaseTime(0.25, 0.25)
+    assert profiler.stats.pruned_gitignore == 5
+    assert profiler.stats.stat_calls == 4
+
+
+def test_profiler_finish_records_total():
+    """Test that finish() records the time since the profiler was created."""
+    profiler = Profiler()
+    with profiler.phase("aggregate"):
+        sum(range(10000))
+
+    stats = profiler.finish()
+
+    assert stats.total.wall >= stats.phases["aggregate"].wall > 0
+
+
+def test_timed_without_profiler():
+    """Test that timed() does nothing without a profiler."""
+    with timed(None, "walk"):
+        pass
+
+
+def test_recording():
+    """Test that recording() adds to a phase of finished stats."""
+    stats = ProfileStats()
+
+    with recording(stats, "serialize"):
+        sum(range(10000))
+    with recording(None, "serialize"):
+        pass
+
+    assert stats.phases["serialize"].wall > 0
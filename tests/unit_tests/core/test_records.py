@@ -0,0 +1,42 @@
+"""Tests for repolyze.core.records module."""
+
+import os
+
+import pytest
+
+from repolyze.core.records import FileRecord, file_records
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.PY").write_text("a = 1\nb = 2\n")
+    (tmp_path / "notes").write_text("no extension")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "dep.js").write_text("skipped")
+    return tmp_path
+
+
+def test_file_records(repo):
+    """Test that every file gives a record, with a path relative to the root."""
+    records = sorted(file_records(repo))
+
+    st = (repo / "notes").stat()
+    assert records == [
+        FileRecord("notes", st.st_size, st.st_mtime, "", st.st_ino),
+        FileRecord(os.path.join("src", "main.PY"), 12, records[1].mtime, ".py",
+                   records[1].inode),
+    ]
+
+
+def test_file_records_lines(repo):
+    """Test that lines are counted for code files only."""
+    records = {record.path: record.lines for record in file_records(repo, lines=True)}
+
+    assert records == {"notes": None, os.path.join("src", "main.PY"): 2}
+
+
+def test_file_records_unknown_source(tmp_path):
+    """Test that an unknown source is rejected."""
+    with pytest.raises(ValueError):
+        list(file_records(tmp_path, source="svn"))
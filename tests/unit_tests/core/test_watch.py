@@ -0,0 +1,166 @@
+"""Tests for repolyze.core.watch module."""
+
+import os
+import shutil
+
+import pytest
+
+from repolyze.core.analyze import analyze
+from repolyze.core.filesystem.watch import InotifyWatcher, PollingWatcher
+from repolyze.core.watch import StatsWatcher
+
+
+def _snapshot(stats):
+    data = stats.to_dict()
+    data.pop("created_at")
+    return data
+
+
+def _make_repo(root):
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "pkg" / "mod.py").write_text("x" * 50)
+    (root / "src" / "main.py").write_text("print(1)")
+    (root / "docs").mkdir()
+    (root / "docs" / "index.md").write_text("# docs")
+    (root / "tiny.txt").write_text("t")
+
+
+def _watcher(root):
+    # Changes are applied explicitly, so the backend never has to report
+    return StatsWatcher(root, backend=PollingWatcher(interval=0.01))
+
+
+def test_watcher_initial_stats_match_analyze(tmp_path):
+    """Test that the initial scan gives the same results as analyze()."""
+    _make_repo(tmp_path)
+
+    with _watcher(tmp_path) as watcher:
+        assert _snapshot(watcher.stats) == _snapshot(analyze(tmp_path))
+
+
+def test_watcher_applies_changes(tmp_path):
+    """Test that added, removed and rewritten entries are applied."""
+    _make_repo(tmp_path)
+
+    with _watcher(tmp_path) as watcher:
+        (tmp_path / "src" / "new.js").write_text("let x")
+        (tmp_path / "src" / "main.py").write_text("print('longer')")
+        os.remove(tmp_path / "tiny.txt")
+        (tmp_path / "docs" / "api").mkdir()
+        (tmp_path / "docs" / "api" / "ref.md").write_text("ref")
+
+        assert watcher.apply({str(tmp_path), str(tmp_path / "src"), str(tmp_path / "docs")})
+        assert _snapshot(watcher.stats) == _snapshot(analyze(tmp_path))
+
+        shutil.rmtree(tmp_path / "src")
+        assert watcher.apply({str(tmp_path), str(tmp_path / "src")})
+        assert _snapshot(watcher.stats) == _snapshot(analyze(tmp_path))
+
+
+def test_watcher_reports_no_change(tmp_path):
+    """Test that rescanning an unchanged directory changes nothing."""
+    _make_repo(tmp_path)
+
+    with _watcher(tmp_path) as watcher:
+        version = watcher.version
+        assert not watcher.apply({str(tmp_path / "src")})
+        assert watcher.version == version
+
+
+def test_watcher_reapplies_gitignore(tmp_path):
+    """Test that editing a .gitignore re-filters the tree below it."""
+    _make_repo(tmp_path)
+
+    with _watcher(tmp_path) as watcher:
+        (tmp_path / "src" / ".gitignore").write_text("pkg/\n")
+        watcher.apply({str(tmp_path / "src")})
+        assert _snapshot(watcher.stats) == _snapshot(analyze(tmp_path))
+
+        os.remove(tmp_path / "src" / ".gitignore")
+        watcher.apply({str(tmp_path / "src")})
+        assert _snapshot(watcher.stats) == _snapshot(analyze(tmp_path))
+
+
+def test_watcher_hard_links(tmp_path):
+    """Test that a hard-linked file stays counted while any link remains."""
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "data.bin").write_text("payload")
+    try:
+        os.link(tmp_path / "a" / "data.bin", tmp_path / "b" / "data.bin")
+    except OSError as e:
+        pytest.skip(f"Cannot create hard links: {e}")
+
+    with _watcher(tmp_path) as watcher:
+        assert watcher.stats.structure.total_files == 1
+
+        os.remove(tmp_path / "a" / "data.bin")
+        watcher.apply({str(tmp_path / "a")})
+        stats = watcher.stats
+
+        assert stats.structure.total_files == 1
+        assert stats.size.small_files[0].path == tmp_path / "b" / "data.bin"
+
+
+def test_watcher_full_rescan(tmp_path):
+    """Test that None (lost events) rescans everything."""
+    _make_repo(tmp_path)
+
+    with _watcher(tmp_path) as watcher:
+        (tmp_path / "docs" / "more.md").write_text("more")
+
+        assert watcher.apply(None)
+        assert _snapshot(watcher.stats) == _snapshot(analyze(tmp_path))
+
+
+def test_watcher_wait_coalesces_events(tmp_path):
+    """Test that a burst of events is applied as one batch."""
+    try:
+        backend = InotifyWatcher()
+    except OSError:
+        pytest.skip("inotify is not available")
+    _make_repo(tmp_path)
+
+    with StatsWatcher(tmp_path, debounce=0.1, backend=backend) as watcher:
+        for i in range(20):
+            (tmp_path / "src" / f"gen{i}.py").write_text("x" * i)
+        with open(tmp_path / "docs" / "index.md", "a") as f:
+            f.write("appended in place")
+
+        assert watcher.wait(1)
+        assert watcher.version == 1
+        assert _snapshot(watcher.stats) == _snapshot(analyze(tmp_path))
+
+        assert not watcher.wait(0.05)
+
+
+def test_watcher_snapshots(tmp_path):
+    """Test that snapshots are to_dict() results, starting with the current one."""
+    _make_repo(tmp_path)
+
+    with _watcher(tmp_path) as watcher:
+        first = next(watcher.snapshots())
+
+    assert first["structure"]["total_files"] == 4
+    assert first["path"] == str(tmp_path.resolve())
+
+
+def test_watcher_tracks_empty_dirs_and_rollups(tmp_path):
+    """Test that directory totals and empty directories follow changes."""
+    _make_repo(tmp_path)
+    (tmp_path / "empty").mkdir()
+
+    with _watcher(tmp_path) as watcher:
+        stats = watcher.stats
+        assert stats.hygiene.empty_dirs == 1
+        assert stats.tree.total_size == stats.size.total_size
+
+        (tmp_path / "empty" / "now-full.txt").write_text("12345")
+        os.remove(tmp_path / "src" / "pkg" / "mod.py")
+        assert watcher.apply({str(tmp_path / "empty"), str(tmp_path / "src" / "pkg")})
+
+        stats = watcher.stats
+        assert stats.hygiene.empty_dirs == 1
+        src = next(c for c in stats.tree.children if c.name == "src")
+        assert (src.file_count, src.total_size) == (1, len("print(1)"))
+        assert _snapshot(stats) == _snapshot(analyze(tmp_path))
@@ -2,7 +2,9 @@
 
 import pytest
 
-from repolyze.core.tree.build import build_tree, _load_gitignore, _matches_gitignore
+from repolyze.core.filesystem.scan import ScanEntry
+
+from repolyze.core.tree.build import TreeBuilder, build_tree
 
 
 def test_build_tree_empty_directory(tmp_path):
@@ -96,20 +98,107 @@ def test_build_tree_skips_symlinks(tmp_path):
     assert "link_to_dir" not in child_names
 
 
-def test_load_gitignore_from_build(tmp_path):
-    """Test _load_gitignore function."""
-    gitignore = tmp_path / ".gitignore"
-    gitignore.write_text("*.pyc\n# comment\nbuild/\n")
-    
-    patterns = _load_gitignore(tmp_path)
-    
-    assert patterns == ["*.pyc", "build/"]
+def test_build_tree_sorts_children(tmp_path):
+    """Test that build_tree orders children by path."""
+    (tmp_path / "b.txt").touch()
+    (tmp_path / "a").mkdir()
+    (tmp_path / "c.txt").touch()
 
+    tree = build_tree(tmp_path)
 
-def test_matches_gitignore_from_build():
-    """Test _matches_gitignore function."""
-    patterns = ["*.log", "temp/"]
-    
-    assert _matches_gitignore("file.log", patterns, is_dir=False)
-    assert _matches_gitignore("temp", patterns, is_dir=True)
-    assert not _matches_gitignore("file.txt", patterns, is_dir=False)
+    assert [child.path.name for child in tree.children] == ["a", "b.txt", "c.txt"]
+
+
+def test_build_tree_records_file_sizes(tmp_path):
+    """Test that file nodes carry their size."""
+    (tmp_path / "file.txt").write_text("12345")
+
+    tree = build_tree(tmp_path)
+
+    assert tree.children[0].file_count == 1
+    assert tree.children[0].total_size == 5
+
+
+def test_tree_builder_incremental(tmp_path):
+    """Test assembling a tree from top-down scan results."""
+    src = str(tmp_path / "src")
+    builder = TreeBuilder(tmp_path)
+    builder.add(ScanEntry(src, "src", True, 0, 0.0, 1, 0))
+    builder.add(ScanEntry(f"{src}/main.py", "main.py", False, 10, 0.0, 2, 0))
+    builder.add(ScanEntry(str(tmp_path / "README.md"), "README.md", False, 3, 0.0, 3, 0))
+
+    tree = builder.build()
+
+    assert [child.path.name for child in tree.children] == ["README.md", "src"]
+    assert tree.children[1].children[0].total_size == 10
+
+
+def test_tree_builder_ignores_orphans(tmp_path):
+    """Test that entries whose parent was never added are dropped."""
+    orphan = str(tmp_path / "missing" / "file.txt")
+    builder = TreeBuilder(tmp_path)
+    builder.add(ScanEntry(orphan, "file.txt", False, 1, 0.0, 1, 0))
+
+    assert builder.build().children == []
+
+
+def test_tree_builder_remove(tmp_path):
+    """Test removing files and directories from a built tree."""
+    root = str(tmp_path)
+    builder = TreeBuilder(tmp_path)
+    builder.add(ScanEntry(f"{root}/src", "src", True, 0, 0.0, 1, 0))
+    builder.add(ScanEntry(f"{root}/b.txt", "b.txt", False, 3, 0.0, 2, 0))
+    builder.add(ScanEntry(f"{root}/src/a.py", "a.py", False, 5, 0.0, 3, 0))
+    builder.build()
+
+    builder.remove(f"{root}/src")
+    builder.add(ScanEntry(f"{root}/a.txt", "a.txt", False, 1, 0.0, 4, 0))
+    # Its parent is gone, so this is ignored
+    builder.add(ScanEntry(f"{root}/src/c.py", "c.py", False, 1, 0.0, 5, 0))
+    tree = builder.build()
+
+    assert [child.path.name for child in tree.children] == ["a.txt", "b.txt"]
+
+
+def test_build_tree_rolls_up_directory_totals(tmp_path):
+    """Test that directories carry the file count and size of their subtree."""
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "f1").write_text("123")
+    (tmp_path / "a" / "f2").write_text("45")
+    (tmp_path / "f3").write_text("6")
+
+    tree = build_tree(tmp_path)
+
+    a = tree.children[0]
+    assert (tree.file_count, tree.total_size) == (3, 6)
+    assert (a.file_count, a.total_size) == (2, 5)
+    assert (a.children[0].file_count, a.children[0].total_size) == (1, 3)
+
+
+def test_tree_builder_remove_updates_ancestors(tmp_path):
+    """Test that removed entries are subtracted from every ancestor."""
+    root = str(tmp_path)
+    builder = TreeBuilder(tmp_path)
+    builder.add(ScanEntry(f"{root}/src", "src", True, 0, 0.0, 1, 0))
+    builder.add(ScanEntry(f"{root}/src/lib", "lib", True, 0, 0.0, 2, 0))
+    builder.add(ScanEntry(f"{root}/src/lib/a.py", "a.py", False, 5, 0.0, 3, 0))
+    builder.add(ScanEntry(f"{root}/src/b.py", "b.py", False, 7, 0.0, 4, 0))
+
+    builder.remove(f"{root}/src/lib")
+    tree = builder.build()
+
+    assert (tree.file_count, tree.total_size) == (1, 7)
+    assert (tree.children[0].file_count, tree.children[0].total_size) == (1, 7)
+
+
+def test_tree_builder_graft_updates_ancestors(tmp_path):
+    """Test that a subtree built elsewhere adds its totals to the tree."""
+    sub = TreeBuilder(tmp_path / "pkg")
+    sub.add(ScanEntry(str(tmp_path / "pkg" / "m.py"), "m.py", False, 4, 0.0, 1, 0))
+    builder = TreeBuilder(tmp_path)
+
+    builder.graft(sub.build())
+    tree = builder.build()
+
+    assert tree.children[0].path == tmp_path / "pkg"
+    assert (tree.file_count, tree.total_size) == (1, 4)
@@ -0,0 +1,40 @@
+"""Tests for repolyze.models.batch module."""
+
+from pathlib import Path
+
+from repolyze.models import (
+    BatchRollup, FileTypeStats, HygieneStats, LanguageStats, MetadataStats, RepoStats,
+    SizeStats, StructureStats, TimeStats,
+)
+
+
+def _stats(files, size, counts, language):
+    return RepoStats(
+        path=Path("/r"),
+        structure=StructureStats(total_files=files, total_dirs=1),
+        size=SizeStats(total_size=size),
+        file_types=FileTypeStats(counts, {ext: 10 * n for ext, n in counts.items()}),
+        language=LanguageStats(primary_language=language),
+        time=TimeStats(),
+        hygiene=HygieneStats(),
+        metadata=MetadataStats(),
+    )
+
+
+def test_batch_rollup():
+    """Test that totals add up across repositories."""
+    rollup = BatchRollup()
+    rollup.add(_stats(3, 30, {".py": 2, ".md": 1}, "Python"))
+    rollup.add(_stats(4, 40, {".go": 3, ".md": 1}, "Go"))
+    rollup.add(_stats(1, 10, {".py": 1}, "Python"))
+    rollup.failed += 1
+
+    result = rollup.to_dict()
+
+    assert (result["repositories"], result["failed"]) == (3, 1)
+    assert (result["total_files"], result["total_dirs"], result["total_size"]) == (8, 3, 80)
+    assert list(result["count_by_extension"].items()) == [
+        (".go", 3), (".py", 3), (".md", 2),
+    ]
+    assert result["size_by_extension"][".md"] == 20
+    assert result["repositories_by_language"] == {"Python": 2, "Go": 1}
@@ -1,5 +1,7 @@
 """Tests for repolyze.models.repo module."""
 
+import pickle
+import sys
 from pathlib import Path
 from datetime import datetime
 import pytest
@@ -7,7 +9,8 @@ import pytest
 from repolyze.models import (
     FileStat, DirStat, StructureStats, SizeStats, 
     FileTypeStats, LanguageStats, TimeStats, 
-    HygieneStats, MetadataStats, TreeNode, RepoStats
+    HygieneStats, MetadataStats, TreeNode, RepoStats, LineCounts,
+    PhaseTime, ProfileStats,
 )
 
 
@@ -132,6 +135,7 @@ def test_hygiene_stats_defaults():
     assert stats.large_files == []
     assert stats.temp_files == 0
     assert stats.hidden_files == 0
+    assert stats.duplicate_groups is None
 
 
 def test_metadata_stats_defaults():
@@ -231,3 +235,139 @@ def test_repo_stats_created_at():
     assert isinstance(stats.created_at, datetime)
     # Should be recent
     assert (datetime.utcnow() - stats.created_at).total_seconds() < 1
+
+
+def test_repo_stats_lines_by_language_to_dict(tmp_path):
+    """Test that per-language line counts become plain dictionaries."""
+    stats = RepoStats(
+        path=tmp_path,
+        structure=StructureStats(),
+        size=SizeStats(),
+        file_types=FileTypeStats(),
+        language=LanguageStats(lines_by_language={"Go": LineCounts(3, 2, 1)}),
+        time=TimeStats(),
+        hygiene=HygieneStats(),
+        metadata=MetadataStats(),
+    )
+
+    result = stats.to_dict()
+
+    assert result["language"]["lines_by_language"] == {
+        "Go": {"code": 3, "comment": 2, "blank": 1}
+    }
+
+
+def test_tree_node_is_slotted_and_name_based():
+    """Test that nodes keep only their name, and rebuild their path."""
+    leaf = TreeNode(Path("/test/dir/leaf.txt"), 1, 10, is_dir=False)
+    parent = TreeNode(Path("/test/dir"), 1, 10, [leaf])
+    root = TreeNode(Path("/test"), 1, 10, [parent])
+
+    assert not hasattr(root, "__dict__")
+    assert leaf.name == "leaf.txt"
+    assert leaf.parent is parent
+    assert leaf.path == Path("/test/dir/leaf.txt")
+    assert root.name == str(Path("/test"))
+
+
+def test_tree_node_equality():
+    """Test that trees compare equal by names, totals and children."""
+    def tree(size):
+        return TreeNode(Path("/r"), 1, size, [TreeNode(Path("/r/f"), 1, size, is_dir=False)])
+
+    assert tree(5) == tree(5)
+    assert tree(5) != tree(6)
+
+
+def test_tree_node_heaviest_subtrees():
+    """Test that the directories with the most bytes below them come first."""
+    small = TreeNode(Path("/r/small"), 1, 10, [TreeNode(Path("/r/small/f"), 1, 10, is_dir=False)])
+    inner = TreeNode(Path("/r/big/inner"), 1, 70, [TreeNode(Path("/r/big/inner/f"), 1, 70, is_dir=False)])
+    big = TreeNode(Path("/r/big"), 2, 100, [inner, TreeNode(Path("/r/big/g"), 1, 30, is_dir=False)])
+    root = TreeNode(Path("/r"), 3, 110, [small, big])
+
+    assert root.heaviest_subtrees(2) == [big, inner]
+    assert [node.name for node in root.walk()] == [
+        str(Path("/r")), "small", "f", "big", "inner", "f", "g",
+    ]
+
+
+def test_tree_node_heaviest_subtrees_only_directories():
+    """Test that files are never subtrees, and empty directories are."""
+    empty = TreeNode(Path("/r/empty"))
+    root = TreeNode(Path("/r"), 2, 30, [
+        TreeNode(Path("/r/a"), 1, 10, [], is_dir=False),
+        TreeNode(Path("/r/b"), 1, 20, is_dir=False),
+        empty,
+    ])
+
+    assert root.heaviest_subtrees(5) == [empty]
+
+
+def test_tree_node_pickles_deep_trees(tmp_path):
+    """Test that trees deeper than the recursion limit are pickled."""
+    root = node = TreeNode(tmp_path, 2, 2)
+    for _ in range(sys.getrecursionlimit() + 100):
+        child = TreeNode("d", 2, 2)
+        node.add(child)
+        node = child
+    node.add(TreeNode("f", 1, 1, is_dir=False))
+    node.add(TreeNode("g", 1, 1, is_dir=False))
+
+    copy = pickle.loads(pickle.dumps(root))
+
+    assert copy == root
+    assert copy.children[0].parent is copy
+    *_, last = copy.walk()
+    assert (last.path, last.is_dir) == (node.children[1].path, False)
+
+
+def test_repo_stats_deep_tree_to_dict(tmp_path):
+    """Test that trees deeper than the recursion limit are converted."""
+    depth = sys.getrecursionlimit() + 100
+    root = node = TreeNode(tmp_path, 1, 1, [])
+    for _ in range(depth):
+        child = TreeNode("d", 1, 1, [])
+        node.add(child)
+        node = child
+    stats = RepoStats(
+        path=tmp_path,
+        structure=StructureStats(),
+        size=SizeStats(),
+        file_types=FileTypeStats(),
+        language=LanguageStats(),
+        time=TimeStats(),
+        hygiene=HygieneStats(),
+        metadata=MetadataStats(),
+        tree=root,
+    )
+
+    result = stats.to_dict()["tree"]
+    for _ in range(depth):
+        (result,) = result["children"]
+
+    assert result["path"] == str(tmp_path.joinpath(*["d"] * depth))
+    assert result["children"] == []
+
+
+def test_repo_stats_profile_to_dict(tmp_path):
+    """Test that the profile is converted last, and only if there is one."""
+    stats = RepoStats(
+        path=tmp_path,
+        structure=StructureStats(),
+        size=SizeStats(),
+        file_types=FileTypeStats(),
+        language=LanguageStats(),
+        time=TimeStats(),
+        hygiene=HygieneStats(),
+        metadata=MetadataStats(),
+    )
+
+    assert "profile" not in stats.to_dict()
+
+    stats.profile = ProfileStats({"walk": PhaseTime(0.5, 0.25)}, stat_calls=3)
+    result = stats.to_dict()
+
+    assert list(result)[-1] == "profile"
+    assert result["profile"]["phases"] == {"walk": {"wall": 0.5, "cpu": 0.25}}
+    assert result["profile"]["stat_calls"] == 3
@@ -0,0 +1,129 @@
+"""Tests for repolyze.models.snapshot module."""
+
+import struct
+from pathlib import Path
+
+import pytest
+
+from repolyze.core.analyze import analyze
+from repolyze.models import RepoStats, Snapshot, SnapshotError, TreeNode
+from repolyze.models.snapshot import COMPRESSIONS, TreeNodeRecord
+
+
+@pytest.fixture
+def stats(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / "src" / "pkg").mkdir(parents=True)
+    (repo / "src" / "pkg" / "a.py").write_text("import b\n\n# comment\n")
+    (repo / "src" / "b.py").write_text("x = 1\n")
+    (repo / "src" / "copy.py").write_text("x = 1\n")
+    (repo / "empty").mkdir()
+    (repo / "README.md").write_text("# repo")
+    return analyze(repo, sloc=True, detect=True, duplicates=True)
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_save_load_round_trip(stats, tmp_path, compression):
+    """Test that a loaded snapshot equals the saved stats."""
+    file = tmp_path / "stats.snap"
+    stats.save(file, compression)
+
+    loaded = RepoStats.load(file)
+
+    assert loaded == stats
+    assert loaded.to_dict() == stats.to_dict()
+
+
+def test_load_without_tree(stats, tmp_path):
+    """Test that the aggregates can be loaded without the tree."""
+    file = tmp_path / "stats.snap"
+    stats.save(file)
+
+    loaded = RepoStats.load(file, tree=False)
+
+    assert loaded.tree is None
+    assert loaded.size == stats.size
+    assert loaded.hygiene.duplicate_groups == stats.hygiene.duplicate_groups
+
+
+def test_save_without_tree(stats, tmp_path):
+    """Test that stats analyzed without a tree are saved without one."""
+    stats.tree = None
+    file = tmp_path / "stats.snap"
+    stats.save(file)
+
+    with Snapshot(file) as snapshot:
+        assert not snapshot.has_tree
+        assert list(snapshot.nodes()) == []
+        assert snapshot.stats() == stats
+
+
+def test_nodes_in_path_order(stats, tmp_path):
+    """Test that nodes are streamed in preorder, children sorted by name."""
+    root = TreeNode(Path("/r"), 3, 6, [
+        TreeNode(Path("/r/z"), 1, 1, is_dir=False),
+        TreeNode(Path("/r/d"), 2, 5, [
+            TreeNode(Path("/r/d/y"), 1, 2, is_dir=False),
+            TreeNode(Path("/r/d/x"), 1, 3, is_dir=False),
+        ]),
+    ])
+    stats.tree = root
+    file = tmp_path / "stats.snap"
+    stats.save(file, "none")
+
+    with Snapshot(file) as snapshot:
+        nodes = list(snapshot.nodes())
+
+    assert nodes == [
+        TreeNodeRecord(0, str(Path("/r")), True, 3, 6),
+        TreeNodeRecord(1, "d", True, 2, 5),
+        TreeNodeRecord(2, "x", False, 1, 3),
+        TreeNodeRecord(2, "y", False, 1, 2),
+        TreeNodeRecord(1, "z", False, 1, 1),
+    ]
+
+
+def test_shared_names_are_stored_once(stats, tmp_path):
+    """Test that the string table holds each distinct name once."""
+    dirs = [TreeNode(f"d{i:02}", 1, 1, [TreeNode("__init__.py", 1, 1, is_dir=False)]) for i in range(50)]
+    stats.tree = TreeNode(stats.path, 50, 50, dirs)
+    file = tmp_path / "stats.snap"
+    stats.save(file, "none")
+
+    with Snapshot(file) as snapshot:
+        assert snapshot.columns().names.count("__init__.py") == 1
+        assert snapshot.tree() == stats.tree
+
+
+def test_load_rejects_other_files(tmp_path):
+    """Test that empty, foreign and newer files raise SnapshotError."""
+    file = tmp_path / "stats.snap"
+    for data in (b"", b"{}", b"RPLZSNAP" + struct.pack("<HH", 99, 0)):
+        file.write_bytes(data)
+        with pytest.raises(SnapshotError):
+            RepoStats.load(file)
+
+
+def test_load_detects_corruption(stats, tmp_path):
+    """Test that a damaged section raises SnapshotError."""
+    file = tmp_path / "stats.snap"
+    stats.save(file)
+    data = bytearray(file.read_bytes())
+    data[-1] ^= 0xFF
+    file.write_bytes(bytes(data))
+
+    with pytest.raises(SnapshotError):
+        RepoStats.load(file)
+
+
+def test_save_load_profile(tmp_path):
+    """Test that the profile of a profiled analysis is saved too."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("x = 1\n")
+    stats = analyze(repo, profile=True)
+    file = tmp_path / "stats.snap"
+
+    stats.save(file)
+
+    assert RepoStats.load(file).profile == stats.profile